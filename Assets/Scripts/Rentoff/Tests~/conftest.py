@@ -0,0 +1,41 @@
+"""
+Общие фикстуры тестов ambilight_extractor: модуль импортируется из родительского каталога,
+тестовые видео создаются во временном каталоге через cv2.VideoWriter.
+Каталог с "~" в имени Unity не импортирует.
+"""
+import os
+import sys
+from typing import Callable, List
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def write_video(path: str, frames: List[np.ndarray], fps: float = 30.0) -> str:
+    import cv2
+
+    height, width = frames[0].shape[:2]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    assert writer.isOpened()
+    for frame in frames:
+        writer.write(frame)
+    writer.release()
+    return path
+
+@pytest.fixture
+def scene_video(tmp_path) -> str:
+    """
+    120 кадров 160x90: четыре сцены по 30 одинаковых кадров. К концу сцены сглаженные цвета
+    перестают меняться, и пакеты изменений SPI становятся пустыми.
+    """
+    rng = np.random.default_rng(0)
+    scenes = [rng.integers(0, 256, (90, 160, 3), dtype=np.uint8) for _ in range(4)]
+    return write_video(str(tmp_path / "scenes.mp4"), [scenes[index // 30] for index in range(120)])
+
+@pytest.fixture
+def video_factory(tmp_path) -> Callable[..., str]:
+    """Записывает кадры в tmp_path/<name>.mp4 и возвращает путь."""
+    def factory(name: str, frames: List[np.ndarray], fps: float = 30.0) -> str:
+        return write_video(str(tmp_path / f"{name}.mp4"), frames, fps)
+    return factory
@@ -0,0 +1,19 @@
+"""Библиотечный API работает молча: без индикаторов прогресса и без загрузки командной строки."""
+import sys
+
+import numpy as np
+
+import ambilight_extractor as ae
+
+def test_extract_prints_nothing(capfd, scene_video):
+    colors = ae.extract(scene_video, zones="left,right", params={"num_processes": 0})
+    assert colors.shape[0] == 120
+    captured = capfd.readouterr()
+    assert captured.out == "" and captured.err == ""
+
+def test_iter_frames_prints_nothing(capfd, scene_video):
+    frames = list(ae.iter_frames(scene_video, zones="top", params={"num_processes": 0, "batch_size": 16}))
+    np.testing.assert_array_equal([number for number, _ in frames], np.arange(1, 121))
+    captured = capfd.readouterr()
+    assert captured.out == "" and captured.err == ""
+    assert "ambilight_cli" not in sys.modules
@@ -0,0 +1,102 @@
+"""
+Векторная цветовая обработка и обрезка края совпадают с исходной попиксельной реализацией
+(перенесена сюда как эталон) с точностью до 1 на канал.
+"""
+from typing import List
+
+import cv2
+import numpy as np
+import pytest
+
+import ambilight_extractor as ae
+
+ColorFormat = ae.ColorFormat
+PixelSelection = ae.PixelSelection
+
+def sigmoid_transform(value, midpoint=0.5, steepness=10):
+    normalized = value / 255.0
+    transformed = 1 / (1 + np.exp(-steepness * (normalized - midpoint)))
+    return int(transformed * 255.0)
+
+def limit_brightness(pixel, max_brightness=220):
+    total_brightness = sum(pixel)
+    if len(pixel) in (3, 4, 5) and total_brightness > max_brightness:
+        scale = max_brightness / total_brightness
+        return [int(c * scale) for c in pixel]
+    return pixel
+
+def enhance_saturation(pixel, factor=1.2):
+    if len(pixel) == 3:
+        h, s, v = cv2.cvtColor(np.uint8([[pixel]]), cv2.COLOR_RGB2HSV)[0][0]
+        s = int(np.clip(s * factor, 0, 255))
+        return cv2.cvtColor(np.uint8([[[h, s, v]]]), cv2.COLOR_HSV2RGB)[0][0].tolist()
+    return pixel
+
+def baseline_colors(frame: np.ndarray, color_format: ColorFormat, pixel_selection: PixelSelection,
+                    output_color_format: ColorFormat, target_height: int, target_width: int) -> List[List[int]]:
+    """
+    Исходная цепочка: конвертация и уменьшение всего кадра, затем обработка по пикселю.
+    cv2.resize заменён на resize_area - исходный код не уменьшал кадры с 5 каналами (RGBWMix).
+    """
+    resize_area = ae.FrameProcessor.resize_area
+    height, width = frame.shape[:2]
+    converted = ae.FrameProcessor.convert_color_format(frame, color_format)
+    if pixel_selection in (PixelSelection.LEFT, PixelSelection.RIGHT):
+        resized = resize_area(converted, (int(target_height * width / height), target_height))
+        target_count = target_height
+        if resized.shape[0] != target_count:
+            line = resize_area(resized, (1, target_count))[:, 0, :]
+        else:
+            line = resized[:, 0 if pixel_selection == PixelSelection.LEFT else -1, :]
+    else:
+        resized = resize_area(converted, (target_width, int(target_width * height / width)))
+        target_count = target_width
+        if resized.shape[1] != target_count:
+            line = resize_area(resized, (target_count, 1))[0, :, :]
+        else:
+            line = resized[0 if pixel_selection == PixelSelection.TOP else -1, :, :]
+
+    processed = []
+    for pixel in line.reshape(target_count, -1)[::-1]:
+        pixel_list = pixel.astype(np.float32).tolist()
+        if output_color_format != ColorFormat.RGBW and len(pixel_list) == 4:
+            pixel_list = pixel_list[:3]
+        elif output_color_format == ColorFormat.RGBW and len(pixel_list) == 3:
+            pixel_list.append(min(pixel_list))
+        elif output_color_format == ColorFormat.RGBWMix and len(pixel_list) == 3:
+            pixel_list.extend([min(pixel_list), max(pixel_list)])
+        transformed = limit_brightness([sigmoid_transform(c) for c in pixel_list])
+        if output_color_format in (ColorFormat.RGB, ColorFormat.RGBW, ColorFormat.RGBWMix):
+            transformed = enhance_saturation(transformed)
+        processed.append(transformed)
+    return processed
+
+def worker_colors(frame: np.ndarray, color_format: ColorFormat, pixel_selection: PixelSelection,
+                  output_color_format: ColorFormat, target_height: int, target_width: int) -> List[List[int]]:
+    height, width = frame.shape[:2]
+    results, _ = ae.process_frame_batch_worker(
+        [(0, frame)], width, height, target_height, target_width, color_format, 0,
+        pixel_selection, output_color_format, keep_display=False, lut=ae.FrameProcessor.build_lut()
+    )
+    return results[0]["pixels"]
+
+@pytest.mark.parametrize("width, height", [(320, 180), (333, 127), (96, 200), (50, 50), (40, 24)])
+@pytest.mark.parametrize("pixel_selection", list(PixelSelection))
+@pytest.mark.parametrize("color_format, output_color_format", [
+    (ColorFormat.RGB, ColorFormat.RGB),
+    (ColorFormat.RGB, ColorFormat.RGBW),
+    (ColorFormat.RGB, ColorFormat.RGBWMix),
+    (ColorFormat.HSV, ColorFormat.HSV),
+    (ColorFormat.RGBW, ColorFormat.RGBW),
+    (ColorFormat.RGBW, ColorFormat.RGB),
+    (ColorFormat.RGBWMix, ColorFormat.RGBWMix),
+])
+def test_matches_per_pixel_baseline(width, height, pixel_selection, color_format, output_color_format):
+    # Плавный градиент с шумом: усреднение полосы края проверяется не только на константе
+    rng = np.random.default_rng(width * height)
+    gradient = np.linspace(0, 255, width)[np.newaxis, :, np.newaxis] * np.linspace(0.2, 1, height)[:, np.newaxis, np.newaxis]
+    frame = np.clip(gradient + rng.integers(-40, 40, (height, width, 3)), 0, 255).astype(np.uint8)
+    expected = np.array(baseline_colors(frame, color_format, pixel_selection, output_color_format, 50, 50))
+    actual = np.array(worker_colors(frame, color_format, pixel_selection, output_color_format, 50, 50))
+    assert actual.shape == expected.shape
+    assert np.abs(actual - expected).max() <= 1
@@ -0,0 +1,28 @@
+"""Форматы с номером первого кадра и шагом (.ambf, .ambz) и пропуски в номерах кадров."""
+import numpy as np
+import pytest
+
+import ambilight_extractor as ae
+
+@pytest.mark.parametrize("extension", [".ambf", ".ambz"])
+def test_missing_frames_repeat_previous_frame(tmp_path, extension):
+    path = str(tmp_path / f"colors{extension}")
+    block = np.arange(4 * 2 * 3, dtype=np.uint8).reshape(4, 2, 3)
+    writer = ae.create_frame_writer(path, 30.0, ae.ColorFormat.RGB, 1)
+    writer.write_frames([1, 2, 3, 5], block, [])
+    writer.write_frames([7], block[:1], [])
+    writer.close()
+
+    frame_numbers, array, _, _ = ae.load_frames_file(path)
+    assert frame_numbers == [1, 2, 3, 4, 5, 6, 7]
+    expected = np.stack([block[0], block[1], block[2], block[2], block[3], block[3], block[0]])
+    np.testing.assert_array_equal(array, expected)
+
+@pytest.mark.parametrize("extension", [".ambf", ".ambz"])
+def test_write_block_rejects_gap(tmp_path, extension):
+    writer = ae.create_frame_writer(str(tmp_path / f"colors{extension}"), 30.0, ae.ColorFormat.RGB, 1)
+    block = np.zeros((2, 2, 3), dtype=np.uint8)
+    writer.write_block(1, block, [])
+    with pytest.raises(ValueError):
+        writer.write_block(4, block, [])
+    writer.close()
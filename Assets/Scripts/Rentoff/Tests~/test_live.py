@@ -0,0 +1,68 @@
+"""Живой режим: источник - файл вместо камеры, получатель - UDP-сокет на localhost."""
+import os
+import socket
+import subprocess
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+import ambilight_extractor as ae
+
+CLI_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ambilight_cli.py")
+
+@pytest.fixture
+def gradient_video(video_factory) -> str:
+    x = np.linspace(0, 255, 160)[np.newaxis, :, np.newaxis]
+    y = np.linspace(0, 255, 90)[:, np.newaxis, np.newaxis]
+    frames = [
+        np.concatenate([np.broadcast_to(x, (90, 160, 1)), np.broadcast_to(y, (90, 160, 1)), np.full((90, 160, 1), index * 6)], axis=2).astype(np.uint8)
+        for index in range(40)
+    ]
+    return video_factory("gradient", frames)
+
+class UdpSink:
+    """Принимает датаграммы в отдельном потоке, пока они приходят чаще timeout."""
+    def __init__(self, timeout: float = 2.0) -> None:
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(timeout)
+        self.port = self.sock.getsockname()[1]
+        self.packets = []
+        self._thread = threading.Thread(target=self._receive, daemon=True)
+        self._thread.start()
+
+    def _receive(self) -> None:
+        try:
+            while True:
+                self.packets.append(self.sock.recvfrom(65535)[0])
+        except socket.timeout:
+            pass
+
+    def colors(self) -> np.ndarray:
+        self._thread.join()
+        self.sock.close()
+        return np.stack([np.frombuffer(packet, dtype=np.uint8).reshape(-1, 3) for packet in self.packets])
+
+def test_live_matches_offline_extraction(gradient_video):
+    config = ae.VideoConfig(None)
+    config.apply_overrides({"zones": "left,right"})
+    sink = UdpSink()
+    source = ae.LiveFrameSource(gradient_video, ae.DropPolicy.BLOCK, realtime=False)
+    stats = ae.LiveColorProcessor(config, source, ae.UdpSender("127.0.0.1", sink.port)).run()
+
+    expected = ae.extract(gradient_video, zones="left,right", params={"num_processes": 0})
+    assert stats["sent"] == len(expected) and stats["dropped"] == 0
+    np.testing.assert_array_equal(sink.colors(), expected.reshape(len(expected), -1, 3))
+
+def test_live_cli_does_not_read_stdin(tmp_path, gradient_video):
+    sink = UdpSink()
+    result = subprocess.run(
+        [sys.executable, CLI_PATH, "--live", gradient_video, "--live-protocol", "udp", "--live-host", "127.0.0.1",
+         "--live-port", str(sink.port), "--drop-policy", "block", "--pixel-selection", "top"],
+        stdin=subprocess.DEVNULL, capture_output=True, text=True, cwd=str(tmp_path), timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    colors = sink.colors()
+    assert colors.shape == (40, 50, 3)
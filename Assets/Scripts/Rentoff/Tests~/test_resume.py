@@ -0,0 +1,77 @@
+"""Продолжение прерванной обработки (--resume) даёт те же файлы, что и непрерывная обработка."""
+import hashlib
+import json
+import os
+
+import pytest
+
+import ambilight_extractor as ae
+
+MAPPING = {"strips": [
+    {"name": "l", "zone": "left", "output": "dmx", "universe": 1, "channel": 1, "format": "rgbw"},
+    {"name": "t", "zone": "top", "output": "dmx", "universe": 2, "channel": 1, "format": "rgb"},
+    {"name": "s1", "zone": "top", "output": "spi", "mode": "rgb", "brightness": 0.8, "gamma": 2.2},
+    {"name": "s2", "zone": "left", "output": "spi", "mode": "rgbw", "leds_per_segment": 2},
+    {"name": "s3", "zone": "right", "output": "spi", "mode": "mono1"},
+]}
+
+def make_processor(video_path: str, output_path: str, mapping_path: str, output_format: str, scene_detection: bool) -> ae.VideoColorProcessor:
+    config = ae.VideoConfig(None)
+    config.apply_overrides(dict(
+        output_format=output_format,
+        zones="left,right,top",
+        mapping_path=mapping_path,
+        num_processes=0,
+        batch_size=8,
+        checkpoint_interval=16,
+        cache_enabled=False,
+        save_video=False,
+        scene_detection=scene_detection,
+    ))
+    return ae.VideoColorProcessor(video_path, output_path, config)
+
+def digests(directory: str) -> dict:
+    result = {}
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), 'rb') as f:
+            result[name] = hashlib.sha256(f.read()).hexdigest()
+    return result
+
+@pytest.mark.parametrize("output_format, scene_detection", [
+    ("binary", False), ("encoded", False), ("json", False), ("binary", True),
+])
+def test_resume_matches_uninterrupted_run(tmp_path, scene_video, monkeypatch, output_format, scene_detection):
+    mapping_path = str(tmp_path / "mapping.json")
+    with open(mapping_path, 'w', encoding='utf-8') as f:
+        json.dump(MAPPING, f)
+    extension = {"binary": ".ambf", "encoded": ".ambz", "json": ".json"}[output_format]
+    reference_dir = tmp_path / "reference"
+    resumed_dir = tmp_path / "resumed"
+    reference_dir.mkdir()
+    resumed_dir.mkdir()
+
+    make_processor(scene_video, str(reference_dir / f"c{extension}"), mapping_path, output_format, scene_detection).stream_video()
+
+    # Прерывание в конце сцены (контрольная точка на кадре 56): цвета кадров вокруг неё не меняются
+    write = ae.OutputPipeline.write
+    calls = []
+
+    def interrupted_write(self, *args):
+        write(self, *args)
+        calls.append(1)
+        if len(calls) == 7:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(ae.OutputPipeline, "write", interrupted_write)
+    with pytest.raises(KeyboardInterrupt):
+        make_processor(scene_video, str(resumed_dir / f"c{extension}"), mapping_path, output_format, scene_detection).stream_video()
+    monkeypatch.setattr(ae.OutputPipeline, "write", write)
+    assert any(name.endswith(ae.Checkpoint.SUFFIX) for name in os.listdir(resumed_dir))
+
+    make_processor(scene_video, str(resumed_dir / f"c{extension}"), mapping_path, output_format, scene_detection).stream_video(resume=True)
+
+    expected = digests(str(reference_dir))
+    assert {f"c{extension}", "c_dmx.ambp", "c_spi.ambp"} <= set(expected)
+    if scene_detection:
+        assert "c_scenes.json" in expected
+    assert digests(str(resumed_dir)) == expected
@@ -0,0 +1,55 @@
+"""Определение сцен: статичные кадры не искажают цвета и не зависят от разбиения на батчи."""
+import numpy as np
+import pytest
+
+import ambilight_extractor as ae
+
+def extract(video_path: str, scene_detection: bool, batch_size: int = 8) -> np.ndarray:
+    return ae.extract(video_path, zones="left,right", params={
+        "num_processes": 0,
+        "batch_size": batch_size,
+        "smoothing": "none",
+        "scene_detection": scene_detection,
+    })
+
+@pytest.fixture
+def fade_video(video_factory) -> str:
+    """
+    Медленное затемнение: за 4 кадра каждый пиксель темнеет на 1, но в разных кадрах разные
+    пиксели - разность соседних кадров около 0.25, ниже порога static_threshold = 1.
+    """
+    rng = np.random.default_rng(1)
+    base = rng.integers(60, 200, (90, 160, 3)).astype(np.int16)
+    phase = rng.integers(0, 4, (90, 160, 1))
+    return video_factory("fade", [(base - (index + phase) // 4).astype(np.uint8) for index in range(72)])
+
+@pytest.fixture
+def edge_video(video_factory) -> str:
+    """Меняется только узкая полоса у левого края: на весь кадр изменение меньше порога."""
+    frames = []
+    for index in range(48):
+        frame = np.full((90, 160, 3), 100, dtype=np.uint8)
+        frame[:, :8] = 100 + (index % 2) * 15
+        frames.append(frame)
+    return video_factory("edge", frames)
+
+def longest_frozen_run(colors: np.ndarray) -> int:
+    """Наибольшее число подряд идущих кадров с одинаковыми цветами."""
+    longest = run = 1
+    for previous, current in zip(colors, colors[1:]):
+        run = run + 1 if np.array_equal(previous, current) else 1
+        longest = max(longest, run)
+    return longest
+
+def test_slow_fade_is_not_frozen(fade_video):
+    # Сравнение с последним извлечённым кадром: накопленное изменение не ждёт кадра обновления,
+    # цвета не стоят на месте до refresh_interval = 12 кадров
+    assert longest_frozen_run(extract(fade_video, True)) <= 8
+
+def test_change_in_sampled_region_is_not_static(edge_video):
+    np.testing.assert_array_equal(extract(edge_video, True), extract(edge_video, False))
+
+@pytest.mark.parametrize("batch_size", [1, 7, 100])
+def test_scene_detection_does_not_depend_on_batches(scene_video, fade_video, batch_size):
+    for video in (scene_video, fade_video):
+        np.testing.assert_array_equal(extract(video, True, batch_size), extract(video, True, 16))
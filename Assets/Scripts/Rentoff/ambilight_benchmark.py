@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк извлечения цветов на синтетических видео по матрице настроек со сверкой вывода
+с эталонами. Использует ambilight_extractor как библиотеку; запускается через
+python ambilight_cli.py --benchmark DIR [--benchmark-spec PATH] [--report PATH] [--update-golden].
+"""
+
+from __future__ import annotations
+
+import copy
+import csv
+import itertools
+import json
+import logging
+import math
+import os
+import shutil
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from ambilight_extractor import (
+    EXECUTION_SETTINGS, BinaryFrameWriter, FrameCache, OutputFormat, PipelineProfiler,
+    VideoColorProcessor, VideoConfig, cpu_count, cv2, load_frames_file, optional_module,
+)
+
+logger = logging.getLogger(__name__)
+
+class SyntheticVideo(NamedTuple):
+    """Синтетическое тестовое видео бенчмарка. content: gradient, noise, cuts или static."""
+    name: str
+    width: int
+    height: int
+    frames: int
+    content: str
+
+def generate_synthetic_video(path: str, video: SyntheticVideo, fps: float = 30.0, seed: int = 0) -> str:
+    """
+    Записывает детерминированное тестовое видео через cv2.VideoWriter:
+    gradient - плавно движущийся градиент, noise - случайный шум в каждом кадре,
+    cuts - сцены разного цвета со склейкой каждую секунду, static - один и тот же кадр.
+    """
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0.0, 1.0, video.width, dtype=np.float32)[None, :]
+    y = np.linspace(0.0, 1.0, video.height, dtype=np.float32)[:, None]
+    scene_length = max(1, int(fps))
+    scene_colors = rng.uniform(0, 255, (video.frames // scene_length + 1, 2, 3)).astype(np.float32)
+    static_frame = rng.integers(0, 256, (video.height, video.width, 3), dtype=np.uint8)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (video.width, video.height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Не удалось создать тестовое видео: {path}")
+    try:
+        for index in range(video.frames):
+            if video.content == "gradient":
+                phase = index / max(1, video.frames)
+                frame = np.stack([
+                    (x + phase) % 1.0 * np.ones_like(y),
+                    (y + 2 * phase) % 1.0 * np.ones_like(x),
+                    np.broadcast_to(0.5 + 0.5 * math.sin(2 * math.pi * phase), (video.height, video.width)),
+                ], axis=2) * 255
+            elif video.content == "noise":
+                frame = rng.integers(0, 256, (video.height, video.width, 3), dtype=np.uint8)
+            elif video.content == "cuts":
+                start, end = scene_colors[index // scene_length]
+                frame = start + (end - start) * x[..., None] * np.ones_like(y)[..., None]
+            elif video.content == "static":
+                frame = static_frame
+            else:
+                raise ValueError(f"Неизвестный тип тестового видео: {video.content}")
+            writer.write(np.ascontiguousarray(frame, dtype=np.uint8))
+    finally:
+        writer.release()
+    return path
+
+class BenchmarkSuite:
+    """
+    Бенчмарк извлечения цветов: синтетические видео, прогон по матрице настроек
+    (любые атрибуты VideoConfig), скорость, задержка батча и память по данным PipelineProfiler.
+    Вывод каждого прогона сверяется с эталоном в <directory>/golden: эталон общий для
+    прогонов, отличающихся только параметрами выполнения (EXECUTION_SETTINGS), поэтому
+    ускорение, меняющее цвета, показывается как mismatch.
+    Пиковая память главного процесса монотонна в пределах запуска, память воркеров - по прогону.
+    """
+    VIDEOS = [
+        SyntheticVideo("gradient_360p", 640, 360, 300, "gradient"),
+        SyntheticVideo("noise_720p", 1280, 720, 150, "noise"),
+        SyntheticVideo("cuts_720p", 1280, 720, 300, "cuts"),
+        SyntheticVideo("static_1080p", 1920, 1080, 120, "static"),
+    ]
+    MATRIX: Dict[str, List[Any]] = {
+        "color_format": ["rgb", "hsv"],
+        "pixel_selection": ["left", "top"],
+        "batch_size": [50, 200],
+        "num_processes": sorted({1, max(1, cpu_count() // 2)}),
+    }
+
+    def __init__(
+        self,
+        directory: str,
+        config: VideoConfig,
+        videos: Optional[List[SyntheticVideo]] = None,
+        matrix: Optional[Dict[str, List[Any]]] = None,
+        repeats: int = 1,
+        update_golden: bool = False
+    ) -> None:
+        self.directory: str = directory
+        self.config: VideoConfig = config
+        self.videos: List[SyntheticVideo] = videos if videos is not None else list(self.VIDEOS)
+        self.matrix: Dict[str, List[Any]] = matrix if matrix is not None else dict(self.MATRIX)
+        self.repeats: int = max(1, repeats)
+        self.update_golden: bool = update_golden
+        self.results: List[Dict[str, Any]] = []
+
+    @classmethod
+    def from_spec(cls, path: str, directory: str, update_golden: bool = False) -> "BenchmarkSuite":
+        """
+        Читает описание бенчмарка (JSON или YAML):
+            {"config": "config.ini", "settings": {"smoothing": "none"}, "repeats": 3,
+             "videos": [{"name": "hd", "width": 1920, "height": 1080, "frames": 200, "content": "noise"}],
+             "matrix": {"color_format": ["rgb"], "batch_size": [100, 400], "segmented_decode": [false, true]}}
+        Отсутствующие videos и matrix берутся по умолчанию.
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            if path.lower().endswith((".yaml", ".yml")):
+                yaml = optional_module("yaml")
+                if yaml is None:
+                    raise RuntimeError("Для описания бенчмарка в YAML нужен модуль PyYAML")
+                data = yaml.safe_load(f)
+            else:
+                data = json.load(f)
+        config_path = data.get("config", "config.ini")
+        if not os.path.isabs(config_path):
+            config_path = os.path.join(os.path.dirname(path), config_path)
+        config = VideoConfig(config_path)
+        config.apply_overrides(data.get("settings", {}))
+        videos = [SyntheticVideo(**video) for video in data["videos"]] if "videos" in data else None
+        return cls(directory, config, videos, data.get("matrix"), data.get("repeats", 1), update_golden)
+
+    def prepare_video(self, video: SyntheticVideo) -> str:
+        """Путь к тестовому видео; видео создаётся, если его ещё нет."""
+        path = os.path.join(self.directory, "videos", f"{video.name}_{video.width}x{video.height}_{video.frames}_{video.content}.mp4")
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            logger.info(f"Создание тестового видео {path}")
+            generate_synthetic_video(path + ".part.mp4", video)
+            os.replace(path + ".part.mp4", path)
+        return path
+
+    def cases(self) -> List[Dict[str, Any]]:
+        names = list(self.matrix)
+        return [dict(zip(names, values)) for values in itertools.product(*(self.matrix[name] for name in names))]
+
+    def make_config(self, case: Dict[str, Any]) -> VideoConfig:
+        config = copy.copy(self.config)
+        # Один край по pixel_selection, бинарный вывод, без кэша и контрольных точек
+        config.zones = []
+        config.apply_overrides(dict(
+            output_format=OutputFormat.BINARY.value,
+            save_video=False,
+            cache_enabled=False,
+            checkpoint_interval=0,
+            mapping_path="",
+        ))
+        config.apply_overrides(case)
+        return config
+
+    def golden_name(self, video: SyntheticVideo, case: Dict[str, Any]) -> str:
+        parts = [video.name] + [f"{name}-{value}" for name, value in case.items() if name not in EXECUTION_SETTINGS]
+        return "_".join(str(part) for part in parts)
+
+    def compare_golden(self, name: str, output_path: str, video_path: str, config: VideoConfig) -> Tuple[str, int]:
+        """
+        Сверяет вывод с эталоном. Возвращает (статус, наибольшее отличие канала):
+        ok, mismatch, new (эталона не было), updated (--update-golden) или stale -
+        эталон снят с другими настройками или другим тестовым видео и не сравнивается.
+        """
+        golden_dir = os.path.join(self.directory, "golden")
+        golden_path = os.path.join(golden_dir, name + BinaryFrameWriter.EXTENSION)
+        meta_path = golden_path + ".json"
+        video_digest = FrameCache.hash_file(video_path)
+        settings = {key: value for key, value in vars(config).items() if key not in EXECUTION_SETTINGS}
+        meta = {"settings": FrameCache.make_key("golden", settings), "video": video_digest}
+
+        if os.path.exists(golden_path) and not self.update_golden:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                if json.load(f) != meta:
+                    return "stale", 0
+            _, expected, _, _ = load_frames_file(golden_path)
+            _, actual, _, _ = load_frames_file(output_path)
+            if expected.shape != actual.shape:
+                return "mismatch", 255
+            difference = int(np.abs(expected.astype(np.int16) - actual.astype(np.int16)).max(initial=0))
+            return ("ok" if difference == 0 else "mismatch"), difference
+
+        status = "updated" if os.path.exists(golden_path) else "new"
+        os.makedirs(golden_dir, exist_ok=True)
+        shutil.copyfile(output_path, golden_path)
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        return status, 0
+
+    def run_case(self, video: SyntheticVideo, video_path: str, case: Dict[str, Any]) -> Dict[str, Any]:
+        config = self.make_config(case)
+        output_path = os.path.join(self.directory, "runs", f"{self.golden_name(video, case)}.json")
+        best: Optional[Dict[str, Any]] = None
+        for _ in range(self.repeats):
+            processor = VideoColorProcessor(video_path, output_path, config)
+            processor.profiler = PipelineProfiler()
+            processor.stream_video()
+            report = processor.profiler.report()
+            if best is None or report["wall_seconds"] < best["wall_seconds"]:
+                best = report
+        task = best["stages"]["workers"].get("task", {})
+        status, difference = self.compare_golden(self.golden_name(video, case), processor.output_file_path(), video_path, config)
+        return dict(
+            {"video": video.name, "resolution": f"{video.width}x{video.height}", "content": video.content},
+            **case,
+            frames=best["frames"],
+            wall_seconds=best["wall_seconds"],
+            fps=best["fps"],
+            batch_latency_ms=task.get("ms_per_item", 0.0),
+            worker_utilization=best["workers"]["utilization"],
+            main_peak_rss_mb=best["main_peak_rss_mb"],
+            worker_peak_rss_mb=best["workers"]["peak_rss_mb"],
+            golden=status,
+            max_difference=difference,
+        )
+
+    def run(self) -> List[Dict[str, Any]]:
+        cases = self.cases()
+        self.results = []
+        for video in self.videos:
+            video_path = self.prepare_video(video)
+            for case in cases:
+                logger.info(f"Бенчмарк {video.name}: {case}")
+                result = self.run_case(video, video_path, case)
+                self.results.append(result)
+                logger.info(f"  {result['fps']} кадров/с, батч {result['batch_latency_ms']} мс, эталон: {result['golden']}")
+        return self.results
+
+    def save(self, path: str) -> None:
+        """Пишет результаты в JSON или CSV (по расширению файла)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if path.lower().endswith(".csv"):
+            columns = list(dict.fromkeys(key for result in self.results for key in result))
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=columns)
+                writer.writeheader()
+                writer.writerows(self.results)
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({"cpu_count": cpu_count(), "opencv": cv2.__version__, "results": self.results}, f, ensure_ascii=False, indent=2)
+        logger.info(f"Результаты бенчмарка сохранены в {path}")
+
+def run_benchmark(directory: str, spec_path: Optional[str] = None, report_path: Optional[str] = None, update_golden: bool = False) -> int:
+    """Выполняет бенчмарк и пишет отчёт. Код завершения 1, если вывод какого-либо прогона разошёлся с эталоном."""
+    if spec_path:
+        suite = BenchmarkSuite.from_spec(spec_path, directory, update_golden)
+    else:
+        suite = BenchmarkSuite(directory, VideoConfig(), update_golden=update_golden)
+    results = suite.run()
+    suite.save(report_path or os.path.join(directory, "benchmark.json"))
+    mismatches = [result for result in results if result["golden"] == "mismatch"]
+    for result in mismatches:
+        case = {name: result[name] for name in suite.matrix}
+        logger.error(f"Вывод отличается от эталона: {result['video']} {case} (до {result['max_difference']})")
+    stale = sum(result["golden"] == "stale" for result in results)
+    if stale:
+        logger.warning(f"Эталонов с другими настройками или видео: {stale}, обновите их с --update-golden")
+    return 1 if mismatches else 0
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Командная строка обработки видео: разбор аргументов, интерактивные запросы параметров,
+пакетная обработка, сервер, бенчмарк и живой режим. Сама обработка - в ambilight_extractor.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sys
+from typing import Any, Dict
+
+from ambilight_extractor import (
+    ArtNetSender, BinaryFrameWriter, ColorFormat, ColorPrecision, DecodeBackend, DitherMode, DropPolicy,
+    EncodedFrameWriter, FrameCodec, LiveColorProcessor, LiveFrameSource, LiveProtocol, OutputFormat,
+    PipelineProfiler, PixelSelection, SmoothingFilter, UdpSender, VideoColorProcessor, VideoConfig,
+    benchmark_decoders, configure_logging, convert_json_to_binary, export_packets, parse_zone_list,
+    resmooth_file, run_batch,
+)
+from ambilight_server import run_server
+
+logger = logging.getLogger(__name__)
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Обработка видео: извлечение цветов и сохранение уменьшенной копии",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--video-path", type=str, help="Путь к входному видео файлу")
+    parser.add_argument("--output-path", type=str, help="Путь для выходного JSON файла")
+    parser.add_argument("--target-height", type=int, default=50, help="Целевая высота для боковых пикселей")
+    parser.add_argument("--target-width", type=int, default=50, help="Целевая ширина для верхних/нижних пикселей")
+    parser.add_argument("--color-format", type=str, default="rgb", choices=[cf.value for cf in ColorFormat], help="Цветовой формат для обработки видео")
+    parser.add_argument("--pixel-selection", type=str, choices=[ps.value for ps in PixelSelection], help="Область пикселей без запроса у пользователя")
+    parser.add_argument("--output-color-format", type=str, choices=[cf.value for cf in ColorFormat], help="Цветовой формат вывода без запроса у пользователя")
+    parser.add_argument("--max-frames", type=int, default=0, help="Максимальное количество кадров (0 - все)")
+    parser.add_argument("--frame-skip", type=int, default=0, help="Количество пропускаемых кадров")
+    parser.add_argument("--shared-memory", action="store_true", help="Передавать кадры воркерам через разделяемую память")
+    parser.add_argument("--segmented", action="store_true", help="Параллельное декодирование сегментов видео в воркерах")
+    parser.add_argument("--zones", type=str, help="Несколько краёв за один проход, например left,right:60,top (дополняет зоны из config.ini)")
+    parser.add_argument("--output-format", type=str, choices=[of.value for of in OutputFormat], help="Формат выходного файла (json, бинарный .ambf или сжатый .ambz)")
+    parser.add_argument("--codec", type=str, choices=[fc.value for fc in FrameCodec], help="Энтропийный кодер сжатого формата")
+    parser.add_argument("--keyframe-interval", type=int, help="Интервал ключевых кадров сжатого формата")
+    parser.add_argument("--convert-json", type=str, help="Конвертировать готовый JSON в бинарный (или сжатый с --output-format encoded) формат и выйти")
+    parser.add_argument("--fps", type=float, default=30.0, help="Частота кадров для --convert-json")
+    parser.add_argument("--midpoint", type=float, default=0.5, help="Точка перегиба S-образной кривой (0-1)")
+    parser.add_argument("--steepness", type=float, default=10.0, help="Крутизна S-образной кривой")
+    parser.add_argument("--gamma", type=float, default=1.0, help="Гамма, применяемая поверх S-образной кривой (1 - без изменений)")
+    parser.add_argument("--max-brightness", type=int, default=220, help="Максимальная суммарная яркость пикселя")
+    parser.add_argument("--saturation-factor", type=float, default=1.2, help="Коэффициент усиления насыщенности")
+    parser.add_argument("--temporal-alpha", type=float, default=0.3, help="Коэффициент сглаживания для временной фильтрации (0-1, где 1 = без сглаживания)")
+    parser.add_argument("--smoothing", type=str, default="ema", choices=[sf.value for sf in SmoothingFilter], help="Фильтр временного сглаживания")
+    parser.add_argument("--attack-alpha", type=float, default=0.6, help="Коэффициент сглаживания при росте яркости (attack_release)")
+    parser.add_argument("--release-alpha", type=float, default=0.15, help="Коэффициент сглаживания при спаде яркости (attack_release)")
+    parser.add_argument("--min-cutoff", type=float, default=1.0, help="Минимальная частота среза, Гц (one_euro)")
+    parser.add_argument("--beta", type=float, default=0.05, help="Рост частоты среза со скоростью изменения (one_euro)")
+    parser.add_argument("--d-cutoff", type=float, default=1.0, help="Частота среза для производной, Гц (one_euro)")
+    parser.add_argument("--precision", type=str, choices=[cp.value for cp in ColorPrecision], help="Точность цветового тракта: uint8 или float32 в линейном свете")
+    parser.add_argument("--dither", type=str, choices=[dm.value for dm in DitherMode], help="Дизеринг при переводе итоговых цветов в uint8")
+    parser.add_argument("--stats", type=str, metavar="PATH", help="Сохранить отчёт о времени стадий, очереди и памяти (.json или .csv)")
+    parser.add_argument("--profile", type=str, metavar="DIR", help="Профилировать cProfile главный процесс и каждый воркер, профили - в DIR")
+    parser.add_argument("--scenes", action="store_true", help="Определять статичные кадры и склейки (повтор цветов, сброс сглаживания)")
+    parser.add_argument("--decoder", type=str, choices=[b.value for b in DecodeBackend], help="Декодер видео")
+    parser.add_argument("--decode-benchmark", type=str, metavar="VIDEO", help="Измерить скорость декодирования видео каждым декодером")
+    parser.add_argument("--resume", action="store_true", help="Продолжить прерванную обработку с контрольной точки")
+    parser.add_argument("--auto-tune", action="store_true", help="Подобрать batch_size и num_processes по замерам первых кадров")
+    parser.add_argument("--memory-budget", type=int, metavar="MB", help="Бюджет памяти на кадры в обработке для --auto-tune, МБ")
+    parser.add_argument("--checkpoint-interval", type=int, help="Контрольная точка каждые N кадров (0 - отключить)")
+    parser.add_argument("--cache", action="store_true", help="Использовать дисковый кэш извлечённых цветов")
+    parser.add_argument("--cache-dir", type=str, help="Каталог дискового кэша (включает кэш)")
+    parser.add_argument("--mapping", type=str, help="Файл раскладки лент (JSON): рядом с выводом пишутся пакеты DMX/SPI")
+    parser.add_argument("--export-packets", type=str, help="Экспортировать готовый JSON/.ambf в пакеты DMX/SPI по --mapping и выйти")
+    parser.add_argument("--batch", type=str, help="Пакетная обработка по манифесту (JSON, YAML или INI) без интерактивных запросов")
+    parser.add_argument("--report", type=str, help="Файл отчёта пакетной обработки (по умолчанию <манифест>.report.json) или бенчмарка (.json или .csv)")
+    parser.add_argument("--force", action="store_true", help="Выполнять задачи манифеста, даже если вывод актуален")
+    parser.add_argument("--benchmark", type=str, metavar="DIR", help="Бенчмарк на синтетических видео: видео, эталоны и отчёт - в DIR")
+    parser.add_argument("--benchmark-spec", type=str, metavar="PATH", help="Описание бенчмарка (JSON или YAML): видео, матрица настроек, повторы")
+    parser.add_argument("--update-golden", action="store_true", help="Перезаписать эталоны бенчмарка текущим выводом")
+    parser.add_argument("--serve", type=str, metavar="stdin|[HOST:]PORT", help="Сервер с прогретым пулом: задачи в формате JSON-строк из stdin или по TCP")
+    parser.add_argument("--live", type=str, help="Живой режим: индекс камеры, URL потока (rtsp://, udp://) или файл")
+    parser.add_argument("--live-protocol", type=str, choices=[lp.value for lp in LiveProtocol], help="Протокол отправки в живом режиме")
+    parser.add_argument("--live-host", type=str, help="Адрес получателя в живом режиме")
+    parser.add_argument("--live-port", type=int, help="Порт получателя в живом режиме")
+    parser.add_argument("--universe", type=int, help="Первая вселенная Art-Net")
+    parser.add_argument("--drop-policy", type=str, choices=[dp.value for dp in DropPolicy], help="Что делать с кадрами, если обработка отстаёт")
+    parser.add_argument("--smooth-file", type=str, help="Повторно сгладить готовый JSON/.ambf без декодирования видео и выйти")
+    return parser.parse_args()
+
+def run_live(args: argparse.Namespace, config: VideoConfig) -> Dict[str, Any]:
+    """Запускает живой режим с параметрами из config.ini и аргументов командной строки."""
+    if args.live_protocol:
+        config.live_protocol = LiveProtocol(args.live_protocol)
+    if args.live_host:
+        config.live_host = args.live_host
+    if args.live_port:
+        config.live_port = args.live_port
+    if args.universe is not None:
+        config.start_universe = args.universe
+    if args.drop_policy:
+        config.drop_policy = DropPolicy(args.drop_policy)
+
+    source = LiveFrameSource(args.live, config.drop_policy)
+    if config.live_protocol == LiveProtocol.ARTNET:
+        sender: Any = ArtNetSender(config.live_host, config.live_port, config.start_universe)
+    else:
+        sender = UdpSender(config.live_host, config.live_port)
+    logger.info(f"Отправка {config.live_protocol.value} на {config.live_host}:{config.live_port}")
+    return LiveColorProcessor(config, source, sender).run(config.max_frames)
+
+def main() -> None:
+    configure_logging()
+    try:
+        args = parse_arguments()
+        if args.serve:
+            sys.exit(run_server(args.serve))
+        if args.batch:
+            sys.exit(run_batch(args.batch, args.report, args.force, progress=True))
+        if args.benchmark:
+            # Бенчмарк - отдельный модуль рядом с этим, загружается только для --benchmark
+            from ambilight_benchmark import run_benchmark
+            sys.exit(run_benchmark(args.benchmark, args.benchmark_spec, args.report, args.update_golden))
+        config = VideoConfig(create=True)
+        if args.codec:
+            config.codec = FrameCodec(args.codec)
+        if args.keyframe_interval:
+            config.encoded_keyframe_interval = args.keyframe_interval
+        if args.convert_json:
+            extension = EncodedFrameWriter.EXTENSION if args.output_format == OutputFormat.ENCODED.value else BinaryFrameWriter.EXTENSION
+            output_path = args.output_path or os.path.splitext(args.convert_json.removesuffix(".gz"))[0] + extension
+            options = dict(keyframe_interval=config.encoded_keyframe_interval, codec=config.codec) if output_path.endswith(EncodedFrameWriter.EXTENSION) else {}
+            convert_json_to_binary(args.convert_json, output_path, args.fps, **options)
+            return
+        if args.export_packets:
+            if not args.mapping:
+                raise ValueError("Для --export-packets нужен файл раскладки --mapping")
+            export_packets(args.export_packets, args.mapping, args.output_path, args.fps)
+            return
+        config.smoothing = SmoothingFilter(args.smoothing)
+        config.temporal_alpha = args.temporal_alpha
+        config.attack_alpha = args.attack_alpha
+        config.release_alpha = args.release_alpha
+        config.min_cutoff = args.min_cutoff
+        config.beta = args.beta
+        config.d_cutoff = args.d_cutoff
+        # Параметры S-образной кривой, ограничения яркости и усиления насыщенности (из аргументов).
+        # Передаются воркерам через конфигурацию, таблица S-кривой строится один раз в process_video.
+        config.midpoint = args.midpoint
+        config.steepness = args.steepness
+        config.gamma = args.gamma
+        config.max_brightness = args.max_brightness
+        config.saturation_factor = args.saturation_factor
+        if args.precision:
+            config.precision = ColorPrecision(args.precision)
+        if args.dither:
+            config.dithering = DitherMode(args.dither)
+        if args.smooth_file:
+            name, ext = os.path.splitext(args.smooth_file.removesuffix(".gz"))
+            output_path = args.output_path or f"{name}_smoothed{ext}" + (".gz" if args.smooth_file.endswith(".gz") else "")
+            resmooth_file(args.smooth_file, output_path, config, args.fps)
+            return
+
+        # Применение аргументов командной строки, если они предоставлены
+        if args.color_format:
+            config.color_format = ColorFormat(args.color_format)
+        if args.max_frames:
+            config.max_frames = args.max_frames
+        if args.frame_skip:
+            config.frame_skip = args.frame_skip
+        if args.target_height:
+            config.target_height = args.target_height
+        if args.target_width:
+            config.target_width = args.target_width
+        if args.shared_memory:
+            config.shared_memory = True
+        if args.segmented:
+            config.segmented_decode = True
+        if args.checkpoint_interval is not None:
+            config.checkpoint_interval = args.checkpoint_interval
+        if args.auto_tune:
+            config.auto_tune = True
+        if args.memory_budget:
+            config.memory_budget_mb = args.memory_budget
+        if args.cache or args.cache_dir:
+            config.cache_enabled = True
+        if args.cache_dir:
+            config.cache_dir = args.cache_dir
+        if args.mapping:
+            config.mapping_path = args.mapping
+        if args.output_format:
+            config.output_format = OutputFormat(args.output_format)
+        if args.zones:
+            config.zones = config.zones + parse_zone_list(args.zones, config.target_height, config.target_width)
+        if args.decoder:
+            config.decoder = DecodeBackend(args.decoder)
+        if args.scenes:
+            config.scene_detection = True
+
+        if args.pixel_selection:
+            config.pixel_selection = PixelSelection(args.pixel_selection)
+        if args.output_color_format:
+            config.output_color_format = ColorFormat(args.output_color_format)
+
+        if args.decode_benchmark:
+            benchmark_decoders(args.decode_benchmark, config)
+            return
+
+        # Живой режим работает без участия пользователя: область и формат - из аргументов или config.ini
+        if args.live:
+            run_live(args, config)
+            return
+
+        # Запрашиваем у пользователя pixel_selection (при заданных зонах используется только для сохраняемого видео)
+        while not config.zones and not args.pixel_selection:
+            pixel_selection_input = input("Выберите область пикселей (left/right/top/bottom, по умолчанию left): ").strip().lower()
+            if not pixel_selection_input or pixel_selection_input in [ps.value for ps in PixelSelection]:
+                config.pixel_selection = PixelSelection(pixel_selection_input or "left")
+                break
+            else:
+                print("Ошибка: Пожалуйста, выберите 'left', 'right', 'top' или 'bottom'.")
+
+        # Запрашиваем у пользователя output_color_format
+        while not args.output_color_format:
+            output_color_format_input = input(f"Выберите цветовой формат для записи в JSON ({', '.join([cf.value for cf in ColorFormat])}, по умолчанию rgb): ").strip().lower()
+            if not output_color_format_input or output_color_format_input in [cf.value for cf in ColorFormat]:
+                config.output_color_format = ColorFormat(output_color_format_input or "rgb")
+                break
+            else:
+                print(f"Ошибка: Пожалуйста, выберите из '{', '.join([cf.value for cf in ColorFormat])}'.")
+
+        # Запрашиваем у пользователя save_video
+        while True:
+            save_video_input = input("Сохранить обработанное видео? (yes/no, по умолчанию no): ").strip().lower()
+            if not save_video_input or save_video_input == 'no':
+                config.save_video = False
+                break
+            elif save_video_input == 'yes':
+                config.save_video = True
+                break
+            else:
+                print("Ошибка: Пожалуйста, выберите 'yes' или 'no'.")
+
+        # Если пути к видео и/или выходному файлу не предоставлены, запрашиваем у пользователя
+        video_path = args.video_path
+        output_json_path = args.output_path
+
+        if not video_path:
+            while True:
+                video_path = input("Введите путь к видео файлу (или нажмите Enter для 'input_video.mp4'): ").strip()
+                if not video_path:
+                    video_path = "input_video.mp4"
+                if os.path.exists(video_path):
+                    break
+                print("Ошибка: Файл не найден. Пожалуйста, введите корректный путь.")
+
+        if not output_json_path:
+            output_json_path = input("Введите путь для выходного JSON файла (или нажмите Enter для 'output/colors.json'): ").strip()
+            if not output_json_path:
+                output_json_path = "output/colors.json"
+
+        processor = VideoColorProcessor(
+            video_path=video_path,
+            output_json_path=output_json_path,
+            config=config
+        )
+
+        # Результаты сглаживаются (эффект ambilight) и записываются по мере обработки батчей
+        processor.progress = True
+        if args.stats or args.profile:
+            processor.profiler = PipelineProfiler(args.profile)
+        processor.stream_video(resume=args.resume)
+        if processor.profiler is not None:
+            report = processor.profiler.save(args.stats or os.path.join(args.profile, "stats.json"))
+            processor.profiler.log_summary(report)
+        logger.info("Скрипт завершен успешно.")
+    except Exception as e:
+        logger.error(f"Произошла критическая ошибка: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
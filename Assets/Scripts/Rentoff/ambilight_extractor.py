@@ -0,0 +1,5145 @@
+#!/usr/bin/env python3
+"""
+Профессиональный скрипт для обработки видео:
+- Уменьшает разрешение каждого кадра
+- Извлекает левый, правый, верхний ИЛИ нижний столбцы/строки пикселей (на выбор пользователя)
+- Конвертирует кадры в указанный цветовой формат (RGB, RGBW, HSV, RGBWMix)
+- Применяет S-образное преобразование к извлеченным цветам
+- Применяет временное сглаживание (Ambilight эффект) для смягчения резких переходов, 
+  т.е. значения цветов зависят также от предыдущих кадров
+- Сохраняет результаты в JSON и обработанное видео
+- Поддержка multiprocessing
+- Сжатый вывод: ключевые кадры и разности между кадрами с энтропийным кодированием
+- Экспорт готовых пакетов устройств (вселенные DMX, hex-строки SPI) по файлу раскладки лент
+- Замеры времени по стадиям конвейера, отчёт JSON/CSV и профилирование cProfile (--stats, --profile)
+- Матрицы светодиодов и карты светильников (CSV/JSON): средние цвета прямоугольников по таблице сумм cv2.integral
+- Автонастройка batch_size и num_processes по замерам разогрева с бюджетом памяти (--auto-tune)
+- Бенчмарк на синтетических видео по матрице настроек со сверкой с эталонами (--benchmark,
+  модуль ambilight_benchmark)
+- Определение статичных кадров и смен сцен: повтор цветов, сброс сглаживания на склейках
+- Выбор декодера: OpenCV или ffmpeg с уменьшением кадров при декодировании
+- Контрольные точки потоковой обработки и продолжение прерванной обработки (--resume)
+- Пакетная обработка набора видео по манифесту без интерактивных запросов
+- Живой режим: захват с камеры или потока и отправка цветов по Art-Net/UDP в реальном времени
+- Библиотечный API без побочных эффектов при импорте (extract, iter_frames) и режим сервера
+  с прогретым пулом воркеров, принимающего задания через stdin или локальный сокет (--serve)
+- Точный режим цветового тракта: float32 в линейном свете до конца сглаживания, гамма вывода
+  в последней стадии и временной дизеринг / перенос ошибки при переводе в 8 бит (--precision, --dither)
+
+Использование как библиотеки (каталог модуля - в sys.path):
+    import ambilight_extractor
+    colors = ambilight_extractor.extract("intro.mp4", zones="left,right", params={"num_processes": 0})
+Модули рядом с этим: ambilight_cli - командная строка (python ambilight_cli.py, python
+ambilight_extractor.py или обёртка "main_ambilight_extractor — копия.py"), ambilight_server -
+сервер с прогретым пулом (ExtractionServer, --serve), ambilight_benchmark - бенчмарк (--benchmark).
+Импорт не настраивает логгирование и не создаёт config.ini; OpenCV, tqdm, multiprocessing
+и необязательные модули загружаются при первом использовании.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import json
+import os
+import logging
+import gzip
+import configparser
+import sys
+import math
+import queue
+import struct
+import hashlib
+import zlib
+import copy
+import shutil
+import shlex
+import subprocess
+import socket
+import threading
+import time
+import pickle
+import csv
+import cProfile
+import contextlib
+import itertools
+import importlib
+from abc import ABC, abstractmethod
+from collections import deque
+from enum import Enum
+from functools import partial, lru_cache
+from typing import Tuple, List, Dict, Any, Optional, NamedTuple, Iterator, TextIO, Callable
+
+try:
+    import resource
+except ImportError:  # нет в Windows: пиковая память не измеряется
+    resource = None
+
+__all__ = [
+    "extract", "iter_frames", "VideoConfig", "VideoColorProcessor", "Zone", "ZoneType", "Fixture",
+    "ColorFormat", "PixelSelection", "OutputFormat", "SmoothingFilter", "ColorPrecision", "DitherMode",
+    "ExtractionServer", "configure_logging",
+]
+
+logger = logging.getLogger(__name__)
+
+def configure_logging(level: int = logging.INFO) -> None:
+    """Настройка логгирования для запуска из командной строки; при импорте не вызывается."""
+    logging.basicConfig(
+        level=level,
+        format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+
+class LazyModule:
+    """Модуль, который импортируется при первом обращении к его атрибутам."""
+    def __init__(self, name: str) -> None:
+        self._name: str = name
+        self._module: Any = None
+
+    def __getattr__(self, attribute: str) -> Any:
+        if attribute in ("_name", "_module"):
+            raise AttributeError(attribute)
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+@lru_cache(maxsize=None)
+def optional_module(name: str) -> Any:
+    """Необязательная зависимость: модуль или None, если он не установлен."""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+cv2 = LazyModule("cv2")
+multiprocessing = LazyModule("multiprocessing")
+multiprocessing_util = LazyModule("multiprocessing.util")
+shared_memory = LazyModule("multiprocessing.shared_memory")
+
+def tqdm(*args, **kwargs) -> Any:
+    """Индикатор прогресса tqdm, загружаемый при первом использовании."""
+    from tqdm import tqdm as progress
+    return progress(*args, **kwargs)
+
+def cpu_count() -> int:
+    return os.cpu_count() or 1
+
+class ColorFormat(Enum):
+    RGB = "rgb"
+    RGBW = "rgbw"
+    HSV = "hsv"
+    RGBWMix = "rgbwmix"
+
+class PixelSelection(Enum):
+    LEFT = "left"
+    RIGHT = "right"
+    TOP = "top"
+    BOTTOM = "bottom"
+
+class OutputFormat(Enum):
+    JSON = "json"
+    BINARY = "binary"
+    ENCODED = "encoded"
+
+class FrameCodec(Enum):
+    AUTO = "auto"  # zstd, если установлен, иначе lz4, иначе zlib
+    ZLIB = "zlib"
+    ZSTD = "zstd"
+    LZ4 = "lz4"
+
+class SmoothingFilter(Enum):
+    NONE = "none"
+    EMA = "ema"
+    ATTACK_RELEASE = "attack_release"
+    ONE_EURO = "one_euro"
+    ZERO_PHASE = "zero_phase"
+
+class ColorPrecision(Enum):
+    UINT8 = "uint8"    # цвета округляются до uint8 после извлечения и цветовой обработки
+    LINEAR = "linear"  # float32 в линейном свете до конца сглаживания, гамма вывода - в последней стадии
+
+class DitherMode(Enum):
+    NONE = "none"                        # округление до ближайшего
+    TEMPORAL = "temporal"                # порог округления меняется от кадра к кадру
+    ERROR_DIFFUSION = "error_diffusion"  # ошибка округления переносится на следующий кадр
+
+class LiveProtocol(Enum):
+    ARTNET = "artnet"
+    UDP = "udp"
+
+class DecodeBackend(Enum):
+    OPENCV = "opencv"  # cv2.VideoCapture, кадры в исходном разрешении
+    FFMPEG = "ffmpeg"  # процесс ffmpeg, кадры уменьшаются при декодировании и передаются через pipe
+
+class DropPolicy(Enum):
+    LATEST = "latest"  # обрабатывается только самый свежий кадр, отстающие отбрасываются
+    BLOCK = "block"    # захват ждёт обработки, кадры не теряются
+
+class SpiDataMode(Enum):
+    # Значения и префиксы строк совпадают с DataMode в LedSPI/LEDTypes.cs
+    MONOCHROME1 = "mono1"
+    MONOCHROME2 = "mono2"
+    RGBW = "rgbw"
+    RGB = "rgb"
+
+class ZoneType(Enum):
+    EDGE = "edge"
+    RECT = "rect"
+    POLYLINE = "polyline"
+    MATRIX = "matrix"
+    PIXELMAP = "pixelmap"
+
+class Fixture(NamedTuple):
+    """Светильник карты пикселей: прямоугольник кадра (0-1) и, при universe, адрес DMX."""
+    id: str
+    rect: Tuple[float, float, float, float]
+    universe: Optional[int] = None
+    channel: int = 1
+    dmx_format: ColorFormat = ColorFormat.RGB
+
+class Zone(NamedTuple):
+    """
+    Именованная зона кадра со своим количеством светодиодов.
+    Координаты rect/points нормированы к размеру кадра (0-1).
+    Матрица (grid = (столбцы, строки)) делит rect на ячейки, светодиоды идут по строкам
+    сверху вниз, слева направо; карта пикселей - по одному светодиоду на светильник fixtures.
+    """
+    name: str
+    zone_type: ZoneType
+    leds: int
+    edge: Optional[PixelSelection] = None
+    rect: Optional[Tuple[float, float, float, float]] = None
+    points: Optional[List[Tuple[float, float]]] = None
+    size: float = 0.0
+    grid: Optional[Tuple[int, int]] = None
+    fixtures: Optional[Tuple[Fixture, ...]] = None
+
+    def cell_rects(self) -> np.ndarray:
+        """Прямоугольники (leds, 4) светодиодов матрицы или карты пикселей: x0, y0, x1, y1 (0-1)."""
+        if self.zone_type == ZoneType.PIXELMAP:
+            return np.array([fixture.rect for fixture in self.fixtures], dtype=np.float64).reshape(-1, 4)
+        columns, rows = self.grid
+        x0, y0, x1, y1 = self.rect
+        xs = np.linspace(min(x0, x1), max(x0, x1), columns + 1)
+        ys = np.linspace(min(y0, y1), max(y0, y1), rows + 1)
+        left, top = np.meshgrid(xs[:-1], ys[:-1])
+        right, bottom = np.meshgrid(xs[1:], ys[1:])
+        return np.stack([left, top, right, bottom], axis=-1).reshape(-1, 4)
+
+def load_pixel_map(path: str) -> Tuple[Fixture, ...]:
+    """
+    Читает карту светильников из CSV (строка заголовка, столбцы id, x0, y0, x1, y1 и
+    необязательные universe, channel, format) или JSON:
+        {"width": 1920, "height": 1080,
+         "fixtures": [{"id": "par1", "rect": [100, 50, 180, 120], "universe": 0, "channel": 1, "format": "rgbw"}]}
+    Координаты нормированы к кадру (0-1); в JSON с width/height они задаются в пикселях.
+    """
+    width = height = 1.0
+    if path.lower().endswith(".csv"):
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            items = [
+                dict(row, rect=[row["x0"], row["y0"], row["x1"], row["y1"]])
+                for row in csv.DictReader(f, skipinitialspace=True)
+            ]
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            width = float(data.get("width", 1.0))
+            height = float(data.get("height", 1.0))
+            data = data["fixtures"]
+        items = data
+
+    fixtures = []
+    for index, item in enumerate(items):
+        fixture_id = str(item.get("id") or index)
+        x0, y0, x1, y1 = (float(value) for value in item["rect"])
+        rect = (min(x0, x1) / width, min(y0, y1) / height, max(x0, x1) / width, max(y0, y1) / height)
+        if rect[0] < 0 or rect[1] < 0 or rect[2] > 1 or rect[3] > 1:
+            raise ValueError(f"Светильник {fixture_id}: прямоугольник выходит за пределы кадра")
+        universe = item.get("universe")
+        fixture = Fixture(
+            id=fixture_id,
+            rect=rect,
+            universe=int(universe) if universe not in (None, "") else None,
+            channel=int(item.get("channel") or 1),
+            dmx_format=ColorFormat(item.get("format") or "rgb")
+        )
+        if fixture.universe is not None:
+            channels = len(DmxPacketEncoder.to_dmx_format(np.zeros((1, 3), dtype=np.uint8), fixture.dmx_format)[0])
+            if not 1 <= fixture.channel <= DmxPacketEncoder.CHANNELS - channels + 1:
+                raise ValueError(f"Светильник {fixture_id}: каналы DMX выходят за пределы вселенной")
+        fixtures.append(fixture)
+    ids = [fixture.id for fixture in fixtures]
+    if len(ids) != len(set(ids)):
+        raise ValueError(f"Идентификаторы светильников в {path} должны быть уникальными")
+    if not fixtures:
+        raise ValueError(f"Карта светильников {path} пуста")
+    return tuple(fixtures)
+
+def parse_zone_list(spec: str, target_height: int, target_width: int) -> List[Zone]:
+    """
+    Разбирает краткую запись зон-краёв вида "left,right:60,top".
+    Без количества используется target_height для боковых краёв и target_width для верхнего/нижнего.
+    """
+    zones = []
+    for item in spec.split(","):
+        item = item.strip().lower()
+        if not item:
+            continue
+        edge_name, _, leds = item.partition(":")
+        edge = PixelSelection(edge_name)
+        default_leds = target_height if edge in [PixelSelection.LEFT, PixelSelection.RIGHT] else target_width
+        zones.append(Zone(edge.value, ZoneType.EDGE, int(leds) if leds else default_leds, edge=edge))
+    return zones
+
+class StripMapping(NamedTuple):
+    """Лента из файла раскладки: какие светодиоды вывода и куда отправляются."""
+    name: str
+    output: str                          # "dmx" или "spi"
+    zone: Optional[str] = None           # зона многозонного вывода (None - весь кадр)
+    start: int = 0                       # первый светодиод внутри зоны
+    leds: Optional[int] = None           # количество светодиодов (None - до конца зоны)
+    reverse: bool = False
+    universe: int = 0                    # DMX: вселенная
+    channel: int = 1                     # DMX: первый канал (1-512)
+    dmx_format: ColorFormat = ColorFormat.RGB
+    mode: SpiDataMode = SpiDataMode.RGB  # SPI: режим данных ленты
+    brightness: float = 1.0
+    gamma: Optional[float] = None        # SPI: гамма-коррекция (None - выключена)
+    leds_per_segment: int = 1            # SPI: каждый цвет повторяется на сегмент светодиодов
+
+def load_strip_mapping(path: str) -> List[StripMapping]:
+    """
+    Читает раскладку лент из JSON:
+        {"strips": [
+            {"name": "left", "zone": "left", "output": "dmx", "universe": 0, "channel": 1, "format": "rgbw"},
+            {"name": "top", "zone": "top", "output": "spi", "mode": "rgb", "brightness": 0.8, "gamma": 2.2}
+        ]}
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    strips = []
+    for index, item in enumerate(data["strips"] if isinstance(data, dict) else data):
+        name = item.get("name", f"strip{index}")
+        output = item.get("output", "dmx")
+        if output not in ("dmx", "spi"):
+            raise ValueError(f"Лента {name}: неизвестный вывод {output}")
+        strip = StripMapping(
+            name=name,
+            output=output,
+            zone=item.get("zone"),
+            start=int(item.get("start", 0)),
+            leds=int(item["leds"]) if item.get("leds") is not None else None,
+            reverse=bool(item.get("reverse", False)),
+            universe=int(item.get("universe", 0)),
+            channel=int(item.get("channel", 1)),
+            dmx_format=ColorFormat(item.get("format", "rgb")),
+            mode=SpiDataMode(item.get("mode", "rgb")),
+            brightness=float(item.get("brightness", 1.0)),
+            gamma=float(item["gamma"]) if item.get("gamma") is not None else None,
+            leds_per_segment=int(item.get("leds_per_segment", 1))
+        )
+        if not 1 <= strip.channel <= 512:
+            raise ValueError(f"Лента {name}: канал DMX должен быть в диапазоне 1-512")
+        if strip.leds_per_segment <= 0:
+            raise ValueError(f"Лента {name}: leds_per_segment должен быть положительным")
+        strips.append(strip)
+    return strips
+
+class EdgeCropPlan(NamedTuple):
+    """
+    Область исходного кадра, из которой после ресайза получается выбранный край.
+    rows/cols - срез исходного кадра, flip - отражение (для правого/нижнего края),
+    fx/fy - масштаб ресайза всего кадра, чтобы INTER_AREA брал те же веса пикселей.
+    """
+    rows: slice
+    cols: slice
+    flip: Optional[int]
+    fx: float
+    fy: float
+
+class VideoConfig:
+    """
+    Конфигурация процесса обработки видео.
+    """
+    def __init__(self, config_path: Optional[str] = "config.ini", create: bool = False) -> None:
+        """
+        Читает config_path; если файла нет (или config_path = None), используются значения
+        по умолчанию. С create отсутствующий файл создаётся со значениями по умолчанию.
+        """
+        self.config = configparser.ConfigParser()
+        if config_path and os.path.exists(config_path):
+            self.config.read(config_path)
+        elif config_path and create:
+            self._create_default_config(config_path)
+
+        self.target_height: int = self.config.getint('processing', 'target_height', fallback=50)
+        self.target_width: int = self.config.getint('processing', 'target_width', fallback=50)
+        self.batch_size: int = self.config.getint('processing', 'batch_size', fallback=100)
+        self.color_format: ColorFormat = ColorFormat(self.config.get('processing', 'color_format', fallback='rgb'))
+        self.compress_output: bool = self.config.getboolean('output', 'compress', fallback=False)
+        self.output_format: OutputFormat = OutputFormat(self.config.get('output', 'format', fallback='json'))
+        # Сжатый вывод: интервал ключевых кадров и энтропийный кодер
+        self.encoded_keyframe_interval: int = self.config.getint('output', 'keyframe_interval', fallback=64)
+        self.codec: FrameCodec = FrameCodec(self.config.get('output', 'codec', fallback='auto'))
+        # Файл раскладки лент: при заданном пути рядом с выводом пишутся готовые пакеты DMX/SPI
+        self.mapping_path: str = self.config.get('output', 'mapping', fallback='')
+        # Дизеринг при переводе итоговых float-цветов в uint8 (плавные тусклые переходы)
+        self.dithering: DitherMode = DitherMode(self.config.get('output', 'dithering', fallback='none'))
+        self.num_processes: int = self.config.getint(
+            'processing', 'num_processes', fallback=max(1, cpu_count() - 1)
+        )
+        self.max_frames: int = self.config.getint('processing', 'max_frames', fallback=0)
+        self.frame_skip: int = self.config.getint('processing', 'frame_skip', fallback=0)
+        # Точность цветового тракта: uint8 или float32 в линейном свете (см. ColorPrecision)
+        self.precision: ColorPrecision = ColorPrecision(self.config.get('processing', 'precision', fallback='uint8'))
+        # Передача кадров воркерам через кольцевой буфер в разделяемой памяти вместо pickle
+        self.shared_memory: bool = self.config.getboolean('processing', 'shared_memory', fallback=False)
+        # Размер кольцевого буфера в кадрах (0 - batch_size * (num_processes + 1))
+        self.ring_slots: int = self.config.getint('processing', 'ring_slots', fallback=0)
+        # Параллельное декодирование: каждый воркер читает свой диапазон кадров своим VideoCapture
+        self.segmented_decode: bool = self.config.getboolean('processing', 'segmented_decode', fallback=False)
+        # Количество сегментов (0 - num_processes * 2)
+        self.segments: int = self.config.getint('processing', 'segments', fallback=0)
+        # Интервал ключевых кадров (GOP) для выравнивания начала сегментов (0 - без выравнивания)
+        self.keyframe_interval: int = self.config.getint('processing', 'keyframe_interval', fallback=0)
+        # Декодер видео и параметры ffmpeg
+        self.decoder: DecodeBackend = DecodeBackend(self.config.get('processing', 'decoder', fallback='opencv'))
+        # Короткая сторона кадров, декодируемых ffmpeg (0 - по наибольшему размеру выборки)
+        self.decode_size: int = self.config.getint('processing', 'decode_size', fallback=0)
+        self.ffmpeg_path: str = self.config.get('processing', 'ffmpeg_path', fallback='ffmpeg')
+        # Дополнительные параметры декодера ffmpeg перед -i, например "-skip_loop_filter all -lowres 1"
+        self.ffmpeg_options: str = self.config.get('processing', 'ffmpeg_options', fallback='')
+        # Автонастройка batch_size и num_processes по замерам первых warmup_frames кадров
+        self.auto_tune: bool = self.config.getboolean('processing', 'auto_tune', fallback=False)
+        self.warmup_frames: int = self.config.getint('processing', 'warmup_frames', fallback=24)
+        # Бюджет памяти на кадры в обработке, МБ (0 - четверть физической памяти)
+        self.memory_budget_mb: int = self.config.getint('processing', 'memory_budget_mb', fallback=0)
+        # Контрольная точка для продолжения обработки через каждые N записанных кадров (0 - отключено)
+        self.checkpoint_interval: int = self.config.getint('processing', 'checkpoint_interval', fallback=1000)
+        # Дисковый кэш извлечённых цветов: повторная цветокоррекция без декодирования видео
+        self.cache_enabled: bool = self.config.getboolean('cache', 'enabled', fallback=False)
+        self.cache_dir: str = self.config.get('cache', 'directory', fallback='.ambilight_cache')
+        self.cache_max_size_mb: int = self.config.getint('cache', 'max_size_mb', fallback=2048)
+        # Живой режим: куда и как отправлять цвета
+        self.live_protocol: LiveProtocol = LiveProtocol(self.config.get('live', 'protocol', fallback='artnet'))
+        self.live_host: str = self.config.get('live', 'host', fallback='127.0.0.1')
+        self.live_port: int = self.config.getint('live', 'port', fallback=ArtNetSender.PORT)
+        self.start_universe: int = self.config.getint('live', 'start_universe', fallback=0)
+        self.drop_policy: DropPolicy = DropPolicy(self.config.get('live', 'drop_policy', fallback='latest'))
+        # Определение сцен по средней разности яркости миниатюр соседних кадров (0-255)
+        self.scene_detection: bool = self.config.getboolean('scenes', 'enabled', fallback=False)
+        # Ниже порога кадр считается статичным и повторяет цвета предыдущего
+        self.static_threshold: float = self.config.getfloat('scenes', 'static_threshold', fallback=1.0)
+        # Выше порога - склейка: сглаживание начинается заново
+        self.cut_threshold: float = self.config.getfloat('scenes', 'cut_threshold', fallback=30.0)
+        # Каждый N-й кадр извлекается заново, даже если статичен: медленные изменения не накапливаются
+        self.refresh_interval: int = self.config.getint('scenes', 'refresh_interval', fallback=12)
+        # Область пикселей и формат вывода: без аргументов командной строки запрашиваются у пользователя,
+        # кроме живого режима - он берёт значения отсюда
+        self.pixel_selection: PixelSelection = PixelSelection(self.config.get('processing', 'pixel_selection', fallback='left'))
+        self.save_video: bool = False  # по умолчанию, запросим у пользователя
+        self.output_color_format: ColorFormat = ColorFormat(self.config.get('output', 'color_format', fallback='rgb'))
+        # Параметры цветовой обработки, задаются из аргументов командной строки
+        self.midpoint: float = 0.5
+        self.steepness: float = 10.0
+        self.gamma: float = 1.0
+        self.max_brightness: int = 220
+        self.saturation_factor: float = 1.2
+        # Параметры временного сглаживания, задаются из аргументов командной строки
+        self.smoothing: SmoothingFilter = SmoothingFilter.EMA
+        self.temporal_alpha: float = 0.3
+        self.attack_alpha: float = 0.6
+        self.release_alpha: float = 0.15
+        self.min_cutoff: float = 1.0
+        self.beta: float = 0.05
+        self.d_cutoff: float = 1.0
+        # Зоны извлечения из секций [zone:<имя>]; пустой список - одна зона по pixel_selection
+        self.zones: List[Zone] = self._load_zones()
+
+    def apply_overrides(self, values: Dict[str, Any]) -> None:
+        """
+        Переопределяет параметры по словарю {имя атрибута: значение} (например, из манифеста).
+        Значения приводятся к типу текущего атрибута; zones задаются строкой как в --zones.
+        """
+        zones = None
+        for key, value in values.items():
+            name = key.replace("-", "_")
+            if name == "zones":
+                zones = value if isinstance(value, str) else ",".join(value)
+                continue
+            if name == "config" or name not in vars(self):
+                raise ValueError(f"Неизвестный параметр конфигурации: {key}")
+            current = getattr(self, name)
+            if isinstance(current, Enum):
+                value = type(current)(str(value).lower())
+            elif isinstance(current, bool):
+                value = value if isinstance(value, bool) else str(value).strip().lower() in ("1", "yes", "true", "on")
+            elif isinstance(current, int):
+                value = int(value)
+            elif isinstance(current, float):
+                value = float(value)
+            else:
+                value = str(value)
+            setattr(self, name, value)
+        if zones is not None:
+            self.zones = parse_zone_list(zones, self.target_height, self.target_width)
+
+    def _load_zones(self) -> List[Zone]:
+        """
+        Читает зоны из секций вида:
+            [zone:left]            [zone:panel]                  [zone:arc]
+            type = edge            type = rect                   type = polyline
+            edge = left            rect = 0.1, 0.1, 0.3, 0.9     points = 0,1; 0.5,0.2; 1,1
+            leds = 50              leds = 30                     leds = 120
+                                                                 size = 0.02
+            [zone:wall]            [zone:stage]
+            type = matrix          type = pixelmap
+            rect = 0, 0, 1, 1      map = fixtures.csv
+            columns = 32
+            rows = 18
+        Количество светодиодов матрицы - columns * rows, карты пикселей - число светильников.
+        """
+        zones = []
+        for section in self.config.sections():
+            if not section.startswith("zone:"):
+                continue
+            name = section[len("zone:"):].strip()
+            zone_type = ZoneType(self.config.get(section, 'type', fallback='edge'))
+            if zone_type == ZoneType.MATRIX:
+                columns = self.config.getint(section, 'columns')
+                rows = self.config.getint(section, 'rows')
+                if columns <= 0 or rows <= 0:
+                    raise ValueError(f"Размер матрицы зоны {name} должен быть положительным")
+                rect = tuple(float(v) for v in self.config.get(section, 'rect', fallback='0, 0, 1, 1').split(","))
+                if len(rect) != 4:
+                    raise ValueError(f"Прямоугольник зоны {name} задаётся четырьмя числами x0, y0, x1, y1")
+                zones.append(Zone(name, zone_type, columns * rows, rect=rect, grid=(columns, rows)))
+                continue
+            if zone_type == ZoneType.PIXELMAP:
+                fixtures = load_pixel_map(self.config.get(section, 'map'))
+                zones.append(Zone(name, zone_type, len(fixtures), fixtures=fixtures))
+                continue
+            leds = self.config.getint(section, 'leds')
+            if leds <= 0:
+                raise ValueError(f"Количество светодиодов зоны {name} должно быть положительным")
+            if zone_type == ZoneType.EDGE:
+                zones.append(Zone(name, zone_type, leds, edge=PixelSelection(self.config.get(section, 'edge', fallback=name))))
+            elif zone_type == ZoneType.RECT:
+                rect = tuple(float(v) for v in self.config.get(section, 'rect').split(","))
+                if len(rect) != 4:
+                    raise ValueError(f"Прямоугольник зоны {name} задаётся четырьмя числами x0, y0, x1, y1")
+                zones.append(Zone(name, zone_type, leds, rect=rect))
+            else:
+                points = [tuple(float(v) for v in point.split(",")) for point in self.config.get(section, 'points').split(";")]
+                if len(points) < 2:
+                    raise ValueError(f"Ломаная зоны {name} должна содержать хотя бы две точки")
+                zones.append(Zone(name, zone_type, leds, points=points, size=self.config.getfloat(section, 'size', fallback=0.0)))
+        return zones
+
+    def _create_default_config(self, config_path: str) -> None:
+        self.config['processing'] = {
+            'target_height': '50',
+            'target_width': '50',
+            'batch_size': '100',
+            'color_format': 'rgb',
+            'pixel_selection': 'left',
+            'num_processes': str(max(1, cpu_count() - 1)),
+            'max_frames': '0',
+            'frame_skip': '0',
+            'precision': 'uint8',
+            'shared_memory': 'False',
+            'ring_slots': '0',
+            'segmented_decode': 'False',
+            'segments': '0',
+            'keyframe_interval': '0',
+            'checkpoint_interval': '1000',
+            'auto_tune': 'False',
+            'warmup_frames': '24',
+            'memory_budget_mb': '0',
+            'decoder': 'opencv',
+            'decode_size': '0',
+            'ffmpeg_path': 'ffmpeg',
+            'ffmpeg_options': '',
+        }
+        self.config['output'] = {
+            'compress': 'False',
+            'format': 'json',
+            'color_format': 'rgb',
+            'keyframe_interval': '64',
+            'codec': 'auto',
+            'mapping': '',
+            'dithering': 'none',
+        }
+        self.config['cache'] = {
+            'enabled': 'False',
+            'directory': '.ambilight_cache',
+            'max_size_mb': '2048',
+        }
+        self.config['scenes'] = {
+            'enabled': 'False',
+            'static_threshold': '1.0',
+            'cut_threshold': '30.0',
+            'refresh_interval': '12',
+        }
+        self.config['live'] = {
+            'protocol': 'artnet',
+            'host': '127.0.0.1',
+            'port': '6454',
+            'start_universe': '0',
+            'drop_policy': 'latest',
+        }
+        with open(config_path, 'w') as f:
+            self.config.write(f)
+        logger.info(f"Создан конфигурационный файл {config_path} со значениями по умолчанию.")
+
+class FrameProcessor:
+    """
+    Класс для обработки отдельных кадров.
+    """
+    @staticmethod
+    def resize_area(frame: np.ndarray, dsize: Optional[Tuple[int, int]], fx: float = 0, fy: float = 0) -> np.ndarray:
+        """cv2.resize с INTER_AREA, в том числе для кадров с более чем 4 каналами (RGBWMix)."""
+        if frame.ndim == 3 and frame.shape[2] > 4:
+            parts = [
+                cv2.resize(np.ascontiguousarray(frame[:, :, i:i + 4]), dsize, fx=fx, fy=fy, interpolation=cv2.INTER_AREA)
+                for i in range(0, frame.shape[2], 4)
+            ]
+            return np.dstack(parts)
+        return cv2.resize(frame, dsize, fx=fx, fy=fy, interpolation=cv2.INTER_AREA)
+
+    @staticmethod
+    def resized_size(pixel_selection: PixelSelection, original_width: int, original_height: int, target_height: int = 50, target_width: int = 50) -> Tuple[int, int]:
+        """Размер (ширина, высота) кадра после resize_frame."""
+        if pixel_selection == PixelSelection.LEFT or pixel_selection == PixelSelection.RIGHT:
+            aspect_ratio = original_width / original_height
+            return int(target_height * aspect_ratio), target_height
+        elif pixel_selection == PixelSelection.TOP or pixel_selection == PixelSelection.BOTTOM:
+            aspect_ratio = original_height / original_width
+            return target_width, int(target_width * aspect_ratio)
+        else:
+            raise ValueError(f"Неверный выбор селекции для ресайза: {pixel_selection}")
+
+    @staticmethod
+    def resize_frame(frame: np.ndarray, pixel_selection: PixelSelection, original_width: int, original_height: int, target_height: int = 50, target_width: int = 50) -> np.ndarray:
+        dsize = FrameProcessor.resized_size(pixel_selection, original_width, original_height, target_height, target_width)
+        return FrameProcessor.resize_area(frame, dsize)
+
+    @staticmethod
+    def plan_edge_crop(pixel_selection: PixelSelection, original_width: int, original_height: int, target_height: int = 50, target_width: int = 50) -> Optional[EdgeCropPlan]:
+        """
+        Определяет по геометрии resize_frame, какие пиксели исходного кадра попадают
+        в крайний столбец/строку уменьшенного кадра. При INTER_AREA это полоса шириной
+        в один шаг масштаба (плюс пиксель на дробную часть).
+        Возвращает None, если кадр увеличивается и обрезка неприменима.
+        """
+        width, height = FrameProcessor.resized_size(pixel_selection, original_width, original_height, target_height, target_width)
+        if width <= 0 or height <= 0 or width > original_width or height > original_height:
+            return None
+        # Тот же масштаб, что cv2.resize вычисляет для dsize, - веса INTER_AREA совпадают
+        fx = width / original_width
+        fy = height / original_height
+
+        if pixel_selection in [PixelSelection.LEFT, PixelSelection.RIGHT]:
+            strip = min(original_width, math.ceil(original_width / width) + 1)
+            if pixel_selection == PixelSelection.LEFT:
+                return EdgeCropPlan(slice(None), slice(0, strip), None, fx, fy)
+            return EdgeCropPlan(slice(None), slice(original_width - strip, original_width), 1, fx, fy)
+        else:
+            strip = min(original_height, math.ceil(original_height / height) + 1)
+            if pixel_selection == PixelSelection.TOP:
+                return EdgeCropPlan(slice(0, strip), slice(None), None, fx, fy)
+            return EdgeCropPlan(slice(original_height - strip, original_height), slice(None), 0, fx, fy)
+
+    @staticmethod
+    def extract_edge_region(
+        frame: np.ndarray,
+        plan: EdgeCropPlan,
+        pixel_selection: PixelSelection,
+        color_format: ColorFormat,
+        target_count: int,
+        precise: bool = False
+    ) -> np.ndarray:
+        """
+        Вырезает полосу по плану, конвертирует цвет и усредняет только её.
+        Результат совпадает с sample_edge(resize_frame(convert_color_format(frame)), ...).
+        С precise полоса усредняется во float32 и результат не округляется.
+        """
+        crop = frame[plan.rows, plan.cols]
+        if plan.flip is not None:
+            crop = cv2.flip(crop, plan.flip)
+        converted = FrameProcessor.convert_color_format(crop, color_format)
+        if precise:
+            converted = converted.astype(np.float32)
+        resized = FrameProcessor.resize_area(converted, None, fx=plan.fx, fy=plan.fy)
+        if pixel_selection in [PixelSelection.LEFT, PixelSelection.RIGHT]:
+            edge = resized[:, 0, :]
+        else:
+            edge = resized[0, :, :]
+        if edge.shape[0] != target_count:
+            edge = FrameProcessor.resize_area(edge[np.newaxis], (target_count, 1))[0]
+        return edge[::-1]
+
+    @staticmethod
+    def convert_color_format(frame: np.ndarray, color_format: ColorFormat) -> np.ndarray:
+        if color_format == ColorFormat.RGB:
+            return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        elif color_format == ColorFormat.HSV:
+            return cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        elif color_format == ColorFormat.RGBW:
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            w_channel = np.min(rgb_frame, axis=2, keepdims=True)
+            rgbw_frame = np.concatenate((rgb_frame, w_channel), axis=2)
+            return rgbw_frame
+        elif color_format == ColorFormat.RGBWMix:
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            w_channel = np.min(rgb_frame, axis=2, keepdims=True)
+            cw_channel = np.max(rgb_frame, axis=2, keepdims=True)
+            rgbwmix_frame = np.concatenate((rgb_frame, w_channel, cw_channel), axis=2)
+            return rgbwmix_frame
+        else:
+            raise ValueError(f"Неподдерживаемый цветовой формат: {color_format}")
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def build_lut(midpoint: float = 0.5, steepness: float = 10, gamma: float = 1.0) -> np.ndarray:
+        """
+        Строит 256-элементную таблицу S-образного преобразования (с опциональной гаммой).
+        Таблица кэшируется по параметрам и строится один раз за запуск.
+        """
+        normalized = np.arange(256, dtype=np.float64) / 255.0
+        transformed = 1 / (1 + np.exp(-steepness * (normalized - midpoint)))
+        if gamma != 1.0:
+            transformed = transformed ** gamma
+        lut = (transformed * 255.0).astype(np.uint8)
+        lut.setflags(write=False)
+        return lut
+
+    @staticmethod
+    def srgb_to_linear(values: np.ndarray) -> np.ndarray:
+        """Кодированные значения sRGB (0-1) в линейный свет (0-1)."""
+        values = np.asarray(values, dtype=np.float32)
+        return np.where(values <= 0.04045, values / np.float32(12.92), ((values + np.float32(0.055)) / np.float32(1.055)) ** np.float32(2.4))
+
+    @staticmethod
+    def linear_to_srgb(values: np.ndarray) -> np.ndarray:
+        """Линейный свет (0-1) в кодированные значения sRGB (0-1)."""
+        values = np.clip(np.asarray(values, dtype=np.float32), 0, 1)
+        return np.where(values <= 0.0031308, values * np.float32(12.92), np.float32(1.055) * values ** np.float32(1 / 2.4) - np.float32(0.055))
+
+    @staticmethod
+    def process_colors_linear(
+        pixels: np.ndarray,
+        output_color_format: ColorFormat,
+        midpoint: float = 0.5,
+        steepness: float = 10
+    ) -> np.ndarray:
+        """
+        Первая половина цветовой обработки точного режима (ColorPrecision.LINEAR):
+        S-образная кривая без таблицы и округления, затем перевод в линейный свет.
+        Принимает массив (frames, leds, channels) любого типа (0-255) и возвращает float32
+        той же формы в линейном свете (0-255). Для HSV значения остаются кодированными.
+        Гамма вывода, ограничение яркости и насыщенность - в encode_output после сглаживания.
+        """
+        pixels = FrameProcessor.expand_channels(np.asarray(pixels, dtype=np.float32), output_color_format)
+        values = 1 / (1 + np.exp(np.float32(-steepness) * (pixels / np.float32(255) - np.float32(midpoint))))
+        if output_color_format != ColorFormat.HSV:
+            values = FrameProcessor.srgb_to_linear(values)
+        return (values * np.float32(255)).astype(np.float32)
+
+    @staticmethod
+    def encode_output(
+        values: np.ndarray,
+        output_color_format: ColorFormat,
+        gamma: float = 1.0,
+        max_brightness: int = 220,
+        saturation_factor: float = 1.2
+    ) -> np.ndarray:
+        """
+        Вторая половина цветовой обработки точного режима: линейный свет (0-255) после
+        сглаживания переводится в sRGB, затем гамма вывода, ограничение суммарной яркости
+        и усиление насыщенности - в том же порядке, что в process_colors, но во float32.
+        Возвращает float32 (0-255); округление до uint8 выполняет OutputQuantizer.
+        """
+        values = np.asarray(values, dtype=np.float32) / np.float32(255)
+        if output_color_format != ColorFormat.HSV:
+            values = FrameProcessor.linear_to_srgb(values)
+        if gamma != 1.0:
+            values = np.clip(values, 0, 1) ** np.float32(gamma)
+        values = values * np.float32(255)
+        channels = values.shape[-1]
+
+        if channels in (3, 4, 5):
+            total_brightness = values.sum(axis=-1, keepdims=True)
+            scale = np.float32(max_brightness) / np.maximum(total_brightness, np.float32(max_brightness))
+            values = values * scale
+
+        if channels == 3 and output_color_format in [ColorFormat.RGB, ColorFormat.RGBW, ColorFormat.RGBWMix]:
+            # Насыщенность HSV умножается при неизменных тоне и V = max:
+            # каждый канал c -> V - (V - c) * k, где k = min(factor, 1 / S)
+            value = values.max(axis=-1, keepdims=True)
+            chroma = value - values.min(axis=-1, keepdims=True)
+            factor = np.minimum(np.float32(saturation_factor), value / np.maximum(chroma, np.float32(1e-6)))
+            values = np.where(chroma > 0, value - (value - values) * factor, values)
+        return values.astype(np.float32)
+
+    @staticmethod
+    def signature_change(signature: np.ndarray, previous: np.ndarray) -> float:
+        """Средняя абсолютная разность яркости двух миниатюр (0-255)."""
+        return float(np.mean(np.abs(signature - previous)))
+
+    @staticmethod
+    def sample_edge(frame: np.ndarray, pixel_selection: PixelSelection, target_count: int) -> np.ndarray:
+        """
+        Возвращает массив (target_count, channels) с цветами выбранного края кадра.
+        Порядок пикселей - от последнего к первому (снизу вверх для боковых краёв).
+        """
+        height, width, channels = frame.shape
+
+        if pixel_selection == PixelSelection.LEFT:
+            if height != target_count:
+                edge = cv2.resize(frame, (1, target_count), interpolation=cv2.INTER_AREA)[:, 0, :]
+            else:
+                edge = frame[:, 0, :]
+        elif pixel_selection == PixelSelection.RIGHT:
+            if height != target_count:
+                edge = cv2.resize(frame, (1, target_count), interpolation=cv2.INTER_AREA)[:, 0, :]
+            else:
+                edge = frame[:, -1, :]
+        elif pixel_selection == PixelSelection.TOP:
+            if width != target_count:
+                edge = cv2.resize(frame, (target_count, 1), interpolation=cv2.INTER_AREA)[0, :, :]
+            else:
+                edge = frame[0, :, :]
+        elif pixel_selection == PixelSelection.BOTTOM:
+            if width != target_count:
+                edge = cv2.resize(frame, (target_count, 1), interpolation=cv2.INTER_AREA)[0, :, :]
+            else:
+                edge = frame[-1, :, :]
+        else:
+            raise ValueError(f"Неверный выбор селекции: {pixel_selection}")
+
+        return edge.reshape(target_count, channels)[::-1]
+
+    @staticmethod
+    def expand_channels(pixels: np.ndarray, output_color_format: ColorFormat) -> np.ndarray:
+        """
+        Приводит последнюю ось массива (..., channels) к выходному формату:
+        отбрасывает W, если вывод не RGBW, либо дописывает W/CW для RGB-входа.
+        """
+        channels = pixels.shape[-1]
+        if output_color_format != ColorFormat.RGBW and channels == 4:
+            return pixels[..., :3]  # если не RGBW, отбрасываем W
+        elif output_color_format == ColorFormat.RGBW and channels == 3:
+            w_channel = np.min(pixels, axis=-1, keepdims=True)
+            return np.concatenate((pixels, w_channel), axis=-1)
+        elif output_color_format == ColorFormat.RGBWMix and channels == 3:
+            w_channel = np.min(pixels, axis=-1, keepdims=True)
+            cw_channel = np.max(pixels, axis=-1, keepdims=True)
+            return np.concatenate((pixels, w_channel, cw_channel), axis=-1)
+        return pixels
+
+    @staticmethod
+    def process_colors(
+        pixels: np.ndarray,
+        output_color_format: ColorFormat,
+        midpoint: float = 0.5,
+        steepness: float = 10,
+        max_brightness: int = 220,
+        saturation_factor: float = 1.2,
+        lut: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        S-образная кривая по таблице, ограничение суммарной яркости и усиление насыщенности
+        для всех светодиодов батча сразу. Принимает uint8 массив (frames, leds, channels) и возвращает uint8 массив той же формы
+        (с учётом расширения каналов под output_color_format).
+        Если lut не передана, используется кэшированная таблица build_lut(midpoint, steepness).
+        """
+        if lut is None:
+            lut = FrameProcessor.build_lut(midpoint, steepness)
+        pixels = FrameProcessor.expand_channels(pixels, output_color_format)
+        channels = pixels.shape[-1]
+
+        values = lut[pixels].astype(np.int64)
+
+        if channels in (3, 4, 5):
+            total_brightness = values.sum(axis=-1, keepdims=True)
+            over_limit = total_brightness > max_brightness
+            scale = max_brightness / np.where(over_limit, total_brightness, 1)
+            values = np.where(over_limit, (values * scale).astype(np.int64), values)
+
+        result = values.astype(np.uint8)
+        if channels == 3 and output_color_format in [ColorFormat.RGB, ColorFormat.RGBW, ColorFormat.RGBWMix]:
+            hsv = cv2.cvtColor(result.reshape(-1, 1, 3), cv2.COLOR_RGB2HSV)
+            hsv[..., 1] = np.clip(hsv[..., 1] * saturation_factor, 0, 255).astype(np.uint8)
+            result = cv2.cvtColor(hsv, cv2.COLOR_HSV2RGB).reshape(result.shape)
+        return result
+
+class IntegralSampler:
+    """
+    Средние цвета любого числа прямоугольников кадра по таблице сумм (cv2.integral).
+    Кадр уменьшается INTER_AREA в целое число раз (быстрый путь OpenCV) до рабочего размера,
+    при котором самый маленький прямоугольник занимает не меньше MIN_RECT_PIXELS пикселей
+    по каждой стороне; таблица строится один раз
+    на кадр, сумма каждого прямоугольника - четыре выборки из неё сразу для всех прямоугольников.
+    """
+    MIN_RECT_PIXELS = 2
+    MIN_WORKING_SIZE = 16
+    # Таблица int32 переполняется уже на 4K, но разность четырёх углов в той же арифметике
+    # по модулю 2^32 точна, пока сумма прямоугольника меньше 2^32; кадр больше - таблица float64
+    MAX_INT_PIXELS = (1 << 32) // 256
+
+    def __init__(self, rects: np.ndarray, original_width: int, original_height: int, color_format: ColorFormat, precise: bool = False) -> None:
+        self.color_format: ColorFormat = color_format
+        self.precise: bool = precise
+        rects = np.clip(np.asarray(rects, dtype=np.float64).reshape(-1, 4), 0.0, 1.0)
+        sizes = np.maximum(rects[:, 2:] - rects[:, :2], 1e-6)
+        smallest_width, smallest_height = sizes.min(axis=0) if len(rects) else (1.0, 1.0)
+        self.width: int = self._working_size(original_width, smallest_width)
+        self.height: int = self._working_size(original_height, smallest_height)
+        self.resize: bool = (self.width, self.height) != (original_width, original_height)
+        # Границы в пикселях рабочего кадра (не пустые) - индексы в таблице сумм (height + 1, width + 1)
+        x0 = np.clip(np.rint(rects[:, 0] * self.width).astype(np.intp), 0, self.width - 1)
+        y0 = np.clip(np.rint(rects[:, 1] * self.height).astype(np.intp), 0, self.height - 1)
+        self.x0: np.ndarray = x0
+        self.y0: np.ndarray = y0
+        self.x1: np.ndarray = np.maximum(np.clip(np.rint(rects[:, 2] * self.width).astype(np.intp), 0, self.width), x0 + 1)
+        self.y1: np.ndarray = np.maximum(np.clip(np.rint(rects[:, 3] * self.height).astype(np.intp), 0, self.height), y0 + 1)
+        self.areas: np.ndarray = ((self.x1 - self.x0) * (self.y1 - self.y0)).astype(np.float64)[:, np.newaxis]
+        self.sdepth: int = cv2.CV_32S if self.width * self.height <= self.MAX_INT_PIXELS else cv2.CV_64F
+
+    @classmethod
+    def _working_size(cls, original: int, smallest: float) -> int:
+        """Наименьший размер стороны вида original / k (k - целое), не меньше необходимого."""
+        needed = max(cls.MIN_WORKING_SIZE, math.ceil(cls.MIN_RECT_PIXELS / smallest))
+        factor = max(1, original // needed)
+        while original % factor:
+            factor -= 1
+        return original // factor
+
+    def sample(self, frame: np.ndarray) -> np.ndarray:
+        """Возвращает массив (прямоугольники, channels): uint8, с precise - float32 без округления."""
+        if self.resize:
+            frame = FrameProcessor.resize_area(frame, (self.width, self.height))
+        table = cv2.integral(FrameProcessor.convert_color_format(frame, self.color_format), sdepth=self.sdepth)
+        table = table.reshape(self.height + 1, self.width + 1, -1)
+        sums = table[self.y1, self.x1] - table[self.y0, self.x1] - table[self.y1, self.x0] + table[self.y0, self.x0]
+        if sums.dtype == np.int32:
+            sums = sums.view(np.uint32)
+        if self.precise:
+            return (sums / self.areas).astype(np.float32)
+        return np.rint(sums / self.areas).astype(np.uint8)
+
+class ZoneSampler:
+    """
+    Извлекает цвета сразу для нескольких зон кадра за один проход декодирования.
+    Геометрия зон (планы обрезки, прямоугольники, точки ломаных) рассчитывается один раз.
+    Цвета всех зон склеиваются в один массив (leds, channels), чтобы цветовая
+    обработка батча выполнялась одним вызовом. Прямоугольники всех матриц и карт пикселей
+    считаются одним IntegralSampler - одна таблица сумм на кадр для всех таких зон.
+    С precise цвета усредняются во float32 без округления (ColorPrecision.LINEAR).
+    """
+    def __init__(self, zones: List[Zone], original_width: int, original_height: int, color_format: ColorFormat, precise: bool = False) -> None:
+        self.zones: List[Zone] = zones
+        self.original_width: int = original_width
+        self.original_height: int = original_height
+        self.color_format: ColorFormat = color_format
+        self.precise: bool = precise
+        self.offsets: List[int] = list(np.cumsum([0] + [zone.leds for zone in zones]))
+        self._integral: Optional[IntegralSampler] = None
+        cells = [zone.cell_rects() for zone in zones if zone.zone_type in (ZoneType.MATRIX, ZoneType.PIXELMAP)]
+        if cells:
+            self._integral = IntegralSampler(np.concatenate(cells), original_width, original_height, color_format, precise)
+        self._geometry: List[Any] = [self._prepare(zone) for zone in zones]
+
+    def _to_pixels(self, x: float, y: float) -> Tuple[int, int]:
+        return (min(self.original_width - 1, max(0, int(round(x * self.original_width)))),
+                min(self.original_height - 1, max(0, int(round(y * self.original_height)))))
+
+    def _prepare(self, zone: Zone) -> Any:
+        if zone.zone_type in (ZoneType.MATRIX, ZoneType.PIXELMAP):
+            # Срез общего результата IntegralSampler
+            start = sum(other.leds for other in self.zones[:self.zones.index(zone)] if other.zone_type in (ZoneType.MATRIX, ZoneType.PIXELMAP))
+            return slice(start, start + zone.leds)
+        if zone.zone_type == ZoneType.EDGE:
+            return FrameProcessor.plan_edge_crop(zone.edge, self.original_width, self.original_height, zone.leds, zone.leds)
+        elif zone.zone_type == ZoneType.RECT:
+            x0, y0 = self._to_pixels(min(zone.rect[0], zone.rect[2]), min(zone.rect[1], zone.rect[3]))
+            x1, y1 = self._to_pixels(max(zone.rect[0], zone.rect[2]), max(zone.rect[1], zone.rect[3]))
+            return slice(y0, max(y1, y0 + 1)), slice(x0, max(x1, x0 + 1))
+        else:
+            # Светодиоды равномерно по длине ломаной, каждый усредняет квадратное окно вокруг точки
+            points = np.array([(x * self.original_width, y * self.original_height) for x, y in zone.points], dtype=np.float64)
+            lengths = np.hypot(*np.diff(points, axis=0).T)
+            cumulative = np.concatenate(([0.0], np.cumsum(lengths)))
+            positions = (np.arange(zone.leds) + 0.5) / zone.leds * cumulative[-1]
+            centers = np.stack([np.interp(positions, cumulative, points[:, 0]), np.interp(positions, cumulative, points[:, 1])], axis=1)
+            if zone.size > 0:
+                half = max(1, int(round(zone.size * max(self.original_width, self.original_height) / 2)))
+            else:
+                half = max(1, int(cumulative[-1] / zone.leds / 2))
+            windows = []
+            for cx, cy in centers:
+                cx = min(self.original_width - 1, max(0, int(cx)))
+                cy = min(self.original_height - 1, max(0, int(cy)))
+                windows.append((slice(max(0, cy - half), cy + half + 1), slice(max(0, cx - half), cx + half + 1)))
+            return windows
+
+    def sample(self, frame: np.ndarray) -> np.ndarray:
+        """Возвращает массив (сумма светодиодов всех зон, channels): uint8, с precise - float32."""
+        parts = []
+        cells = self._integral.sample(frame) if self._integral is not None else None
+        for zone, geometry in zip(self.zones, self._geometry):
+            if zone.zone_type in (ZoneType.MATRIX, ZoneType.PIXELMAP):
+                parts.append(cells[geometry])
+            elif zone.zone_type == ZoneType.EDGE:
+                if geometry is not None:
+                    parts.append(FrameProcessor.extract_edge_region(frame, geometry, zone.edge, self.color_format, zone.leds, self.precise))
+                else:
+                    converted = FrameProcessor.convert_color_format(frame, self.color_format)
+                    if self.precise:
+                        converted = converted.astype(np.float32)
+                    resized = FrameProcessor.resize_frame(converted, zone.edge, self.original_width, self.original_height, zone.leds, zone.leds)
+                    parts.append(FrameProcessor.sample_edge(resized, zone.edge, zone.leds))
+            elif zone.zone_type == ZoneType.RECT:
+                rows, cols = geometry
+                converted = FrameProcessor.convert_color_format(frame[rows, cols], self.color_format)
+                if self.precise:
+                    converted = converted.astype(np.float32)
+                height, width = converted.shape[:2]
+                # Прямоугольник делится на светодиоды вдоль длинной стороны, порядок - как у краёв
+                dsize = (1, zone.leds) if height >= width else (zone.leds, 1)
+                parts.append(FrameProcessor.resize_area(converted, dsize).reshape(zone.leds, -1)[::-1])
+            else:
+                converted = [FrameProcessor.convert_color_format(frame[rows, cols], self.color_format) for rows, cols in geometry]
+                means = [window.reshape(-1, window.shape[-1]).mean(axis=0) for window in converted]
+                parts.append(np.stack(means).astype(np.float32) if self.precise else np.rint(np.stack(means)).astype(np.uint8))
+        return np.concatenate(parts, axis=0)
+
+    def split(self, colors: List[List[int]]) -> Dict[str, List[List[int]]]:
+        """Разбивает склеенный список цветов кадра обратно по именам зон."""
+        return {zone.name: colors[self.offsets[i]:self.offsets[i + 1]] for i, zone in enumerate(self.zones)}
+
+    def regions(self) -> np.ndarray:
+        """Прямоугольники (n, 4) x0, y0, x1, y1 в пикселях кадра, из которых берутся цвета зон."""
+        rects = []
+        for zone, geometry in zip(self.zones, self._geometry):
+            if zone.zone_type in (ZoneType.MATRIX, ZoneType.PIXELMAP):
+                cells = np.sort(zone.cell_rects().reshape(-1, 2, 2), axis=1).reshape(-1, 4)
+                size = [self.original_width, self.original_height, self.original_width, self.original_height]
+                rects.extend(np.rint(cells * size).astype(np.int64).tolist())
+            elif zone.zone_type == ZoneType.EDGE:
+                if geometry is not None:
+                    rects.append(SignatureSampler.slice_rect(geometry.rows, geometry.cols, self.original_width, self.original_height))
+                else:
+                    rects.append((0, 0, self.original_width, self.original_height))
+            elif zone.zone_type == ZoneType.RECT:
+                rects.append(SignatureSampler.slice_rect(*geometry, self.original_width, self.original_height))
+            else:
+                rects.extend(SignatureSampler.slice_rect(rows, cols, self.original_width, self.original_height) for rows, cols in geometry)
+        rects = np.array(rects, dtype=np.int64).reshape(-1, 4)
+        # Вырожденные и выходящие за кадр прямоугольники - хотя бы один пиксель внутри кадра
+        rects[:, :2] = np.clip(rects[:, :2], 0, [self.original_width - 1, self.original_height - 1])
+        rects[:, 2:] = np.clip(rects[:, 2:], rects[:, :2] + 1, [self.original_width, self.original_height])
+        return rects
+
+class SignatureSampler:
+    """
+    Миниатюра яркости кадра BGR для определения статичных кадров и склеек. Точки берутся
+    только из областей, которые читают светодиоды (полоса края, прямоугольники, окна и ячейки
+    зон): изменение у края кадра не растворяется в неизменной середине. На область приходится
+    около POINTS / (число областей) точек - сетка по пропорциям области, не меньше одной точки.
+    """
+    POINTS = 576
+
+    def __init__(self, regions: np.ndarray) -> None:
+        regions = np.asarray(regions, dtype=np.int64).reshape(-1, 4)
+        budget = max(1, self.POINTS // max(1, len(regions)))
+        ys, xs = [], []
+        for x0, y0, x1, y1 in regions:
+            width, height = max(1, x1 - x0), max(1, y1 - y0)
+            columns = int(min(width, max(1, round(math.sqrt(budget * width / height)))))
+            rows = int(min(height, max(1, budget // columns)))
+            grid_y, grid_x = np.meshgrid(
+                y0 + ((np.arange(rows) + 0.5) * height / rows).astype(np.int64),
+                x0 + ((np.arange(columns) + 0.5) * width / columns).astype(np.int64),
+                indexing="ij"
+            )
+            ys.append(grid_y.ravel())
+            xs.append(grid_x.ravel())
+        self.ys: np.ndarray = np.concatenate(ys) if ys else np.zeros(0, dtype=np.int64)
+        self.xs: np.ndarray = np.concatenate(xs) if xs else np.zeros(0, dtype=np.int64)
+
+    @classmethod
+    def for_edge(cls, plan: Optional[EdgeCropPlan], original_width: int, original_height: int) -> "SignatureSampler":
+        """Миниатюра полосы края по плану обрезки; без плана (кадр увеличивается) - всего кадра."""
+        if plan is None:
+            return cls(np.array([[0, 0, original_width, original_height]]))
+        return cls(np.array([cls.slice_rect(plan.rows, plan.cols, original_width, original_height)]))
+
+    @staticmethod
+    def slice_rect(rows: slice, cols: slice, width: int, height: int) -> Tuple[int, int, int, int]:
+        """Срезы кадра -> прямоугольник x0, y0, x1, y1 в пикселях."""
+        x0, x1, _ = cols.indices(width)
+        y0, y1, _ = rows.indices(height)
+        return x0, y0, x1, y1
+
+    def sample(self, frame: np.ndarray) -> np.ndarray:
+        return frame[self.ys, self.xs].astype(np.float32) @ np.array([0.114, 0.587, 0.299], dtype=np.float32)
+
+class SharedFrameRing:
+    """
+    Кольцевой буфер кадров в разделяемой памяти.
+    Читатель декодирует кадры прямо в свободные слоты, воркерам передаются только индексы.
+    Слоты возвращаются в очередь после получения результата батча, поэтому читатель
+    не может опередить воркеров больше чем на размер буфера.
+    """
+    def __init__(self, slots: int, frame_shape: Tuple[int, ...]) -> None:
+        self.slots: int = slots
+        self.frame_shape: Tuple[int, ...] = tuple(frame_shape)
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * int(np.prod(self.frame_shape)))
+        self.frames: np.ndarray = np.ndarray((slots, *self.frame_shape), dtype=np.uint8, buffer=self.shm.buf)
+        self._free: queue.Queue = queue.Queue()
+        for slot in range(slots):
+            self._free.put(slot)
+        self._pending: deque = deque()
+        self._stopped: bool = False
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def acquire(self) -> Optional[int]:
+        """Возвращает индекс свободного слота, блокируясь, пока воркеры не освободят место."""
+        while not self._stopped:
+            try:
+                return self._free.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+
+    def release(self, slot: int) -> None:
+        self._free.put(slot)
+
+    def submit(self, slots: List[int]) -> None:
+        """Запоминает слоты батча, отправленного в пул (результаты imap приходят по порядку)."""
+        self._pending.append(slots)
+
+    def release_next(self) -> None:
+        """Освобождает слоты самого старого батча после получения его результата."""
+        for slot in self._pending.popleft():
+            self._free.put(slot)
+
+    def stop(self) -> None:
+        """Прерывает ожидание слотов, чтобы поток подачи задач пула мог завершиться."""
+        self._stopped = True
+
+    def close(self) -> None:
+        self.stop()
+        del self.frames
+        self.shm.close()
+        self.shm.unlink()
+
+def peak_rss_mb() -> Optional[float]:
+    """Пиковый объём резидентной памяти текущего процесса в МБ (None, если недоступно)."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss - в килобайтах в Linux и в байтах в macOS
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+class StageStats:
+    """
+    Время и количество элементов по стадиям конвейера в одном процессе.
+    Воркеры после каждой задачи добавляют накопленное в общий массив (to_shared),
+    главный процесс читает сумму по всем воркерам (from_shared).
+    """
+    STAGES = (
+        "decode", "signature", "display_resize", "convert", "resize", "extract", "color",
+        "task", "wait", "smoothing", "write",
+    )
+    INDEX = {name: index for index, name in enumerate(STAGES)}
+    # После времени и количеств по стадиям: число задач и пиковая память воркера (МБ)
+    SHARED_SIZE = 2 * len(STAGES) + 2
+
+    def __init__(self) -> None:
+        self.seconds: np.ndarray = np.zeros(len(self.STAGES))
+        self.items: np.ndarray = np.zeros(len(self.STAGES))
+
+    def add(self, stage: str, seconds: float, items: int = 1) -> None:
+        index = self.INDEX[stage]
+        self.seconds[index] += seconds
+        self.items[index] += items
+
+    @contextlib.contextmanager
+    def measure(self, stage: str, items: int = 1) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start, items)
+
+    def to_shared(self, shared: Any) -> None:
+        """Добавляет накопленное в общий массив и обнуляет локальные счётчики."""
+        count = len(self.STAGES)
+        rss = peak_rss_mb() or 0.0
+        with shared.get_lock():
+            for index in np.flatnonzero(self.items):
+                shared[index] += self.seconds[index]
+                shared[count + index] += self.items[index]
+            shared[2 * count] += 1
+            shared[2 * count + 1] = max(shared[2 * count + 1], rss)
+        self.seconds[:] = 0
+        self.items[:] = 0
+
+    @classmethod
+    def from_shared(cls, shared: Any) -> Tuple["StageStats", int, float]:
+        """Возвращает (сумма стадий воркеров, число задач, наибольшая пиковая память воркера)."""
+        count = len(cls.STAGES)
+        with shared.get_lock():
+            values = np.array(shared[:])
+        stats = cls()
+        stats.seconds = values[:count]
+        stats.items = values[count:2 * count]
+        return stats, int(values[2 * count]), float(values[2 * count + 1])
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {
+                "seconds": round(float(self.seconds[index]), 6),
+                "items": int(self.items[index]),
+                "ms_per_item": round(1000 * float(self.seconds[index]) / self.items[index], 4),
+            }
+            for index, name in enumerate(self.STAGES) if self.items[index]
+        }
+
+# Статистика стадий текущего процесса (None - замеры выключены)
+_stage_stats: Optional[StageStats] = None
+
+def measure_stage(stage: str, items: int = 1) -> Any:
+    """Контекст замера стадии для текущего процесса; без включённой статистики ничего не делает."""
+    return _stage_stats.measure(stage, items) if _stage_stats is not None else contextlib.nullcontext()
+
+def record_stage(stage: str, seconds: float, items: int = 1) -> None:
+    if _stage_stats is not None:
+        _stage_stats.add(stage, seconds, items)
+
+# Таблица S-преобразования, переданная в процесс-воркер один раз через инициализатор пула
+_worker_lut: Optional[np.ndarray] = None
+# Кадры кольцевого буфера в разделяемой памяти (если используется)
+_worker_shm: Optional[Any] = None
+_worker_ring: Optional[np.ndarray] = None
+# Общий массив статистики стадий (StageStats.to_shared) и профилировщик задач воркера
+_worker_stats_shared: Optional[Any] = None
+_worker_profiler: Optional[cProfile.Profile] = None
+
+def init_worker(
+    lut: np.ndarray,
+    ring_name: Optional[str] = None,
+    ring_shape: Optional[Tuple[int, ...]] = None,
+    stats_shared: Optional[Any] = None,
+    profile_dir: Optional[str] = None
+) -> None:
+    global _worker_lut, _worker_shm, _worker_ring, _stage_stats, _worker_stats_shared, _worker_profiler
+    if not logging.getLogger().handlers:
+        # Воркер, запущенный через spawn, не наследует настройку логгирования главного процесса
+        configure_logging()
+    _worker_lut = lut
+    if ring_name is not None:
+        _worker_shm = shared_memory.SharedMemory(name=ring_name)
+        _worker_ring = np.ndarray(ring_shape, dtype=np.uint8, buffer=_worker_shm.buf)
+    _stage_stats = StageStats() if stats_shared is not None else None
+    _worker_stats_shared = stats_shared
+    _worker_profiler = None
+    if profile_dir is not None:
+        # Профиль сохраняется при штатном завершении воркера (pool.close + join)
+        _worker_profiler = cProfile.Profile()
+        multiprocessing_util.Finalize(None, _worker_profiler.dump_stats, args=(os.path.join(profile_dir, f"worker_{os.getpid()}.prof"),), exitpriority=10)
+
+def run_worker_task(task: Callable, item: Any, **kwargs) -> Any:
+    """Выполняет задачу пула; при включённой статистике замеряет её и передаёт счётчики в общий массив."""
+    if _worker_profiler is not None:
+        _worker_profiler.enable()
+    try:
+        with measure_stage("task"):
+            return task(item, **kwargs)
+    finally:
+        if _worker_profiler is not None:
+            _worker_profiler.disable()
+        if _stage_stats is not None and _worker_stats_shared is not None:
+            _stage_stats.to_shared(_worker_stats_shared)
+
+class InlinePool:
+    """
+    Замена пула процессов при num_processes = 0: задачи выполняются в текущем процессе,
+    без запуска воркеров. Удобно для коротких видео и вызовов из других инструментов.
+    """
+    def __init__(self, lut: np.ndarray) -> None:
+        self.lut: np.ndarray = lut
+
+    def __enter__(self) -> "InlinePool":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+    def imap(self, func: Callable, iterable: Any) -> Iterator[Any]:
+        # Таблица S-кривой передаётся задаче явно: init_worker в текущем процессе не вызывается
+        return (func(item, lut=self.lut) for item in iterable)
+
+    def apply_async(
+        self,
+        func: Callable,
+        args: Tuple = (),
+        callback: Optional[Callable] = None,
+        error_callback: Optional[Callable] = None
+    ) -> None:
+        """Выполняет задачу сразу (как multiprocessing.Pool.apply_async); таблицу S-кривой задача получает сама."""
+        try:
+            result = func(*args)
+        except Exception as e:
+            if error_callback is None:
+                raise
+            error_callback(e)
+            return
+        if callback is not None:
+            callback(result)
+
+    def close(self) -> None:
+        pass
+
+    def join(self) -> None:
+        pass
+
+    def terminate(self) -> None:
+        pass
+
+def open_pool(num_processes: int, initargs: Tuple) -> Any:
+    """Пул воркеров с init_worker(*initargs) или, при num_processes = 0, InlinePool."""
+    if num_processes <= 0:
+        return InlinePool(initargs[0])
+    return multiprocessing.Pool(processes=num_processes, initializer=init_worker, initargs=initargs)
+
+def process_frame_batch_worker(
+    frame_batch: List[Tuple[int, np.ndarray]],
+    original_width: int,
+    original_height: int,
+    target_height: int,
+    target_width: int,
+    color_format: ColorFormat,
+    frame_skip: int,
+    pixel_selection: PixelSelection,
+    output_color_format: ColorFormat,
+    max_brightness: int = 220,
+    saturation_factor: float = 1.2,
+    keep_display: bool = True,
+    zones: Optional[List[Zone]] = None,
+    raw_output: bool = False,
+    lut: Optional[np.ndarray] = None,
+    detect_scenes: bool = False,
+    static_threshold: float = 0.0,
+    refresh_interval: int = 0,
+    precision: ColorPrecision = ColorPrecision.UINT8,
+    tone_curve: Tuple[float, float] = (0.5, 10.0)
+) -> Tuple[List[Dict[str, Any]], List[np.ndarray]]:
+    """
+    Извлекает и обрабатывает цвета батча кадров.
+    При raw_output цветовая обработка не выполняется: результаты содержат усреднённые
+    цвета {"frame", "raw"} в виде uint8 массива (leds, channels) - для кэша извлечения.
+    lut - таблица S-кривой задачи, если она отличается от заданной в init_worker
+    (общий пул пакетной обработки).
+    При detect_scenes результаты содержат миниатюру яркости "signature" (SignatureSampler);
+    кадр, почти не отличающийся от последнего извлечённого (static_threshold), не извлекается
+    заново, кроме кадров с номером, кратным refresh_interval (правило SceneDetector). Последний
+    извлечённый кадр зависит от предыдущих батчей, поэтому пропуск начинается с первого кадра
+    обновления в батче - дальше решения совпадают с SceneDetector при любом разбиении на батчи.
+    С precision = LINEAR цвета извлекаются без округления и возвращаются в линейном свете
+    (process_colors_linear с tone_curve = (midpoint, steepness)), "raw" - float32.
+    """
+    results = []
+    precise = precision == ColorPrecision.LINEAR
+    processed_frames = []
+    frame_numbers = []
+    edges = []
+    signatures = []
+    target_count = target_height if pixel_selection in [PixelSelection.LEFT, PixelSelection.RIGHT] else target_width
+    # Для извлечения нужен только край кадра: конвертируем и усредняем лишь его
+    plan = FrameProcessor.plan_edge_crop(pixel_selection, original_width, original_height, target_height, target_width)
+    sampler = ZoneSampler(zones, original_width, original_height, color_format, precise) if zones else None
+    signature_sampler = None
+    if detect_scenes:
+        signature_sampler = SignatureSampler(sampler.regions()) if sampler is not None else SignatureSampler.for_edge(plan, original_width, original_height)
+    # Миниатюра последнего извлечённого кадра; до первого кадра обновления в батче неизвестна
+    reference = None
+    for frame_number, frame in frame_batch:
+        try:
+            if keep_display:
+                with measure_stage("display_resize"):
+                    resized_for_display = FrameProcessor.resize_frame(
+                        frame,
+                        pixel_selection,
+                        original_width,
+                        original_height,
+                        target_height,
+                        target_width
+                    )
+            signature = None
+            if signature_sampler is not None:
+                with measure_stage("signature"):
+                    signature = signature_sampler.sample(frame)
+            refresh = SceneDetector.is_refresh(frame_number + 1, refresh_interval)
+            static = (signature is not None and reference is not None and not refresh
+                      and FrameProcessor.signature_change(signature, reference) < static_threshold)
+            if static:
+                # Статичный кадр: цвета предыдущего (они же - цвета последнего извлечённого)
+                edge = edges[-1]
+            elif sampler is not None:
+                with measure_stage("extract"):
+                    edge = sampler.sample(frame)
+            elif plan is not None:
+                # Обрезка края, конвертация и уменьшение полосы - одной стадией
+                with measure_stage("extract"):
+                    edge = FrameProcessor.extract_edge_region(frame, plan, pixel_selection, color_format, target_count, precise)
+            else:
+                with measure_stage("convert"):
+                    converted = FrameProcessor.convert_color_format(frame, color_format)
+                    if precise:
+                        converted = converted.astype(np.float32)
+                with measure_stage("resize"):
+                    resized_for_extraction = FrameProcessor.resize_frame(
+                        converted,
+                        pixel_selection,
+                        original_width,
+                        original_height,
+                        target_height,
+                        target_width
+                    )
+                with measure_stage("extract"):
+                    edge = FrameProcessor.sample_edge(resized_for_extraction, pixel_selection, target_count)
+            if signature is not None and not static and (refresh or reference is not None):
+                reference = signature
+            edges.append(edge)
+            signatures.append(signature)
+            frame_numbers.append(frame_number)
+            if keep_display:
+                processed_frames.append(resized_for_display)
+        except Exception as e:
+            logger.error(f"Ошибка при обработке кадра {frame_number}: {e}")
+
+    if edges and raw_output:
+        results = [{"frame": frame_number + 1, "raw": edge} for frame_number, edge in zip(frame_numbers, edges)]
+    elif edges:
+        # Цветовая обработка выполняется одним вызовом на весь батч (frames, leds, channels)
+        with measure_stage("color", len(edges)):
+            if precise:
+                colors = FrameProcessor.process_colors_linear(np.stack(edges), output_color_format, *tone_curve)
+            else:
+                colors = FrameProcessor.process_colors(
+                    np.stack(edges),
+                    output_color_format,
+                    max_brightness=max_brightness,
+                    saturation_factor=saturation_factor,
+                    lut=_worker_lut if lut is None else lut
+                )
+        for frame_number, pixels in zip(frame_numbers, colors.tolist()):
+            if sampler is not None:
+                results.append({
+                    "frame": frame_number + 1,
+                    "zones": sampler.split(pixels)
+                })
+            else:
+                results.append({
+                    "frame": frame_number + 1,
+                    "pixels": pixels
+                })
+    if detect_scenes:
+        for item, signature in zip(results, signatures):
+            item["signature"] = signature
+    return results, processed_frames
+
+def pop_signatures(batch_result: List[Dict[str, Any]]) -> Optional[List[np.ndarray]]:
+    """Забирает из результатов батча миниатюры определения сцен (None, если их нет)."""
+    if not batch_result or "signature" not in batch_result[0]:
+        return None
+    return [item.pop("signature") for item in batch_result]
+
+def process_slot_batch_worker(slot_batch: List[Tuple[int, int]], **kwargs) -> Tuple[List[Dict[str, Any]], List[np.ndarray]]:
+    """Обрабатывает батч, заданный индексами слотов кольцевого буфера в разделяемой памяти."""
+    frame_batch = [(frame_number, _worker_ring[slot]) for frame_number, slot in slot_batch]
+    return process_frame_batch_worker(frame_batch, **kwargs)
+
+def seek_capture(cap: cv2.VideoCapture, frame_number: int) -> None:
+    """
+    Перемещает VideoCapture на кадр frame_number.
+    Если бэкенд не поддерживает точное позиционирование, кадры пропускаются через grab().
+    """
+    if frame_number <= 0:
+        return
+    if cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number) and int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == frame_number:
+        return
+    logger.warning(f"Точный переход к кадру {frame_number} не поддерживается, кадры пропускаются последовательно")
+    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    for _ in range(frame_number):
+        if not cap.grab():
+            break
+
+def probe_video(cap: cv2.VideoCapture) -> Dict[str, Any]:
+    """Параметры открытого видео; frame_width/frame_height - размер отдаваемых читателем кадров."""
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    return {
+        "frame_count": int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+        "fps": cap.get(cv2.CAP_PROP_FPS),
+        "original_width": width,
+        "original_height": height,
+        "frame_width": width,
+        "frame_height": height,
+        "fourcc": int(cap.get(cv2.CAP_PROP_FOURCC)),
+    }
+
+class VideoFrameReader(ABC):
+    """
+    Источник кадров BGR для обработки видео. Бэкенды различаются декодером; info - параметры
+    видео (probe_video). Время, проведённое в декодировании, накапливается для decode_fps.
+    """
+    backend: DecodeBackend
+
+    def __init__(self) -> None:
+        self.info: Dict[str, Any] = {}
+        self.frames_decoded: int = 0
+        self.decode_time: float = 0.0
+
+    @property
+    def decode_fps(self) -> float:
+        return self.frames_decoded / self.decode_time if self.decode_time > 0 else 0.0
+
+    def read(self, out: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        """Читает следующий кадр; out - буфер формы (frame_height, frame_width, 3) для записи кадра."""
+        start = time.perf_counter()
+        ret, frame = self._read(out)
+        self.decode_time += time.perf_counter() - start
+        if ret:
+            self.frames_decoded += 1
+        return ret, frame
+
+    def grab(self) -> bool:
+        """Пропускает кадр (декодирует без передачи в numpy, если бэкенд это позволяет)."""
+        start = time.perf_counter()
+        ret = self._grab()
+        self.decode_time += time.perf_counter() - start
+        if ret:
+            self.frames_decoded += 1
+        return ret
+
+    @abstractmethod
+    def _read(self, out: Optional[np.ndarray]) -> Tuple[bool, Optional[np.ndarray]]:
+        ...
+
+    @abstractmethod
+    def _grab(self) -> bool:
+        ...
+
+    @abstractmethod
+    def seek(self, frame_number: int) -> None:
+        ...
+
+    @abstractmethod
+    def release(self) -> None:
+        ...
+
+class OpenCvFrameReader(VideoFrameReader):
+    """Декодирование cv2.VideoCapture в исходном разрешении."""
+    backend = DecodeBackend.OPENCV
+
+    def __init__(self, video_path: str) -> None:
+        super().__init__()
+        self.cap: cv2.VideoCapture = cv2.VideoCapture(video_path)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Не удалось открыть видео файл: {video_path}")
+        self.info = probe_video(self.cap)
+
+    def _read(self, out: Optional[np.ndarray]) -> Tuple[bool, Optional[np.ndarray]]:
+        ret, frame = self.cap.read(out) if out is not None else self.cap.read()
+        if ret and out is not None and frame is not out:
+            np.copyto(out, frame)
+            frame = out
+        return ret, frame
+
+    def _grab(self) -> bool:
+        return self.cap.grab()
+
+    def seek(self, frame_number: int) -> None:
+        seek_capture(self.cap, frame_number)
+
+    def release(self) -> None:
+        self.cap.release()
+
+class FfmpegFrameReader(VideoFrameReader):
+    """
+    Декодирование процессом ffmpeg: фильтр scale уменьшает кадр до short_side по короткой стороне
+    внутри декодера, кадры bgr24 читаются из pipe прямо в буфер numpy без промежуточных копий.
+    Параметры видео определяются через cv2.VideoCapture; переход к кадру - перезапуск ffmpeg
+    с -ss (точен для видео с постоянной частотой кадров).
+    """
+    backend = DecodeBackend.FFMPEG
+
+    def __init__(self, video_path: str, short_side: int = 0, ffmpeg_path: str = "ffmpeg", input_options: str = "") -> None:
+        super().__init__()
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise RuntimeError(f"Не удалось открыть видео файл: {video_path}")
+        self.info = probe_video(cap)
+        cap.release()
+        self.video_path: str = video_path
+        self.ffmpeg_path: str = ffmpeg_path
+        self.input_options: List[str] = shlex.split(input_options)
+        width, height = self.info["original_width"], self.info["original_height"]
+        self._scaled: bool = 0 < short_side < min(width, height)
+        if self._scaled:
+            # Пропорции сохраняются, размеры чётные (требование большинства форматов пикселей)
+            scale = short_side / min(width, height)
+            width = max(2, int(round(width * scale / 2)) * 2)
+            height = max(2, int(round(height * scale / 2)) * 2)
+        self.info["frame_width"], self.info["frame_height"] = width, height
+        self._buffer: np.ndarray = np.empty((height, width, 3), dtype=np.uint8)
+        self._process: Optional[subprocess.Popen] = None
+        self._start(0)
+
+    def _command(self, frame_number: int) -> List[str]:
+        command = [self.ffmpeg_path, "-v", "error", "-nostdin"] + self.input_options
+        if frame_number > 0 and self.info["fps"] > 0:
+            command += ["-ss", f"{frame_number / self.info['fps']:.6f}"]
+        command += ["-i", self.video_path, "-an", "-sn", "-vsync", "passthrough"]
+        if self._scaled:
+            command += ["-vf", f"scale={self.info['frame_width']}:{self.info['frame_height']}:flags=area"]
+        return command + ["-f", "rawvideo", "-pix_fmt", "bgr24", "-"]
+
+    def _start(self, frame_number: int) -> None:
+        self._stop()
+        try:
+            self._process = subprocess.Popen(self._command(frame_number), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except FileNotFoundError:
+            raise RuntimeError(f"ffmpeg не найден: {self.ffmpeg_path}")
+
+    def _fill(self, buffer: np.ndarray) -> bool:
+        view = memoryview(buffer).cast("B")
+        filled = 0
+        while filled < len(view):
+            count = self._process.stdout.readinto(view[filled:])
+            if not count:
+                if filled == 0 and self._process.wait() != 0:
+                    error = self._process.stderr.read().decode("utf-8", "replace").strip()
+                    logger.error(f"ffmpeg завершился с ошибкой: {error}")
+                return False
+            filled += count
+        return True
+
+    def _read(self, out: Optional[np.ndarray]) -> Tuple[bool, Optional[np.ndarray]]:
+        frame = out if out is not None else np.empty_like(self._buffer)
+        if not self._fill(frame):
+            return False, None
+        return True, frame
+
+    def _grab(self) -> bool:
+        return self._fill(self._buffer)
+
+    def seek(self, frame_number: int) -> None:
+        if frame_number > 0:
+            self._start(frame_number)
+
+    def _stop(self) -> None:
+        if self._process is None:
+            return
+        if self._process.poll() is None:
+            self._process.kill()
+        self._process.wait()
+        self._process.stdout.close()
+        self._process.stderr.close()
+        self._process = None
+
+    def release(self) -> None:
+        self._stop()
+
+def open_video_reader(video_path: str, backend: DecodeBackend = DecodeBackend.OPENCV, **options) -> VideoFrameReader:
+    """Открывает видео выбранным декодером; options - параметры FfmpegFrameReader."""
+    if backend == DecodeBackend.FFMPEG:
+        return FfmpegFrameReader(video_path, **options)
+    return OpenCvFrameReader(video_path)
+
+def video_reader_options(config: VideoConfig) -> Dict[str, Any]:
+    """Параметры open_video_reader по конфигурации; размер кадров ffmpeg - наибольший размер выборки."""
+    if config.decoder != DecodeBackend.FFMPEG:
+        return {"backend": config.decoder}
+    short_side = config.decode_size or max([config.target_height, config.target_width] + [zone.leds for zone in config.zones])
+    return {
+        "backend": config.decoder,
+        "short_side": short_side,
+        "ffmpeg_path": config.ffmpeg_path,
+        "input_options": config.ffmpeg_options,
+    }
+
+def benchmark_decoders(video_path: str, config: VideoConfig, max_frames: int = 300) -> Dict[str, float]:
+    """Измеряет скорость декодирования (кадров/с) первых max_frames кадров каждым доступным декодером."""
+    results = {}
+    for backend in DecodeBackend:
+        decoder_config = copy.copy(config)
+        decoder_config.decoder = backend
+        try:
+            reader = open_video_reader(video_path, **video_reader_options(decoder_config))
+        except RuntimeError as e:
+            logger.warning(f"Декодер {backend.value} недоступен: {e}")
+            continue
+        try:
+            while reader.frames_decoded < max_frames and reader.read()[0]:
+                pass
+        finally:
+            reader.release()
+        results[backend.value] = reader.decode_fps
+        logger.info(f"Декодер {backend.value}: {reader.frames_decoded} кадров "
+                    f"{reader.info['frame_width']}x{reader.info['frame_height']}, {reader.decode_fps:.1f} кадров/с")
+    return results
+
+def process_segment_worker(
+    segment: Tuple[int, Optional[int]],
+    video_path: str,
+    batch_size: int,
+    frame_skip: int,
+    reader_options: Optional[Dict[str, Any]] = None,
+    **kwargs
+) -> Tuple[List[Dict[str, Any]], List[np.ndarray]]:
+    """
+    Декодирует и обрабатывает диапазон кадров [start, stop) собственным читателем видео
+    (stop=None - до конца видео). Номера кадров абсолютные, поэтому выборка по frame_skip
+    совпадает с последовательным чтением.
+    """
+    start, stop = segment
+    results = []
+    processed_frames = []
+    cap = open_video_reader(video_path, **(reader_options or {}))
+    try:
+        cap.seek(start)
+        frame_number = start
+        batch = []
+        while stop is None or frame_number < stop:
+            if frame_skip > 0 and (frame_number % (frame_skip + 1)) != 0:
+                # Пропускаемые кадры только декодируются, без копирования в numpy
+                if not cap.grab():
+                    break
+                frame_number += 1
+                continue
+
+            ret, frame = cap.read()
+            if not ret:
+                break
+            batch.append((frame_number, frame))
+            frame_number += 1
+
+            if len(batch) >= batch_size:
+                batch_result, processed_frames_batch = process_frame_batch_worker(batch, frame_skip=frame_skip, **kwargs)
+                results.extend(batch_result)
+                processed_frames.extend(processed_frames_batch)
+                batch = []
+
+        if batch:
+            batch_result, processed_frames_batch = process_frame_batch_worker(batch, frame_skip=frame_skip, **kwargs)
+            results.extend(batch_result)
+            processed_frames.extend(processed_frames_batch)
+    finally:
+        cap.release()
+    record_stage("decode", cap.decode_time, cap.frames_decoded)
+    logger.debug(f"Сегмент {segment}: декодер {cap.backend.value}, {cap.frames_decoded} кадров, {cap.decode_fps:.1f} кадров/с")
+    return results, processed_frames
+
+class PipelineProfiler:
+    """
+    Статистика одного запуска: стадии главного процесса и сумма по воркерам пула, глубина
+    очереди батчей, занятость и простой воркеров, пиковая память. Отчёт пишется в JSON
+    или CSV (по расширению файла). С profile_dir главный процесс и каждый воркер
+    профилируются cProfile, профили сохраняются в <profile_dir>/main_<pid>.prof и worker_<pid>.prof.
+    """
+    def __init__(self, profile_dir: Optional[str] = None) -> None:
+        self.profile_dir: Optional[str] = profile_dir
+        self.main: StageStats = StageStats()
+        self.shared: Any = multiprocessing.Array('d', StageStats.SHARED_SIZE)
+        self.num_processes: int = 0
+        self.pool_seconds: float = 0.0
+        self.wall_seconds: float = 0.0
+        self.frames: int = 0
+        # Батчи, отданные в пул и полученные из него: разность - глубина очереди
+        self.submitted: int = 0
+        self.received: int = 0
+        self._depth_sum: int = 0
+        self._depth_max: int = 0
+        self._started: float = 0.0
+        self._profiler: Optional[cProfile.Profile] = None
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+
+    def initargs(self) -> Tuple[Any, Optional[str]]:
+        """Аргументы init_worker для сбора статистики и профилирования в воркерах."""
+        return self.shared, self.profile_dir
+
+    def count_submitted(self, tasks: Iterator[Any]) -> Iterator[Any]:
+        for task in tasks:
+            self.submitted += 1
+            yield task
+
+    def sample_queue(self) -> None:
+        self.received += 1
+        depth = self.submitted - self.received
+        self._depth_sum += depth
+        self._depth_max = max(self._depth_max, depth)
+
+    def start(self) -> None:
+        global _stage_stats
+        _stage_stats = self.main
+        self._started = time.perf_counter()
+        if self.profile_dir:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self) -> None:
+        global _stage_stats
+        _stage_stats = None
+        self.wall_seconds = time.perf_counter() - self._started
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(os.path.join(self.profile_dir, f"main_{os.getpid()}.prof"))
+            self._profiler = None
+
+    def report(self) -> Dict[str, Any]:
+        workers, tasks, worker_rss = StageStats.from_shared(self.shared)
+        busy = float(workers.seconds[StageStats.INDEX["task"]])
+        capacity = self.num_processes * self.pool_seconds
+        return {
+            "frames": self.frames,
+            "wall_seconds": round(self.wall_seconds, 3),
+            "fps": round(self.frames / self.wall_seconds, 2) if self.wall_seconds > 0 else 0.0,
+            "num_processes": self.num_processes,
+            "stages": {"main": self.main.as_dict(), "workers": workers.as_dict()},
+            "workers": {
+                "tasks": tasks,
+                "busy_seconds": round(busy, 3),
+                "idle_seconds": round(max(0.0, capacity - busy), 3),
+                "utilization": round(busy / capacity, 3) if capacity > 0 else 0.0,
+                "peak_rss_mb": round(worker_rss, 1),
+            },
+            "queue": {
+                "max_depth": self._depth_max,
+                "mean_depth": round(self._depth_sum / self.received, 2) if self.received else 0.0,
+            },
+            "main_peak_rss_mb": round(peak_rss_mb() or 0.0, 1),
+        }
+
+    def save(self, path: str) -> Dict[str, Any]:
+        """Пишет отчёт в JSON или, для .csv, построчно "метрика,значение"; возвращает отчёт."""
+        report = self.report()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if path.lower().endswith(".csv"):
+            def flatten(prefix: str, value: Any) -> Iterator[Tuple[str, Any]]:
+                if isinstance(value, dict):
+                    for key, item in value.items():
+                        yield from flatten(f"{prefix}.{key}" if prefix else key, item)
+                else:
+                    yield prefix, value
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(["metric", "value"])
+                writer.writerows(flatten("", report))
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        logger.info(f"Отчёт о производительности сохранён в {path}")
+        return report
+
+    def log_summary(self, report: Dict[str, Any]) -> None:
+        logger.info(f"Кадров: {report['frames']} за {report['wall_seconds']} с ({report['fps']} кадров/с), "
+                    f"загрузка воркеров {report['workers']['utilization']:.0%}, "
+                    f"очередь до {report['queue']['max_depth']} батчей, "
+                    f"память: главный {report['main_peak_rss_mb']} МБ, воркер {report['workers']['peak_rss_mb']} МБ")
+        for process, stages in report["stages"].items():
+            for name, stage in sorted(stages.items(), key=lambda item: -item[1]["seconds"]):
+                logger.info(f"  {process:8s} {name:15s} {stage['seconds']:9.3f} с  {stage['ms_per_item']:8.3f} мс x {stage['items']}")
+
+def physical_memory_mb() -> Optional[float]:
+    """Объём физической памяти в МБ (None, если ОС его не сообщает)."""
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+class AutoTuner:
+    """
+    Подбор batch_size и num_processes под видео.
+    На разогреве (warm_up) измеряются время декодирования, обработки и сериализации кадра
+    и его размер. Воркеров берётся столько, сколько нужно, чтобы успевать за чтением кадров,
+    батч - такой, чтобы работа над ним окупала передачу (TARGET_BATCH_SECONDS); оба значения
+    ограничиваются бюджетом памяти на кадры в обработке. Во время последовательного чтения
+    размер батча подстраивается поиском по измеренной скорости (observe), а число батчей
+    в обработке ограничивается окном (limit), чтобы чтение не опережало воркеров.
+    """
+    TARGET_BATCH_SECONDS = 0.1
+    # Батчей на воркер не меньше этого числа, если длина видео известна
+    MIN_BATCHES_PER_WORKER = 8
+    MIN_BATCH_SIZE = 4
+    MAX_BATCH_SIZE = 1000
+    # Результатов батчей в одном окне замера скорости
+    WINDOW_BATCHES = 6
+
+    def __init__(self, config: VideoConfig) -> None:
+        self.config: VideoConfig = config
+        budget = config.memory_budget_mb or (physical_memory_mb() or 4096) / 4
+        self.memory_budget: float = budget * 1024 * 1024
+        self.measurements: Dict[str, float] = {}
+        self.max_batch_size: int = self.MAX_BATCH_SIZE
+        self.in_flight: int = 0
+        # Поиск размера батча: лучший размер и скорость, направление и шаг
+        self._best: Tuple[int, float] = (0, 0.0)
+        self._direction: int = 1
+        self._step: float = 1.5
+        self._window_frames: int = 0
+        self._window_batches: int = 0
+        self._window_started: float = 0.0
+        self._slots: Optional[threading.Semaphore] = None
+        self._stopped: bool = False
+
+    def warm_up(self, processor: "VideoColorProcessor") -> Dict[str, float]:
+        """Декодирует и обрабатывает первые кадры в главном процессе; возвращает замеры на кадр."""
+        global _stage_stats
+        config = self.config
+        step = config.frame_skip + 1
+        reader = open_video_reader(processor.video_path, **video_reader_options(config))
+        batch: List[Tuple[int, np.ndarray]] = []
+        try:
+            reader.seek(processor.start_frame)
+            frame_number = processor.start_frame
+            while len(batch) < max(2, config.warmup_frames):
+                ret, frame = reader.read()
+                if not ret:
+                    break
+                if frame_number % step == 0:
+                    batch.append((frame_number, frame))
+                frame_number += 1
+            decode_time = reader.decode_time
+        finally:
+            reader.release()
+        if len(batch) < 2:
+            return {}
+
+        lut = FrameProcessor.build_lut(config.midpoint, config.steepness, config.gamma)
+        kwargs = processor._worker_kwargs()
+        # Разогрев не входит в статистику стадий запуска
+        stats, _stage_stats = _stage_stats, None
+        try:
+            # Первый кадр - без замера: в нём разовые затраты (таблицы, кэши OpenCV)
+            process_frame_batch_worker(batch[:1], lut=lut, **kwargs)
+            started = time.perf_counter()
+            process_frame_batch_worker(batch[1:], lut=lut, **kwargs)
+            process_time = (time.perf_counter() - started) / (len(batch) - 1)
+        finally:
+            _stage_stats = stats
+        started = time.perf_counter()
+        payload = pickle.dumps(batch, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle_time = (time.perf_counter() - started) / len(batch)
+
+        self.measurements = {
+            "decode_ms": 1000 * decode_time / len(batch),
+            "process_ms": 1000 * process_time,
+            "pickle_ms": 1000 * pickle_time,
+            "frame_mb": len(payload) / len(batch) / (1024 * 1024),
+        }
+        return self.measurements
+
+    def plan(self, total_frames: int = 0) -> Tuple[int, int]:
+        """
+        По замерам разогрева выбирает (batch_size, num_processes) и задаёт их в конфигурации.
+        total_frames - число обрабатываемых кадров (0 - неизвестно).
+        """
+        config = self.config
+        decode = self.measurements["decode_ms"] / 1000
+        process = self.measurements["process_ms"] / 1000
+        frame_bytes = self.measurements["frame_mb"] * 1024 * 1024
+        if config.segmented_decode:
+            # Воркеры сами декодируют свои сегменты: загружаются все ядра
+            worker_cost = decode + process
+            num_processes = max(1, cpu_count())
+            # Кадры батча в каждом воркере и их уменьшенные копии для сохраняемого видео
+            batches_in_flight = lambda workers: workers * (2 if config.save_video else 1)
+        else:
+            transfer = 0.0 if config.shared_memory else self.measurements["pickle_ms"] / 1000
+            # Главный процесс читает и сериализует кадры, воркеры десериализуют и обрабатывают
+            worker_cost = process + transfer
+            num_processes = min(max(1, cpu_count() - 1), max(1, math.ceil(worker_cost / max(decode + transfer, 1e-6))))
+            # Окно батчей в обработке плюс собираемый батч; без разделяемой памяти кадр ещё и сериализован
+            batches_in_flight = lambda workers: (self.window_size(workers) + 1) * (1 if config.shared_memory else 2)
+
+        batch_size = min(self.MAX_BATCH_SIZE, max(1, math.ceil(self.TARGET_BATCH_SECONDS / max(worker_cost, 1e-6))))
+        if total_frames > 0:
+            batch_size = min(batch_size, max(1, math.ceil(total_frames / (self.MIN_BATCHES_PER_WORKER * num_processes))))
+        budget_batch = int(self.memory_budget // max(1.0, frame_bytes * batches_in_flight(num_processes)))
+        while budget_batch < self.MIN_BATCH_SIZE and num_processes > 1:
+            # Бюджета не хватает даже на маленькие батчи: меньше воркеров
+            num_processes -= 1
+            budget_batch = int(self.memory_budget // max(1.0, frame_bytes * batches_in_flight(num_processes)))
+        self.max_batch_size = max(1, min(self.MAX_BATCH_SIZE, budget_batch))
+        batch_size = min(batch_size, self.max_batch_size)
+
+        config.batch_size = batch_size
+        config.num_processes = num_processes
+        self._best = (batch_size, 0.0)
+        logger.info(f"Автонастройка: декодирование {self.measurements['decode_ms']:.2f} мс/кадр, "
+                    f"обработка {self.measurements['process_ms']:.2f} мс/кадр, "
+                    f"передача {self.measurements['pickle_ms']:.2f} мс/кадр, {self.measurements['frame_mb']:.2f} МБ/кадр, "
+                    f"бюджет памяти {self.memory_budget / (1024 * 1024):.0f} МБ")
+        logger.info(f"Автонастройка: batch_size = {batch_size}, num_processes = {num_processes}")
+        return batch_size, num_processes
+
+    @staticmethod
+    def window_size(num_processes: int) -> int:
+        """Сколько батчей может быть отправлено в пул и ещё не получено."""
+        return 2 * num_processes
+
+    def limit(self, batches: Iterator[Any], num_processes: int) -> Iterator[Any]:
+        """Отдаёт батчи пулу, пока в обработке меньше window_size; освобождение - в observe."""
+        self._slots = threading.Semaphore(self.window_size(num_processes))
+        for batch in batches:
+            while not self._slots.acquire(timeout=0.1):
+                if self._stopped:
+                    return
+            yield batch
+
+    def stop(self) -> None:
+        """Прерывает ожидание окна, чтобы поток подачи задач пула мог завершиться."""
+        self._stopped = True
+
+    def observe(self, frames: int) -> None:
+        """
+        Учитывает полученный результат батча. Раз в окно сравнивает скорость с лучшей:
+        при росте размер батча меняется дальше в том же направлении, иначе возвращается
+        к лучшему, направление меняется, а шаг уменьшается до сходимости.
+        """
+        if self._slots is not None:
+            self._slots.release()
+        now = time.perf_counter()
+        if self._window_batches == 0:
+            # Первый результат окна только открывает замер: батчи, заказанные до смены размера, не учитываются
+            self._window_started = now
+            self._window_batches = 1
+            return
+        self._window_frames += frames
+        self._window_batches += 1
+        if self._window_batches <= self.WINDOW_BATCHES or self._step < 1.1:
+            return
+        fps = self._window_frames / max(now - self._window_started, 1e-9)
+        self._window_frames = 0
+        self._window_batches = 0
+
+        best_size, best_fps = self._best
+        current = self.config.batch_size
+        if fps > best_fps:
+            self._best = (current, fps)
+        else:
+            current = best_size
+            self._direction = -self._direction
+            self._step = math.sqrt(self._step)
+        factor = self._step if self._direction > 0 else 1 / self._step
+        new_size = max(1, min(self.max_batch_size, round(current * factor)))
+        if new_size == current:
+            self._direction = -self._direction
+        self.config.batch_size = new_size
+        logger.debug(f"Автонастройка: {fps:.1f} кадров/с при batch_size = {self._best[0]}, следующий batch_size = {new_size}")
+
+    def summary(self) -> None:
+        logger.info(f"Автонастройка: итоговые batch_size = {self._best[0] or self.config.batch_size}, "
+                    f"num_processes = {self.config.num_processes} "
+                    f"(можно закрепить в config.ini, секция [processing], с auto_tune = False)")
+
+class VideoColorProcessor:
+    """
+    Основной класс для обработки видео.
+    """
+    def __init__(
+        self,
+        video_path: str,
+        output_json_path: str,
+        config: VideoConfig
+    ) -> None:
+        self.video_path: str = video_path
+        self.output_json_path: str = output_json_path
+        self.config: VideoConfig = config
+        self.cap = None
+        self.video_info: Dict[str, Any] = {}
+        self._validate_inputs()
+        self.output_video_path: str = ""
+        # Первый читаемый кадр видео (больше 0 при продолжении с контрольной точки)
+        self.start_frame: int = 0
+        # Сбор статистики производительности (--stats, --profile)
+        self.profiler: Optional[PipelineProfiler] = None
+        # Индикаторы прогресса tqdm; включает только командная строка, API работает молча
+        self.progress: bool = False
+
+    def _validate_inputs(self) -> None:
+        if not os.path.exists(self.video_path):
+            raise FileNotFoundError(f"Видео файл не найден: {self.video_path}")
+        if self.config.target_height <= 0 or self.config.target_width <= 0:
+            raise ValueError("Высота и ширина должны быть положительными")
+        if self.config.batch_size <= 0:
+            raise ValueError("Размер батча должен быть положительным")
+        zone_names = [zone.name for zone in self.config.zones]
+        if len(zone_names) != len(set(zone_names)):
+            raise ValueError("Имена зон должны быть уникальными")
+
+    def initialize_video(self) -> Dict[str, Any]:
+        self.cap = open_video_reader(self.video_path, **video_reader_options(self.config))
+        self.video_info = dict(self.cap.info)
+        logger.info(f"Открыто видео: {self.video_path} "
+                    f"({self.video_info['original_width']}x{self.video_info['original_height']}, {self.video_info['frame_count']} кадров, "
+                    f"декодер {self.cap.backend.value} {self.video_info['frame_width']}x{self.video_info['frame_height']})")
+
+        base_name = os.path.basename(self.video_path)
+        name, ext = os.path.splitext(base_name)
+        output_dir = os.path.dirname(self.output_json_path)
+        self.output_video_path = os.path.join(output_dir, f"{name}_resized{ext}")
+
+        return self.video_info
+
+    def _generate_batches(self, ring: Optional[SharedFrameRing] = None):
+        """
+        Читает кадры и отдаёт их батчами.
+        Без ring батч состоит из (frame_number, frame), с ring - из (frame_number, slot),
+        где кадр уже записан в соответствующий слот разделяемой памяти.
+        """
+        frame_skip = self.config.frame_skip
+        frame_number = self.start_frame
+        # Кадры, выбранные до start_frame, уже обработаны
+        processed_frames = -(-self.start_frame // (frame_skip + 1))
+        batch = []
+        slot = None
+        total_frames = self.video_info.get("frame_count", 0)
+        max_frames = self.config.max_frames if self.config.max_frames > 0 else total_frames
+        self.cap.seek(self.start_frame)
+
+        with tqdm(total=min(total_frames, max_frames), initial=min(processed_frames, max_frames), desc="Чтение кадров", disable=not self.progress) as pbar:
+            while processed_frames < max_frames:
+                if ring is not None:
+                    if slot is None:
+                        slot = ring.acquire()
+                        if slot is None:
+                            return
+                    ret, frame = self.cap.read(ring.frames[slot])
+                else:
+                    ret, frame = self.cap.read()
+                if not ret:
+                    break
+
+                if frame_skip > 0 and (frame_number % (frame_skip + 1)) != 0:
+                    frame_number += 1
+                    continue
+
+                if ring is not None:
+                    batch.append((frame_number, slot))
+                    slot = None
+                else:
+                    batch.append((frame_number, frame))
+                processed_frames += 1
+                frame_number += 1
+                pbar.update(1)
+
+                if len(batch) >= self.config.batch_size:
+                    if ring is not None:
+                        ring.submit([s for _, s in batch])
+                    yield batch
+                    batch = []
+
+            if slot is not None:
+                ring.release(slot)
+            if batch:
+                if ring is not None:
+                    ring.submit([s for _, s in batch])
+                yield batch
+
+    def _plan_segments(self) -> List[Tuple[int, Optional[int]]]:
+        """
+        Делит видео на диапазоны [start, stop) для параллельного декодирования.
+        Границы кратны (frame_skip + 1) и, если задан keyframe_interval, интервалу ключевых кадров,
+        чтобы переход к началу сегмента не требовал декодирования лишних кадров.
+        Последний сегмент открыт (stop=None), если не задан max_frames, - как и при
+        последовательном чтении, кадры читаются до конца файла.
+        """
+        step = self.config.frame_skip + 1
+        total_frames = self.video_info.get("frame_count", 0)
+        if self.config.max_frames > 0:
+            # Номер кадра, следующего за последним выбранным
+            last_stop: Optional[int] = (self.config.max_frames - 1) * step + 1
+            span = min(last_stop, total_frames) if total_frames > 0 else last_stop
+        else:
+            last_stop = None
+            span = total_frames
+
+        alignment = step
+        if self.config.keyframe_interval > 0:
+            alignment = step * self.config.keyframe_interval // math.gcd(step, self.config.keyframe_interval)
+        num_segments = self.config.segments or self.config.num_processes * 2
+        # Сегмент не короче одного батча, чтобы переходы не съедали выигрыш
+        segment_length = max(self.config.batch_size * step, math.ceil(span / max(1, num_segments)))
+        segment_length = math.ceil(segment_length / alignment) * alignment
+
+        starts = list(range(0, span, segment_length)) or [0]
+        segments: List[Tuple[int, Optional[int]]] = [(start, start + segment_length) for start in starts[:-1]]
+        segments.append((starts[-1], last_stop))
+        if self.start_frame > 0:
+            segments = [
+                (max(start, self.start_frame), stop) for start, stop in segments
+                if stop is None or stop > self.start_frame
+            ]
+        return segments
+
+    def _worker_kwargs(self, raw_output: bool = False) -> Dict[str, Any]:
+        """Параметры process_frame_batch_worker для этого видео и конфигурации."""
+        return dict(
+            # Воркеры получают кадры в размере декодера
+            original_width=self.video_info['frame_width'],
+            original_height=self.video_info['frame_height'],
+            target_height=self.config.target_height,
+            target_width=self.config.target_width,
+            color_format=self.config.color_format,
+            frame_skip=self.config.frame_skip,
+            pixel_selection=self.config.pixel_selection,
+            output_color_format=self.config.output_color_format,
+            max_brightness=self.config.max_brightness,
+            saturation_factor=self.config.saturation_factor,
+            keep_display=self.config.save_video,
+            zones=self.config.zones or None,
+            raw_output=raw_output,
+            detect_scenes=self.config.scene_detection,
+            static_threshold=self.config.static_threshold,
+            refresh_interval=self.config.refresh_interval,
+            precision=self.config.precision,
+            tone_curve=(self.config.midpoint, self.config.steepness)
+        )
+
+    def _iter_batch_results(self, raw_output: bool = False) -> Iterator[Tuple[List[Dict[str, Any]], List[np.ndarray]]]:
+        """
+        Запускает пул воркеров и отдаёт результаты батчей в порядке кадров по мере готовности.
+        Ожидает, что initialize_video уже вызван; по завершении закрывает видеопоток.
+        raw_output - воркеры возвращают цвета до цветовой обработки (см. process_frame_batch_worker).
+        При auto_tune batch_size и num_processes подбираются по разогреву (AutoTuner).
+        """
+        total_frames = self.video_info.get("frame_count", 0)
+        max_frames = self.config.max_frames if self.config.max_frames > 0 else total_frames
+        tuner: Optional[AutoTuner] = None
+        if self.config.auto_tune:
+            tuner = AutoTuner(self.config)
+            if tuner.warm_up(self):
+                remaining = max(0, total_frames - self.start_frame) // (self.config.frame_skip + 1)
+                tuner.plan(min(max_frames, remaining) if self.config.max_frames > 0 else remaining)
+            else:
+                tuner = None
+        total_batches = (max_frames // self.config.batch_size) + (1 if max_frames % self.config.batch_size != 0 else 0)
+
+        ring: Optional[SharedFrameRing] = None
+        try:
+            lut = FrameProcessor.build_lut(self.config.midpoint, self.config.steepness, self.config.gamma)
+            ring_args: Tuple = (None, None)
+            if self.config.segmented_decode and self.config.shared_memory:
+                logger.warning("При параллельном декодировании разделяемая память не используется")
+            elif self.config.shared_memory and self.config.num_processes <= 0:
+                logger.warning("Без пула воркеров (num_processes = 0) разделяемая память не используется")
+            elif self.config.shared_memory:
+                frame_shape = (self.video_info['frame_height'], self.video_info['frame_width'], 3)
+                slots = self.config.ring_slots or self.config.batch_size * (self.config.num_processes + 1)
+                if slots < self.config.batch_size:
+                    raise ValueError("Кольцевой буфер должен вмещать хотя бы один батч")
+                ring = SharedFrameRing(slots, frame_shape)
+                ring_args = (ring.name, ring.frames.shape)
+                if tuner is not None:
+                    # Батч больше доли буфера оставил бы воркеров без работы
+                    tuner.max_batch_size = min(tuner.max_batch_size, max(self.config.batch_size, slots // (self.config.num_processes + 1)))
+                logger.info(f"Кадры передаются через разделяемую память: {slots} слотов, "
+                            f"{ring.shm.size / (1024 * 1024):.1f} МБ")
+
+            worker_kwargs = self._worker_kwargs(raw_output)
+            if self.config.segmented_decode:
+                segments = self._plan_segments()
+                logger.info(f"Параллельное декодирование: {len(segments)} сегментов")
+                worker = partial(
+                    run_worker_task,
+                    process_segment_worker,
+                    video_path=self.video_path,
+                    batch_size=self.config.batch_size,
+                    reader_options=video_reader_options(self.config),
+                    **worker_kwargs
+                )
+            else:
+                worker = partial(
+                    run_worker_task,
+                    process_slot_batch_worker if ring is not None else process_frame_batch_worker,
+                    **worker_kwargs
+                )
+
+            profiler = self.profiler
+            initargs = (lut,) + ring_args + (profiler.initargs() if profiler is not None else ())
+            started = time.perf_counter()
+            frames = 0
+            with open_pool(self.config.num_processes, initargs) as pool:
+                try:
+                    task_source = segments if self.config.segmented_decode else self._generate_batches(ring)
+                    if tuner is not None and not self.config.segmented_decode:
+                        # Сегменты распределены заранее: размер батча подстраивается только при последовательном чтении
+                        task_source = tuner.limit(task_source, self.config.num_processes)
+                    if profiler is not None:
+                        profiler.num_processes = self.config.num_processes
+                        task_source = profiler.count_submitted(task_source)
+                    if self.config.segmented_decode:
+                        tasks = tqdm(pool.imap(worker, task_source), total=len(segments), desc="Обработка сегментов", disable=not self.progress)
+                    else:
+                        tasks = tqdm(pool.imap(worker, task_source), total=None if tuner else total_batches, desc="Обработка батчей", disable=not self.progress)
+                    waiting = time.perf_counter()
+                    for batch_result, processed_frames_batch in tasks:
+                        record_stage("wait", time.perf_counter() - waiting)
+                        if profiler is not None:
+                            profiler.sample_queue()
+                        if ring is not None:
+                            ring.release_next()
+                        if tuner is not None and not self.config.segmented_decode:
+                            tuner.observe(len(batch_result))
+                        frames += len(batch_result)
+                        yield batch_result, processed_frames_batch
+                        waiting = time.perf_counter()
+                    # Штатное завершение воркеров: сохраняются их профили
+                    pool.close()
+                    pool.join()
+                finally:
+                    if ring is not None:
+                        ring.stop()
+                    if tuner is not None:
+                        tuner.stop()
+            elapsed = time.perf_counter() - started
+            if tuner is not None:
+                tuner.summary()
+            if profiler is not None:
+                profiler.pool_seconds = elapsed
+                if not self.config.segmented_decode:
+                    record_stage("decode", self.cap.decode_time, self.cap.frames_decoded)
+            if self.config.segmented_decode:
+                logger.info(f"Декодер {self.config.decoder.value}: {frames} кадров, {frames / max(elapsed, 1e-9):.1f} кадров/с (с обработкой)")
+            else:
+                logger.info(f"Декодер {self.cap.backend.value}: {self.cap.frames_decoded} кадров, "
+                            f"{self.cap.decode_fps:.1f} кадров/с декодирования, {frames / max(elapsed, 1e-9):.1f} кадров/с с обработкой")
+        finally:
+            if ring is not None:
+                ring.close()
+            if self.cap:
+                self.cap.release()
+                logger.info("Закрыт видеопоток.")
+
+    def _open_video_writer(self) -> cv2.VideoWriter:
+        # Размер кадров для видео считается, как в воркерах, от кадров декодера: ffmpeg отдаёт
+        # уменьшенные кадры с чётными сторонами, и пропорции могут отличаться от исходных.
+        # cv2.VideoWriter молча пропускает кадры другого размера
+        output_width, output_height = FrameProcessor.resized_size(
+            self.config.pixel_selection,
+            self.video_info['frame_width'],
+            self.video_info['frame_height'],
+            self.config.target_height,
+            self.config.target_width
+        )
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        return cv2.VideoWriter(self.output_video_path, fourcc, self.video_info['fps'], (output_width, output_height))
+
+    def process_video(self) -> List[Dict[str, Any]]:
+        """Обрабатывает видео целиком и возвращает результаты всех кадров в памяти."""
+        self.initialize_video()
+        results: List[Dict[str, Any]] = []
+        out = None
+        try:
+            for batch_result, processed_frames_batch in self._iter_batch_results():
+                pop_signatures(batch_result)
+                results.extend(batch_result)
+                if self.config.save_video and processed_frames_batch:
+                    if out is None:
+                        out = self._open_video_writer()
+                    for frame in processed_frames_batch:
+                        out.write(frame)
+
+            if out is not None:
+                logger.info(f"Обработанное видео сохранено в {self.output_video_path}")
+            logger.info("Обработка видео завершена.")
+            return results
+
+        except Exception as e:
+            logger.error(f"Ошибка при обработке видео: {e}")
+            raise
+        finally:
+            if out is not None:
+                out.release()
+
+    def stream_video(self, temporal_alpha: Optional[float] = None, resume: bool = False) -> int:
+        """
+        Потоковая обработка: результаты батчей по мере поступления сглаживаются,
+        дописываются в файл вывода и в видео, поэтому память не растёт с длиной видео.
+        Результат совпадает с process_video + apply_temporal_smoothing + save_to_json.
+        При включённом кэше итоговый вывод или извлечённые цвета берутся из FrameCache,
+        если видео уже обрабатывалось с теми же параметрами.
+        Каждые checkpoint_interval кадров сохраняется контрольная точка; с resume обработка
+        продолжается с неё, и вывод совпадает с выводом непрерывной обработки.
+        Возвращает количество записанных кадров.
+        """
+        if temporal_alpha is not None:
+            self.config.temporal_alpha = temporal_alpha
+        if self.profiler is None:
+            return self._stream_video(resume)
+        self.profiler.start()
+        try:
+            count = self._stream_video(resume)
+        finally:
+            self.profiler.stop()
+        self.profiler.frames = count
+        return count
+
+    def _stream_video(self, resume: bool) -> int:
+        self.initialize_video()
+
+        checkpoint, resume_state = self._open_checkpoint(resume)
+        cache = self._open_cache() if resume_state is None else None
+        raw_key = processed_key = ""
+        processed_entry: Optional[CacheEntryWriter] = None
+        if cache is not None:
+            raw_key, processed_key = self._cache_keys(cache)
+            cached = cache.get(processed_key) if not self.config.save_video else None
+            if cached is not None:
+                self.cap.release()
+                logger.info(f"Итоговые цвета взяты из кэша ({processed_key}), видео не декодируется")
+                return self._write_cached_output(cached)
+            processed_entry = CacheEntryWriter(
+                cache, processed_key, self.video_info.get("fps", 0.0), self.config.output_color_format, self.config.frame_skip + 1
+            )
+
+        pipeline = OutputPipeline(self, processed_entry, checkpoint, resume_state)
+        try:
+            for frame_numbers, colors, layout, processed_frames_batch, signatures in self._iter_color_blocks(cache, raw_key):
+                pipeline.write(frame_numbers, colors, layout, processed_frames_batch, signatures)
+            count = pipeline.finish()
+            if checkpoint is not None:
+                checkpoint.remove()
+            logger.info("Обработка видео завершена.")
+            return count
+
+        except BaseException as e:
+            if isinstance(e, Exception):
+                logger.error(f"Ошибка при обработке видео: {e}")
+            pipeline.abort()
+            raise
+
+    def iter_output(self) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Как stream_video, но без файлов: отдаёт (номер кадра, итоговые цвета (leds, channels))
+        по мере обработки. Контрольные точки не используются, кэш - как в stream_video.
+        При досрочном закрытии генератора пул воркеров останавливается.
+        """
+        self.initialize_video()
+        cache = self._open_cache()
+        raw_key = ""
+        processed_entry: Optional[CacheEntryWriter] = None
+        if cache is not None:
+            raw_key, processed_key = self._cache_keys(cache)
+            cached = cache.get(processed_key)
+            if cached is not None:
+                self.cap.release()
+                for index in range(len(cached)):
+                    yield cached.frame_number(index), np.asarray(cached.frames[index])
+                return
+            processed_entry = CacheEntryWriter(
+                cache, processed_key, self.video_info.get("fps", 0.0), self.config.output_color_format, self.config.frame_skip + 1
+            )
+
+        sink = FrameSink()
+        pipeline = OutputPipeline(self, processed_entry, writer=sink)
+        try:
+            for frame_numbers, colors, layout, processed_frames_batch, signatures in self._iter_color_blocks(cache, raw_key):
+                pipeline.write(frame_numbers, colors, layout, processed_frames_batch, signatures)
+                yield from sink.drain()
+            pipeline.finish()
+            yield from sink.drain()
+        except BaseException:
+            pipeline.abort()
+            raise
+
+    def _open_checkpoint(self, resume: bool) -> Tuple[Optional["Checkpoint"], Optional[Dict[str, Any]]]:
+        """
+        Возвращает контрольную точку вывода и, при resume, её сохранённое состояние.
+        Состояние используется, только если оно записано для того же видео и тех же параметров;
+        иначе старая контрольная точка удаляется и обработка начинается сначала.
+        """
+        if self.config.checkpoint_interval <= 0 or self.config.save_video:
+            if resume:
+                logger.warning("Продолжение недоступно: контрольные точки отключены "
+                               "(checkpoint_interval = 0 или сохраняется обработанное видео)")
+            return None, None
+        checkpoint = Checkpoint(self.output_file_path() + Checkpoint.SUFFIX)
+        state = checkpoint.load() if resume else None
+        if resume and state is None:
+            logger.warning(f"Контрольная точка {checkpoint.path} не найдена, обработка начинается сначала")
+        elif state is not None and state["pipeline"]["signature"] != output_signature(self.video_path, self.config):
+            logger.warning("Контрольная точка записана для другого видео или других параметров, обработка начинается сначала")
+            state = None
+        if state is None:
+            checkpoint.remove()
+            return checkpoint, None
+        self.start_frame = state["pipeline"]["next_frame"]
+        logger.info(f"Продолжение обработки с кадра {self.start_frame} ({checkpoint.path})")
+        return checkpoint, state
+
+    def _iter_color_blocks(
+        self,
+        cache: Optional["FrameCache"] = None,
+        raw_key: str = ""
+    ) -> Iterator[Tuple[List[int], Optional[np.ndarray], List[Tuple[str, int]], List[np.ndarray], Optional[List[np.ndarray]]]]:
+        """
+        Отдаёт блоки (номера кадров, цвета после цветовой обработки, зоны, кадры для видео,
+        миниатюры определения сцен или None).
+        С кэшем извлечённые цвета читаются из записи raw_key, а при её отсутствии воркеры
+        возвращают цвета до обработки, которые сохраняются в кэш и обрабатываются здесь.
+        Кэш хранит uint8, поэтому с точностью linear уровень raw не используется: точные средние
+        не округляются, а итоговые цвета по-прежнему кэшируются уровнем processed.
+        Блок без кадров (все кадры батча с ошибкой) отдаётся с пустым списком номеров.
+        """
+        layout = [(zone.name, zone.leds) for zone in self.config.zones]
+        if cache is None or self.config.precision == ColorPrecision.LINEAR:
+            for batch_result, processed_frames_batch in self._iter_batch_results():
+                if batch_result:
+                    signatures = pop_signatures(batch_result)
+                    frame_numbers, colors, layout = frames_to_array(batch_result)
+                    yield frame_numbers, colors, layout, processed_frames_batch, signatures
+                else:
+                    yield [], None, layout, processed_frames_batch, None
+            return
+
+        lut = FrameProcessor.build_lut(self.config.midpoint, self.config.steepness, self.config.gamma)
+
+        def process(raw: np.ndarray) -> np.ndarray:
+            return FrameProcessor.process_colors(
+                raw,
+                self.config.output_color_format,
+                max_brightness=self.config.max_brightness,
+                saturation_factor=self.config.saturation_factor,
+                lut=lut
+            )
+
+        cached = cache.get(raw_key) if not self.config.save_video else None
+        if cached is not None:
+            self.cap.release()
+            logger.info(f"Извлечённые цвета взяты из кэша ({raw_key}), видео не декодируется")
+            for start in range(0, len(cached), self.config.batch_size):
+                raw = np.asarray(cached.frames[start:start + self.config.batch_size])
+                frame_numbers = [cached.frame_number(index) for index in range(start, start + len(raw))]
+                yield frame_numbers, process(raw), cached.layout, [], None
+            return
+
+        raw_entry = CacheEntryWriter(
+            cache, raw_key, self.video_info.get("fps", 0.0), self.config.color_format, self.config.frame_skip + 1
+        )
+        try:
+            for batch_result, processed_frames_batch in self._iter_batch_results(raw_output=True):
+                if batch_result:
+                    frame_numbers = [item["frame"] for item in batch_result]
+                    raw = quantize_colors(np.stack([item["raw"] for item in batch_result]))
+                    raw_entry.write(frame_numbers, raw, layout)
+                    yield frame_numbers, process(raw), layout, processed_frames_batch, None
+                else:
+                    yield [], None, layout, processed_frames_batch, None
+        except BaseException:
+            raw_entry.discard()
+            raise
+        raw_entry.commit()
+
+    def _open_cache(self) -> Optional["FrameCache"]:
+        if not self.config.cache_enabled:
+            return None
+        if self.config.scene_detection:
+            logger.warning("Кэш не используется при определении сцен: оно требует декодированных кадров")
+            return None
+        if self.config.save_video:
+            logger.info("При сохранении видео кэш только пополняется: кадры всё равно декодируются")
+        return FrameCache(self.config.cache_dir, self.config.cache_max_size_mb * 1024 * 1024)
+
+    def _cache_keys(self, cache: "FrameCache") -> Tuple[str, str]:
+        """
+        Ключи двух уровней кэша. raw зависит от содержимого видео, декодера и его параметров
+        масштабирования, геометрии зон, color_format и выборки кадров; processed - от ключа raw и параметров цветовой обработки и сглаживания.
+        """
+        config = self.config
+        if config.zones:
+            geometry: Dict[str, Any] = {"zones": [zone._asdict() for zone in config.zones]}
+        else:
+            geometry = {
+                "pixel_selection": config.pixel_selection,
+                "target_height": config.target_height,
+                "target_width": config.target_width,
+            }
+        # ffmpeg масштабирует кадры сам, поэтому его выборка отличается от выборки OpenCV
+        decoder = video_reader_options(config)
+        decoder.pop("ffmpeg_path", None)
+        raw_key = FrameCache.make_key("raw", dict(
+            video=cache.file_digest(self.video_path),
+            color_format=config.color_format,
+            frame_skip=config.frame_skip,
+            max_frames=config.max_frames,
+            decoder=decoder,
+            **geometry
+        ))
+        processed_key = FrameCache.make_key("processed", dict(
+            raw=raw_key,
+            output_color_format=config.output_color_format,
+            midpoint=config.midpoint,
+            steepness=config.steepness,
+            gamma=config.gamma,
+            max_brightness=config.max_brightness,
+            saturation_factor=config.saturation_factor,
+            precision=config.precision,
+            dithering=config.dithering,
+            smoothing=config.smoothing,
+            temporal_alpha=config.temporal_alpha,
+            attack_alpha=config.attack_alpha,
+            release_alpha=config.release_alpha,
+            min_cutoff=config.min_cutoff,
+            beta=config.beta,
+            d_cutoff=config.d_cutoff
+        ))
+        return raw_key, processed_key
+
+    def _write_cached_output(self, cached: "BinaryFrameReader") -> int:
+        """Записывает итоговые цвета из записи кэша в файл вывода блоками по batch_size."""
+        writer = self._open_frame_writer()
+        exporter = self._open_packet_exporter(writer.path)
+        try:
+            for start in range(0, len(cached), self.config.batch_size):
+                block = np.asarray(cached.frames[start:start + self.config.batch_size])
+                frame_numbers = [cached.frame_number(index) for index in range(start, start + len(block))]
+                write_frame_block(writer, frame_numbers, block, cached.layout)
+                if exporter is not None:
+                    exporter.write_frames(frame_numbers, block, cached.layout)
+            self._write_fixture_index(writer.path)
+        finally:
+            writer.close()
+            if exporter is not None:
+                exporter.close()
+        logger.info(f"Данные сохранены в {writer.path}")
+        return writer.count
+
+    def _open_packet_exporter(self, output_path: str, resume: Optional[Dict[str, Any]] = None) -> Optional["PacketExporter"]:
+        """
+        Открывает экспорт пакетов DMX/SPI рядом с файлом вывода, если задан файл раскладки
+        или у светильников карт пикселей есть адреса DMX.
+        """
+        if not self.config.mapping_path and not has_dmx_fixtures(self.config.zones):
+            return None
+        return PacketExporter(
+            load_strip_mapping(self.config.mapping_path) if self.config.mapping_path else [],
+            os.path.splitext(output_path.removesuffix(".gz"))[0],
+            self.config.output_color_format,
+            fps=self.video_info.get("fps", 0.0),
+            frame_step=self.config.frame_skip + 1,
+            resume=resume,
+            zones=self.config.zones
+        )
+
+    def _write_fixture_index(self, output_path: str) -> None:
+        """
+        Пишет <вывод>_fixtures.json - индекс светодиодов матриц и карт пикселей:
+        для каждого светильника его id и номер светодиода в зоне, для матрицы - размер сетки.
+        """
+        index: Dict[str, Any] = {}
+        for zone in self.config.zones:
+            if zone.zone_type == ZoneType.MATRIX:
+                index[zone.name] = {"columns": zone.grid[0], "rows": zone.grid[1]}
+            elif zone.zone_type == ZoneType.PIXELMAP:
+                index[zone.name] = {"fixtures": {
+                    fixture.id: dict(
+                        {"led": led, "rect": list(fixture.rect)},
+                        **({"universe": fixture.universe, "channel": fixture.channel, "format": fixture.dmx_format.value}
+                           if fixture.universe is not None else {})
+                    )
+                    for led, fixture in enumerate(zone.fixtures)
+                }}
+        if not index:
+            return
+        path = os.path.splitext(output_path.removesuffix(".gz"))[0] + "_fixtures.json"
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+        logger.info(f"Индекс светильников сохранён в {path}")
+
+    def output_file_path(self) -> str:
+        """Путь файла вывода с учётом output_format и сжатия JSON."""
+        output_path = self._resolve_output_path()
+        if self.config.output_format == OutputFormat.ENCODED:
+            return os.path.splitext(output_path)[0] + EncodedFrameWriter.EXTENSION
+        if self.config.output_format == OutputFormat.BINARY:
+            return os.path.splitext(output_path)[0] + BinaryFrameWriter.EXTENSION
+        return output_path + ".gz" if self.config.compress_output else output_path
+
+    def _open_frame_writer(self, resume: Optional[Dict[str, Any]] = None, staged: bool = False) -> Any:
+        """
+        Открывает потоковый писатель кадров в формате output_format.
+        resume - состояние писателя из контрольной точки: файл продолжается с сохранённой позиции.
+        staged - сжатый JSON пишется через промежуточный несжатый файл (для контрольных точек).
+        """
+        output_path = self._resolve_output_path()
+        if self.config.output_format == OutputFormat.ENCODED:
+            return EncodedFrameWriter(
+                os.path.splitext(output_path)[0] + EncodedFrameWriter.EXTENSION,
+                fps=self.video_info.get("fps", 0.0),
+                color_format=self.config.output_color_format,
+                frame_step=self.config.frame_skip + 1,
+                keyframe_interval=self.config.encoded_keyframe_interval,
+                codec=self.config.codec,
+                resume=resume
+            )
+        if self.config.output_format == OutputFormat.BINARY:
+            return BinaryFrameWriter(
+                os.path.splitext(output_path)[0] + BinaryFrameWriter.EXTENSION,
+                fps=self.video_info.get("fps", 0.0),
+                color_format=self.config.output_color_format,
+                frame_step=self.config.frame_skip + 1,
+                resume=resume
+            )
+        return StreamingJsonWriter(output_path, self.config.compress_output, staged=staged, resume=resume)
+
+    def _resolve_output_path(self) -> str:
+        if os.path.isdir(self.output_json_path):
+            self.output_json_path = os.path.join(self.output_json_path, "output.json")
+
+        output_dir = os.path.dirname(self.output_json_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        return self.output_json_path
+
+    def save_to_json(self, data: List[Dict[str, Any]]) -> None:
+        try:
+            self._resolve_output_path()
+
+            if self.config.compress_output:
+                output_path = self.output_json_path + ".gz"
+                with gzip.open(output_path, 'wt', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+                logger.info(f"Данные сохранены с сжатием в {output_path}")
+            else:
+                with open(self.output_json_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+                logger.info(f"Данные сохранены в {self.output_json_path}")
+
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении JSON: {e}")
+            raise
+
+def pixels_to_rgb(pixels: np.ndarray, color_format: ColorFormat) -> np.ndarray:
+    """
+    Приводит цвета вывода к RGB так же, как DmxFrameCalculator.ProcessPixelData:
+    белый RGBW добавляется по трети, тёплый/холодный белый RGBWMix - по половине,
+    HSV считается заданным в диапазоне 0-255 по всем компонентам.
+    """
+    values = pixels.astype(np.int32)
+    if color_format == ColorFormat.RGBW and values.shape[-1] >= 4:
+        rgb = values[..., :3] + (values[..., 3:4] // 3)
+    elif color_format == ColorFormat.RGBWMix and values.shape[-1] >= 5:
+        warm = values[..., 3] // 2
+        cool = values[..., 4] // 2
+        rgb = np.stack([values[..., 0] + warm, values[..., 1] + warm + cool, values[..., 2] + cool], axis=-1)
+    elif color_format == ColorFormat.HSV:
+        h, s, v = [values[..., i].astype(np.float32) / 255 for i in range(3)]
+        sector = np.floor(h * 6)
+        f = h * 6 - sector
+        sector = sector.astype(np.int32) % 6
+        p, q, t = v * (1 - s), v * (1 - s * f), v * (1 - s * (1 - f))
+        r = np.choose(sector, [v, q, p, p, t, v])
+        g = np.choose(sector, [t, v, v, q, p, p])
+        b = np.choose(sector, [p, p, t, v, v, q])
+        rgb = (np.stack([r, g, b], axis=-1) * 255).astype(np.int32)
+    else:
+        rgb = values[..., :3]
+    return np.clip(rgb, 0, 255).astype(np.uint8)
+
+class DmxPacketEncoder:
+    """
+    Раскладывает цвета кадров по вселенным DMX (512 каналов, без стартового кода) по раскладке лент.
+    Целевые форматы и отбрасывание светодиодов, не помещающихся во вселенную, - как в DmxFrameCalculator.
+    """
+    CHANNELS = 512
+
+    def __init__(self, strips: List[StripMapping], color_format: ColorFormat, zones: Optional[List[Zone]] = None) -> None:
+        self.strips: List[StripMapping] = [strip for strip in strips if strip.output == "dmx"]
+        self.color_format: ColorFormat = color_format
+        addressed = [
+            (zone.name, index, fixture)
+            for zone in zones or [] if zone.zone_type == ZoneType.PIXELMAP
+            for index, fixture in enumerate(zone.fixtures) if fixture.universe is not None
+        ]
+        self.universes: List[int] = sorted({strip.universe for strip in self.strips} | {fixture.universe for _, _, fixture in addressed})
+        # Светильники с адресом DMX, сгруппированные по зоне и формату: (зона, формат,
+        # индексы светодиодов в зоне, индексы каналов в буфере вселенных кадра)
+        self.fixture_groups: List[Tuple[str, ColorFormat, np.ndarray, np.ndarray]] = []
+        for (zone_name, dmx_format), group in itertools.groupby(
+            sorted(addressed, key=lambda item: (item[0], item[2].dmx_format.value)),
+            key=lambda item: (item[0], item[2].dmx_format)
+        ):
+            group = list(group)
+            channels = self.to_dmx_format(np.zeros((1, 3), dtype=np.uint8), dmx_format).shape[-1]
+            first = np.array([self.universes.index(fixture.universe) * self.CHANNELS + fixture.channel - 1 for _, _, fixture in group])
+            self.fixture_groups.append((
+                zone_name,
+                dmx_format,
+                np.array([index for _, index, _ in group]),
+                (first[:, np.newaxis] + np.arange(channels)).ravel()
+            ))
+
+    @staticmethod
+    def to_dmx_format(rgb: np.ndarray, dmx_format: ColorFormat) -> np.ndarray:
+        r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+        if dmx_format in [ColorFormat.RGBW, ColorFormat.HSV]:
+            return np.concatenate([rgb, np.minimum(np.minimum(r, g), b)[..., np.newaxis]], axis=-1)
+        elif dmx_format == ColorFormat.RGBWMix:
+            return np.concatenate([rgb, np.stack([np.minimum(r, g), np.minimum(b, g)], axis=-1)], axis=-1)
+        return rgb
+
+    def encode(self, block: np.ndarray, layout: List[Tuple[str, int]]) -> List[bytes]:
+        """Возвращает для каждого кадра блока вселенные self.universes подряд по 512 байт."""
+        buffer = np.zeros((len(block), len(self.universes), self.CHANNELS), dtype=np.uint8)
+        for strip in self.strips:
+            values = self.to_dmx_format(pixels_to_rgb(strip_pixels(block, layout, strip), self.color_format), strip.dmx_format)
+            channels = values.shape[-1]
+            fit = min(values.shape[1], (self.CHANNELS - strip.channel + 1) // channels)
+            first = strip.channel - 1
+            buffer[:, self.universes.index(strip.universe), first:first + fit * channels] = values[:, :fit].reshape(len(block), -1)
+        flat = buffer.reshape(len(block), -1)
+        for zone_name, dmx_format, leds, targets in self.fixture_groups:
+            offset = zone_offset(layout, zone_name)
+            values = self.to_dmx_format(pixels_to_rgb(block[:, offset + leds], self.color_format), dmx_format)
+            flat[:, targets] = values.reshape(len(block), -1)
+        return [frame.tobytes() for frame in buffer]
+
+class SpiPacketEncoder:
+    """
+    Готовые строки для последовательного порта SPI-контроллера в формате DataSender:
+    "<режим>:<HEX>\\r\\n" на ленту; яркость, гамма и выделение белого - как в ColorProcessor,
+    конечные чёрные пиксели отбрасываются как в OptimizeHexString.
+    Для каждого кадра возвращаются два пакета: изменения относительно предыдущего кадра
+    (ленты без изменений не отправляются, как в DataSender) и полное состояние для перехода к кадру.
+    """
+    PREFIX = {SpiDataMode.MONOCHROME1: 0, SpiDataMode.MONOCHROME2: 1, SpiDataMode.RGBW: 2, SpiDataMode.RGB: 3}
+    HEX = np.array([b"%02X" % value for value in range(256)], dtype="S2")
+
+    def __init__(self, strips: List[StripMapping], color_format: ColorFormat) -> None:
+        self.strips: List[StripMapping] = [strip for strip in strips if strip.output == "spi"]
+        self.color_format: ColorFormat = color_format
+        self._previous: List[Optional[bytes]] = [None] * len(self.strips)
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def gamma_table(gamma: float) -> np.ndarray:
+        table = np.rint((np.arange(256, dtype=np.float32) / np.float32(255)) ** np.float32(gamma) * np.float32(255))
+        return np.clip(table, 0, 255).astype(np.uint8)
+
+    @classmethod
+    def device_values(cls, rgb: np.ndarray, strip: StripMapping) -> np.ndarray:
+        """Байты пикселей ленты (frames, leds, 1/3/4) после яркости и гаммы."""
+        values = rgb.astype(np.float32)
+        if strip.mode in [SpiDataMode.MONOCHROME1, SpiDataMode.MONOCHROME2]:
+            values = (values[..., 0] * np.float32(0.299) + values[..., 1] * np.float32(0.587) + values[..., 2] * np.float32(0.114))[..., np.newaxis]
+        elif strip.mode == SpiDataMode.RGBW:
+            white = values.min(axis=-1, keepdims=True)
+            values = np.concatenate([values - white, white], axis=-1)
+        result = np.clip(values * np.float32(strip.brightness), 0, 255).astype(np.uint8)
+        if strip.gamma is not None:
+            result = cls.gamma_table(strip.gamma)[result]
+        return result
+
+    def encode(self, block: np.ndarray, layout: List[Tuple[str, int]]) -> List[Tuple[bytes, bytes]]:
+        lines = []
+        for strip in self.strips:
+            rgb = pixels_to_rgb(strip_pixels(block, layout, strip), self.color_format)
+            values = np.repeat(self.device_values(rgb, strip), strip.leds_per_segment, axis=1)
+            lit = values.any(axis=-1)
+            # Длина после отбрасывания конечных чёрных пикселей; полностью чёрная лента отправляется целиком
+            lengths = np.where(lit.any(axis=1), values.shape[1] - np.argmax(lit[:, ::-1], axis=1), values.shape[1])
+            prefix = f"{self.PREFIX[strip.mode]}:".encode("ascii")
+            hex_values = self.HEX[values.reshape(len(block), -1)]
+            width = values.shape[-1]
+            lines.append([prefix + hex_values[i, :lengths[i] * width].tobytes() + b"\r\n" for i in range(len(block))])
+
+        packets = []
+        for i in range(len(block)):
+            full = []
+            delta = []
+            for index, strip_lines in enumerate(lines):
+                line = strip_lines[i]
+                full.append(line)
+                if line != self._previous[index]:
+                    delta.append(line)
+                    self._previous[index] = line
+            packets.append((b"".join(delta), b"".join(full)))
+        return packets
+
+    def state(self) -> Dict[str, Any]:
+        """Последние отправленные строки лент: от них считаются пакеты изменений после продолжения."""
+        return {"previous": [line.decode("ascii") if line is not None else None for line in self._previous]}
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        self._previous = [line.encode("ascii") if line is not None else None for line in state["previous"]]
+
+def zone_offset(layout: List[Tuple[str, int]], zone_name: str) -> int:
+    """Первый светодиод зоны в склеенном выводе."""
+    offset = 0
+    for name, leds in layout:
+        if name == zone_name:
+            return offset
+        offset += leds
+    raise ValueError(f"Зона {zone_name} отсутствует в выводе")
+
+def strip_pixels(block: np.ndarray, layout: List[Tuple[str, int]], strip: StripMapping) -> np.ndarray:
+    """Вырезает из блока (frames, leds, channels) светодиоды ленты с учётом зоны и направления."""
+    offset, leds = 0, block.shape[1]
+    if strip.zone is not None:
+        for name, zone_leds in layout:
+            if name == strip.zone:
+                leds = zone_leds
+                break
+            offset += zone_leds
+        else:
+            raise ValueError(f"Лента {strip.name}: зона {strip.zone} отсутствует в выводе")
+    count = leds - strip.start if strip.leds is None else min(strip.leds, leds - strip.start)
+    pixels = block[:, offset + strip.start:offset + strip.start + max(0, count)]
+    return pixels[:, ::-1] if strip.reverse else pixels
+
+class PacketStreamWriter:
+    """
+    Файл готовых пакетов с индексом для перехода к кадру за O(1).
+    Заголовок (little-endian): magic "AMBP", версия, размер заголовка, тип (0 - DMX, 1 - SPI),
+    fps, количество кадров, номер первого кадра, шаг, пакетов на кадр, смещение индекса,
+    количество вселенных и их номера (uint16). Пакеты идут подряд с header_size,
+    индекс в конце файла - uint64 смещения начала каждого пакета и конца данных.
+    """
+    MAGIC = b"AMBP"
+    VERSION = 1
+    EXTENSION = ".ambp"
+    HEADER = struct.Struct("<4sHHBdIIIHQH")
+    KIND_DMX = 0
+    KIND_SPI = 1
+    ALIGNMENT = 64
+
+    def __init__(
+        self,
+        path: str,
+        kind: int,
+        fps: float,
+        frame_step: int = 1,
+        packets_per_frame: int = 1,
+        universes: Optional[List[int]] = None,
+        resume: Optional[Dict[str, Any]] = None
+    ) -> None:
+        self.path: str = path
+        self.kind: int = kind
+        self.fps: float = fps
+        self.frame_step: int = frame_step
+        self.packets_per_frame: int = packets_per_frame
+        self.universes: List[int] = universes or []
+        self.count: int = 0
+        self._first_frame: int = 1
+        self._offsets: List[int] = [0]
+        size = self.HEADER.size + 2 * len(self.universes)
+        self._header_size: int = math.ceil(size / self.ALIGNMENT) * self.ALIGNMENT
+        if resume is not None:
+            self.count = resume["count"]
+            self._first_frame = resume["first_frame"]
+            self._offsets = resume["offsets"].tolist()
+            self._file = reopen_for_append(path, resume["size"])
+        else:
+            self._file = open(path, 'wb')
+            self._write_header(0)
+
+    @property
+    def next_frame(self) -> Optional[int]:
+        """Номер, который должен быть у следующего кадра; None до первого кадра."""
+        return self._first_frame + self.count * self.frame_step if self.count else None
+
+    def _write_header(self, index_offset: int) -> None:
+        header = self.HEADER.pack(
+            self.MAGIC, self.VERSION, self._header_size, self.kind, self.fps, self.count,
+            self._first_frame, self.frame_step, self.packets_per_frame, index_offset, len(self.universes)
+        )
+        header += struct.pack(f"<{len(self.universes)}H", *self.universes)
+        self._file.seek(0)
+        self._file.write(header.ljust(self._header_size, b"\0"))
+
+    def write_frame(self, frame_number: int, packets: Tuple[bytes, ...]) -> None:
+        if len(packets) != self.packets_per_frame:
+            raise ValueError(f"Ожидалось {self.packets_per_frame} пакетов на кадр, получено {len(packets)}")
+        if self.count == 0:
+            self._first_frame = frame_number
+        elif frame_number != self.next_frame:
+            raise ValueError(f"Кадр {frame_number}: ожидался кадр {self.next_frame}")
+        for packet in packets:
+            self._file.write(packet)
+            self._offsets.append(self._offsets[-1] + len(packet))
+        self.count += 1
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """Сбрасывает данные на диск и возвращает состояние для продолжения записи."""
+        self._file.flush()
+        return {
+            "size": self._file.tell(),
+            "count": self.count,
+            "first_frame": self._first_frame,
+            "offsets": np.asarray(self._offsets, dtype=np.uint64),
+        }
+
+    def suspend(self) -> None:
+        """Закрывает файл без индекса - запись продолжится с контрольной точки."""
+        self._file.close()
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self._file.seek(0, os.SEEK_END)
+        index_offset = self._file.tell()
+        self._file.write(np.asarray(self._offsets, dtype="<u8").tobytes())
+        self._write_header(index_offset)
+        self._file.close()
+
+class PacketStreamReader:
+    """Чтение файла PacketStreamWriter: пакет кадра - срез memmap по индексу."""
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        with open(path, 'rb') as f:
+            (magic, version, header_size, kind, fps, frame_count, first_frame, frame_step,
+             packets_per_frame, index_offset, universe_count) = PacketStreamWriter.HEADER.unpack(f.read(PacketStreamWriter.HEADER.size))
+            if magic != PacketStreamWriter.MAGIC:
+                raise ValueError(f"Файл {path} не является файлом пакетов")
+            if version != PacketStreamWriter.VERSION:
+                raise ValueError(f"Неподдерживаемая версия файла пакетов: {version}")
+            self.universes: List[int] = list(struct.unpack(f"<{universe_count}H", f.read(2 * universe_count)))
+        self.kind: int = kind
+        self.fps: float = fps
+        self.frame_count: int = frame_count
+        self.first_frame: int = first_frame
+        self.frame_step: int = frame_step
+        self.packets_per_frame: int = packets_per_frame
+        data_size = index_offset - header_size
+        self.offsets: np.ndarray = np.memmap(path, dtype="<u8", mode='r', offset=index_offset, shape=(frame_count * packets_per_frame + 1,))
+        self.data: np.ndarray = (
+            np.memmap(path, dtype=np.uint8, mode='r', offset=header_size, shape=(data_size,))
+            if data_size > 0 else np.zeros(0, dtype=np.uint8)
+        )
+
+    def __len__(self) -> int:
+        return self.frame_count
+
+    def index_of(self, frame_number: int) -> int:
+        """Индекс кадра по номеру кадра видео."""
+        return (frame_number - self.first_frame) // self.frame_step
+
+    def packet(self, index: int, packet: int = 0) -> memoryview:
+        """Пакет кадра index: для DMX - вселенные подряд, для SPI 0 - изменения, 1 - полное состояние."""
+        position = index * self.packets_per_frame + packet
+        return memoryview(self.data)[int(self.offsets[position]):int(self.offsets[position + 1])]
+
+    def universe(self, index: int, universe: int) -> memoryview:
+        """512 каналов вселенной universe кадра index (только DMX)."""
+        start = self.universes.index(universe) * DmxPacketEncoder.CHANNELS
+        return self.packet(index)[start:start + DmxPacketEncoder.CHANNELS]
+
+def has_dmx_fixtures(zones: Optional[List[Zone]]) -> bool:
+    return any(
+        fixture.universe is not None
+        for zone in zones or [] if zone.zone_type == ZoneType.PIXELMAP
+        for fixture in zone.fixtures
+    )
+
+class PacketExporter:
+    """
+    Пишет пакеты DMX и SPI по раскладке лент рядом с выводом по мере поступления кадров.
+    Светильники карт пикселей с адресом DMX (zones) добавляются в пакеты DMX без раскладки лент.
+    """
+    def __init__(
+        self,
+        strips: List[StripMapping],
+        base_path: str,
+        color_format: ColorFormat,
+        fps: float,
+        frame_step: int = 1,
+        resume: Optional[Dict[str, Any]] = None,
+        zones: Optional[List[Zone]] = None
+    ) -> None:
+        resume_states = iter(resume["writers"] if resume is not None else [])
+        self.frame_step: int = frame_step
+        # Последний экспортированный кадр - им заполняются пропуски в номерах кадров
+        self._last: Optional[np.ndarray] = resume.get("last") if resume is not None else None
+        self.dmx: Optional[DmxPacketEncoder] = None
+        self.spi: Optional[SpiPacketEncoder] = None
+        self.writers: List[PacketStreamWriter] = []
+        self._dmx_writer: Optional[PacketStreamWriter] = None
+        self._spi_writer: Optional[PacketStreamWriter] = None
+        if any(strip.output == "dmx" for strip in strips) or has_dmx_fixtures(zones):
+            self.dmx = DmxPacketEncoder(strips, color_format, zones)
+            self._dmx_writer = PacketStreamWriter(
+                f"{base_path}_dmx{PacketStreamWriter.EXTENSION}", PacketStreamWriter.KIND_DMX, fps, frame_step,
+                universes=self.dmx.universes, resume=next(resume_states, None)
+            )
+            self.writers.append(self._dmx_writer)
+        if any(strip.output == "spi" for strip in strips):
+            self.spi = SpiPacketEncoder(strips, color_format)
+            self._spi_writer = PacketStreamWriter(
+                f"{base_path}_spi{PacketStreamWriter.EXTENSION}", PacketStreamWriter.KIND_SPI, fps, frame_step, packets_per_frame=2,
+                resume=next(resume_states, None)
+            )
+            self.writers.append(self._spi_writer)
+            if resume is not None:
+                self.spi.load_state(resume["spi"])
+
+    def write_frames(self, frame_numbers: List[int], block: np.ndarray, layout: List[Tuple[str, int]]) -> None:
+        """Кодирует и пишет блок кадров; пропущенные кадры заполняются повтором предыдущего."""
+        if not self.writers or not len(frame_numbers):
+            return
+        frame_numbers, block = fill_frame_gaps(frame_numbers, block, self.writers[0].next_frame, self.frame_step, self._last)
+        self._last = np.array(block[-1])
+        if self.dmx is not None:
+            for frame_number, packet in zip(frame_numbers, self.dmx.encode(block, layout)):
+                self._dmx_writer.write_frame(frame_number, (packet,))
+        if self.spi is not None:
+            for frame_number, packets in zip(frame_numbers, self.spi.encode(block, layout)):
+                self._spi_writer.write_frame(frame_number, packets)
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """Позиции файлов пакетов и состояние кодировщика SPI (пакеты изменений зависят от прошлого кадра)."""
+        return {
+            "writers": [writer.checkpoint() for writer in self.writers],
+            "spi": self.spi.state() if self.spi is not None else None,
+            "last": self._last,
+        }
+
+    def suspend(self) -> None:
+        for writer in self.writers:
+            writer.suspend()
+
+    def close(self) -> None:
+        for writer in self.writers:
+            writer.close()
+            logger.info(f"Пакеты сохранены в {writer.path}")
+
+def export_packets(input_path: str, mapping_path: str, output_base: Optional[str] = None, fps: float = 30.0, batch_size: int = 100) -> List[str]:
+    """
+    Экспортирует готовый вывод (JSON, JSON.gz или .ambf) в файлы пакетов DMX/SPI.
+    Возвращает пути записанных файлов.
+    """
+    frame_numbers, array, layout, color_format = load_frames_file(input_path)
+    if color_format is None:
+        color_format = guess_color_format(array.shape[-1] if array.ndim == 3 else 3)
+    if input_path.endswith(FRAME_FILE_EXTENSIONS):
+        # В .ambf/.ambz хранится частота исходного видео
+        fps = open_frame_reader(input_path).fps
+    frame_step = int(np.diff(frame_numbers).min()) if len(frame_numbers) > 1 else 1
+    if output_base is None:
+        output_base = os.path.splitext(input_path.removesuffix(".gz"))[0]
+    exporter = PacketExporter(load_strip_mapping(mapping_path), output_base, color_format, fps, frame_step)
+    try:
+        for start in range(0, len(frame_numbers), batch_size):
+            exporter.write_frames(frame_numbers[start:start + batch_size], np.asarray(array[start:start + batch_size]), layout)
+    finally:
+        exporter.close()
+    return [writer.path for writer in exporter.writers]
+
+class LiveFrameSource:
+    """
+    Захват кадров с камеры (индекс устройства), потока (RTSP/UDP URL) или файла в отдельном потоке.
+    Файл воспроизводится с собственной частотой кадров, поэтому подменяет камеру при проверке.
+    При DropPolicy.LATEST хранится только последний кадр: если обработка не успевает,
+    устаревшие кадры отбрасываются и задержка не накапливается.
+    """
+    def __init__(self, source: str, drop_policy: DropPolicy = DropPolicy.LATEST, realtime: Optional[bool] = None, queue_size: int = 2) -> None:
+        self.source: Any = int(source) if source.isdigit() else source
+        self.drop_policy: DropPolicy = drop_policy
+        self.realtime: bool = os.path.isfile(source) if realtime is None else realtime
+        self.cap = cv2.VideoCapture(self.source)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Не удалось открыть источник: {source}")
+        if not self.realtime:
+            # Минимальный буфер драйвера: кадры не должны ждать в очереди захвата
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.fps: float = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.width: int = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height: int = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.captured: int = 0
+        self.dropped: int = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=1 if drop_policy == DropPolicy.LATEST else queue_size)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._capture, name="live-capture", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def _capture(self) -> None:
+        started = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                if self.realtime:
+                    delay = started + self.captured / self.fps - time.perf_counter()
+                    if delay > 0 and self._stop.wait(delay):
+                        break
+                item = (self.captured, time.perf_counter(), frame)
+                self.captured += 1
+                if self.drop_policy == DropPolicy.LATEST:
+                    # Поток захвата - единственный писатель, после выемки место в очереди гарантировано
+                    try:
+                        self._queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+                    self._queue.put_nowait(item)
+                else:
+                    while not self._stop.is_set():
+                        try:
+                            self._queue.put(item, timeout=0.1)
+                            break
+                        except queue.Full:
+                            continue
+        finally:
+            self.cap.release()
+
+    def read(self) -> Optional[Tuple[int, float, np.ndarray]]:
+        """Следующий кадр (номер, время захвата, кадр) или None, если источник закончился."""
+        while True:
+            try:
+                return self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if not self._thread.is_alive() and self._queue.empty():
+                    return None
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+class ArtNetSender:
+    """
+    Отправляет цвета кадра пакетами ArtDMX в том же формате, что ArtNetDmxPacket в Unity:
+    "Art-Net", OpCode (little-endian), версия протокола, sequence, physical,
+    вселенная (little-endian), длина (big-endian) и 512 каналов.
+    Светодиоды раскладываются по вселенным подряд начиная со start_universe;
+    как и в DmxFrameCalculator, светодиод не разрывается между вселенными.
+    """
+    PORT = 6454
+    ID = b"Art-Net\0"
+    OP_DMX = 0x5000
+    PROTOCOL_VERSION = 14
+    CHANNELS = 512
+
+    def __init__(self, host: str, port: int = PORT, start_universe: int = 0) -> None:
+        self.address: Tuple[str, int] = (host, port)
+        self.start_universe: int = start_universe
+        self.sequence: int = 0
+        self.sock: socket.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+
+    @classmethod
+    def build_packet(cls, universe: int, data: bytes, sequence: int = 0, physical: int = 0) -> bytes:
+        if len(data) % 2:
+            data += b"\0"
+        return (cls.ID + struct.pack("<H", cls.OP_DMX) + struct.pack(">H", cls.PROTOCOL_VERSION)
+                + struct.pack("<BBH", sequence, physical, universe) + struct.pack(">H", len(data)) + data)
+
+    def universes(self, pixels: np.ndarray) -> List[Tuple[int, bytes]]:
+        """Раскладывает цвета (leds, channels) по вселенным: список (вселенная, 512 каналов)."""
+        leds_per_universe = self.CHANNELS // pixels.shape[-1]
+        return [
+            (self.start_universe + index, pixels[start:start + leds_per_universe].tobytes().ljust(self.CHANNELS, b"\0"))
+            for index, start in enumerate(range(0, len(pixels), leds_per_universe))
+        ]
+
+    def send(self, pixels: np.ndarray) -> None:
+        # Sequence 0 означает "без порядка", поэтому счётчик идёт по кругу 1..255
+        self.sequence = self.sequence % 255 + 1
+        for universe, data in self.universes(pixels):
+            self.sock.sendto(self.build_packet(universe, data, self.sequence), self.address)
+
+    def close(self) -> None:
+        self.sock.close()
+
+class UdpSender:
+    """Отправляет цвета кадра одной UDP-датаграммой: байты leds x channels подряд."""
+    MAX_DATAGRAM = 65507
+
+    def __init__(self, host: str, port: int) -> None:
+        self.address: Tuple[str, int] = (host, port)
+        self.sock: socket.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def send(self, pixels: np.ndarray) -> None:
+        data = np.ascontiguousarray(pixels, dtype=np.uint8).tobytes()
+        if len(data) > self.MAX_DATAGRAM:
+            raise ValueError(f"Кадр {len(data)} байт не помещается в одну UDP-датаграмму")
+        self.sock.sendto(data, self.address)
+
+    def close(self) -> None:
+        self.sock.close()
+
+class LiveColorProcessor:
+    """
+    Живой режим: каждый кадр источника сразу проходит извлечение, цветовую обработку
+    и причинное сглаживание TemporalFilter и отправляется, без батчей и пула процессов,
+    чтобы задержка не превышала 1-2 кадров.
+    """
+    def __init__(self, config: VideoConfig, source: LiveFrameSource, sender: Any) -> None:
+        if config.smoothing == SmoothingFilter.ZERO_PHASE:
+            raise ValueError("Фильтр zero_phase требует всего видео и недоступен в живом режиме")
+        self.config: VideoConfig = config
+        self.source: LiveFrameSource = source
+        self.sender: Any = sender
+        if config.zones:
+            zones = config.zones
+        else:
+            # Один край - частный случай зоны с тем же планом обрезки, что у process_frame_batch_worker
+            leds = config.target_height if config.pixel_selection in [PixelSelection.LEFT, PixelSelection.RIGHT] else config.target_width
+            zones = [Zone(config.pixel_selection.value, ZoneType.EDGE, leds, edge=config.pixel_selection)]
+        self.linear: bool = config.precision == ColorPrecision.LINEAR
+        self.sampler: ZoneSampler = ZoneSampler(zones, source.width, source.height, config.color_format, self.linear)
+        self.lut: np.ndarray = FrameProcessor.build_lut(config.midpoint, config.steepness, config.gamma)
+        self.temporal_filter: TemporalFilter = TemporalFilter.from_config(config, source.fps)
+        self.quantizer: OutputQuantizer = OutputQuantizer(config)
+        self._frame_index: int = 0
+        self._warm_up()
+
+    def _warm_up(self) -> None:
+        """
+        Прогоняет чёрный кадр через весь тракт до запуска захвата: разовые затраты первого вызова
+        (загрузка модулей, инициализация OpenCV) не попадают в задержку первых живых кадров.
+        Состояние сглаживания и дизеринга затем сбрасывается.
+        """
+        self.process_frame(np.zeros((self.source.height, self.source.width, 3), dtype=np.uint8))
+        self.temporal_filter.reset()
+        self.quantizer = OutputQuantizer(self.config)
+        self._frame_index = 0
+
+    def process_frame(self, frame: np.ndarray) -> np.ndarray:
+        """Возвращает сглаженные цвета кадра uint8 (leds, channels)."""
+        if self.linear:
+            colors = FrameProcessor.process_colors_linear(
+                self.sampler.sample(frame)[np.newaxis], self.config.output_color_format, self.config.midpoint, self.config.steepness
+            )
+        else:
+            colors = FrameProcessor.process_colors(
+                self.sampler.sample(frame)[np.newaxis],
+                self.config.output_color_format,
+                max_brightness=self.config.max_brightness,
+                saturation_factor=self.config.saturation_factor,
+                lut=self.lut
+            )
+        self._frame_index += 1
+        return self.quantizer.quantize([self._frame_index], self.temporal_filter.process(colors))[0]
+
+    def run(self, max_frames: int = 0) -> Dict[str, Any]:
+        """
+        Обрабатывает кадры до конца источника, max_frames отправленных кадров или Ctrl+C.
+        Возвращает статистику: отправлено, отброшено, средняя и максимальная задержка
+        от захвата кадра до отправки, мс.
+        """
+        sent = 0
+        latencies: List[float] = []
+        self.source.start()
+        logger.info(f"Живой режим: {self.source.width}x{self.source.height} @ {self.source.fps:.1f} fps, "
+                    f"политика отбрасывания {self.source.drop_policy.value}")
+        try:
+            while max_frames <= 0 or sent < max_frames:
+                item = self.source.read()
+                if item is None:
+                    break
+                _, captured_at, frame = item
+                self.sender.send(self.process_frame(frame))
+                latencies.append(time.perf_counter() - captured_at)
+                sent += 1
+        except KeyboardInterrupt:
+            logger.info("Живой режим остановлен пользователем")
+        finally:
+            self.source.stop()
+            self.sender.close()
+
+        stats = {
+            "sent": sent,
+            "dropped": self.source.dropped,
+            "mean_latency_ms": 1000 * float(np.mean(latencies)) if latencies else 0.0,
+            "max_latency_ms": 1000 * float(np.max(latencies)) if latencies else 0.0,
+        }
+        logger.info(f"Отправлено кадров: {stats['sent']}, отброшено: {stats['dropped']}, "
+                    f"задержка средняя {stats['mean_latency_ms']:.1f} мс, максимальная {stats['max_latency_ms']:.1f} мс")
+        return stats
+
+def reopen_for_append(path: str, size: int, text: bool = False) -> Any:
+    """Открывает файл для продолжения записи: отбрасывает всё после size и встаёт в конец."""
+    if not os.path.exists(path) or os.path.getsize(path) < size:
+        raise RuntimeError(f"Файл {path} короче, чем записано в контрольной точке")
+    file = open(path, 'r+', encoding='utf-8') if text else open(path, 'r+b')
+    file.truncate(size)
+    file.seek(0, os.SEEK_END)
+    return file
+
+# Параметры, от которых не зависит содержимое вывода: не входят в отметки актуальности и контрольные точки
+EXECUTION_SETTINGS = {
+    "config", "batch_size", "num_processes", "shared_memory", "ring_slots", "segmented_decode",
+    "segments", "keyframe_interval", "checkpoint_interval", "auto_tune", "warmup_frames", "memory_budget_mb", "cache_enabled", "cache_dir", "cache_max_size_mb",
+    "live_protocol", "live_host", "live_port", "start_universe", "drop_policy",
+}
+
+def output_signature(video_path: str, config: VideoConfig) -> Dict[str, Any]:
+    """Параметры, определяющие вывод: видео (путь, размер, mtime) и влияющие на результат настройки."""
+    stat = os.stat(video_path)
+    settings = {name: value for name, value in vars(config).items() if name not in EXECUTION_SETTINGS}
+    return {
+        "video": os.path.abspath(video_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "settings": FrameCache.make_key("job", settings),
+    }
+
+class Checkpoint:
+    """
+    Контрольная точка потоковой обработки - вложенный словарь состояния (позиции файлов вывода,
+    состояние сглаживания, последний записанный кадр). Сохраняется атомарно в один .npz:
+    массивы numpy - как есть, остальное - JSON в поле "state".
+    """
+    SUFFIX = ".ckpt"
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+
+    def save(self, state: Dict[str, Any]) -> None:
+        arrays: Dict[str, np.ndarray] = {}
+
+        def pack(value: Any) -> Any:
+            if isinstance(value, np.generic):
+                return value.item()
+            if isinstance(value, np.ndarray):
+                name = f"array{len(arrays)}"
+                arrays[name] = value
+                return {"__array__": name}
+            if isinstance(value, dict):
+                return {key: pack(item) for key, item in value.items()}
+            if isinstance(value, (list, tuple)):
+                return [pack(item) for item in value]
+            return value
+
+        meta = json.dumps(pack(state))
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, state=np.array(meta), **arrays)
+        os.replace(tmp_path, self.path)
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return None
+        with np.load(self.path) as data:
+            def unpack(value: Any) -> Any:
+                if isinstance(value, dict):
+                    if "__array__" in value:
+                        return data[value["__array__"]]
+                    return {key: unpack(item) for key, item in value.items()}
+                if isinstance(value, list):
+                    return [unpack(item) for item in value]
+                return value
+            return unpack(json.loads(str(data["state"])))
+
+    def remove(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+class SceneDetector:
+    """
+    Определение сцен по миниатюрам яркости областей, из которых берутся цвета (SignatureSampler).
+    Кадр статичен, если средняя разность с последним извлечённым (не статичным) кадром ниже
+    static_threshold: медленное изменение накапливается и не застывает до кадра обновления.
+    Не статичный кадр начинает новую сцену (склейка), если разность с предыдущим кадром не ниже
+    cut_threshold. Кадры с номером, кратным refresh_interval, статичными не считаются.
+    Воркеры применяют то же правило, начиная с первого кадра обновления в батче, поэтому
+    результат не зависит от разбиения на батчи.
+    Найденные склейки и диапазоны статичных кадров сохраняются как метаданные вывода.
+    """
+    def __init__(self, static_threshold: float, cut_threshold: float, refresh_interval: int = 0) -> None:
+        self.static_threshold: float = static_threshold
+        self.cut_threshold: float = cut_threshold
+        self.refresh_interval: int = refresh_interval
+        self.cuts: List[int] = []
+        # Диапазоны [первый, последний] номеров статичных кадров
+        self.static_ranges: List[List[int]] = []
+        self._previous: Optional[np.ndarray] = None
+        # Миниатюра последнего не статичного кадра, с которой сравниваются следующие
+        self._reference: Optional[np.ndarray] = None
+        self._last_frame: int = 0
+
+    def analyze(self, frame_numbers: List[int], signatures: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Возвращает маски (статичные кадры, склейки) блока."""
+        static = np.zeros(len(frame_numbers), dtype=bool)
+        cuts = np.zeros(len(frame_numbers), dtype=bool)
+        for index, (frame_number, signature) in enumerate(zip(frame_numbers, signatures)):
+            if (self._reference is not None and not self.is_refresh(frame_number, self.refresh_interval)
+                    and FrameProcessor.signature_change(signature, self._reference) < self.static_threshold):
+                static[index] = True
+                if self.static_ranges and self.static_ranges[-1][1] == self._last_frame:
+                    self.static_ranges[-1][1] = frame_number
+                else:
+                    self.static_ranges.append([frame_number, frame_number])
+            else:
+                if self._previous is not None and FrameProcessor.signature_change(signature, self._previous) >= self.cut_threshold:
+                    cuts[index] = True
+                    self.cuts.append(frame_number)
+                self._reference = signature
+            self._previous = signature
+            self._last_frame = frame_number
+        return static, cuts
+
+    @staticmethod
+    def is_refresh(frame_number: int, refresh_interval: int) -> bool:
+        return refresh_interval > 0 and frame_number % refresh_interval == 0
+
+    def metadata(self) -> Dict[str, Any]:
+        return {
+            "static_threshold": self.static_threshold,
+            "cut_threshold": self.cut_threshold,
+            "cuts": self.cuts,
+            "static": self.static_ranges,
+            "static_frames": sum(last - first + 1 for first, last in self.static_ranges),
+        }
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "previous": self._previous,
+            "reference": self._reference,
+            "last_frame": self._last_frame,
+            "cuts": self.cuts,
+            "static": self.static_ranges,
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        self._previous = state["previous"]
+        self._reference = state.get("reference", state["previous"])
+        self._last_frame = state["last_frame"]
+        self.cuts = list(state["cuts"])
+        self.static_ranges = [list(item) for item in state["static"]]
+
+class OutputPipeline:
+    """
+    Выходная часть потоковой обработки видео: временное сглаживание и запись файла вывода,
+    пакетов устройств, записи кэша и уменьшенного видео. Блоки цветов подаются в порядке кадров.
+    Фильтр zero_phase не причинный: для него цвета накапливаются компактным массивом (uint8,
+    в точном режиме - float32; с контрольными точками - в дописываемом файле <вывод>.pending)
+    и записываются в finish. Перевод в uint8 (и дизеринг) - OutputQuantizer.
+    С определением сцен статичные кадры повторяют цвета предыдущего, на склейках сглаживание
+    начинается заново, а склейки и статичные участки пишутся в <вывод>_scenes.json.
+    С checkpoint каждые checkpoint_interval кадров сохраняется состояние всех выходов;
+    resume - такое состояние, с которого запись продолжается.
+    writer - приёмник вывода вместо файла (FrameSink); тогда файлы рядом с выводом не пишутся.
+    """
+    def __init__(
+        self,
+        processor: "VideoColorProcessor",
+        processed_entry: Optional["CacheEntryWriter"] = None,
+        checkpoint: Optional[Checkpoint] = None,
+        resume: Optional[Dict[str, Any]] = None,
+        writer: Optional["FrameSink"] = None
+    ) -> None:
+        config = processor.config
+        resume = resume or {}
+        state = resume.get("pipeline", {})
+        self.processor: VideoColorProcessor = processor
+        self.config: VideoConfig = config
+        fps = processor.video_info.get("fps", 0.0) / (config.frame_skip + 1)
+        self.offline: bool = config.smoothing == SmoothingFilter.ZERO_PHASE
+        self.temporal_filter: Optional[TemporalFilter] = None if self.offline else TemporalFilter.from_config(config, fps)
+        if self.temporal_filter is not None and resume.get("filter"):
+            self.temporal_filter.load_state(resume["filter"])
+        self.quantizer: OutputQuantizer = OutputQuantizer(config)
+        if resume.get("quantizer"):
+            self.quantizer.load_state(resume["quantizer"])
+        self.scenes: Optional[SceneDetector] = None
+        if config.scene_detection:
+            self.scenes = SceneDetector(config.static_threshold, config.cut_threshold, config.refresh_interval)
+            if resume.get("scenes"):
+                self.scenes.load_state(resume["scenes"])
+        # Цвета последнего кадра до сглаживания - источник для статичного кадра в начале блока
+        self._last_colors: Optional[np.ndarray] = state.get("last_colors")
+        self.processed_entry: Optional[CacheEntryWriter] = processed_entry
+        self.checkpoint: Optional[Checkpoint] = checkpoint
+        self.signature: Optional[Dict[str, Any]] = output_signature(processor.video_path, config) if checkpoint else None
+        self.writer: Any = writer if writer is not None else processor._open_frame_writer(resume.get("writer"), staged=checkpoint is not None)
+        self.exporter: Optional[PacketExporter] = None
+        if self.writer.path:
+            self.exporter = processor._open_packet_exporter(self.writer.path, resume.get("exporter"))
+        self.layout: List[Tuple[str, int]] = [tuple(zone) for zone in state.get("layout", [])]
+        # Индекс в видео кадра, следующего за последним записанным
+        self.next_frame: int = state.get("next_frame", 0)
+        self._since_checkpoint: int = 0
+        self._pending_frames: List[int] = state["pending_frames"].tolist() if "pending_frames" in state else []
+        self._pending_shape: Tuple[int, ...] = tuple(state.get("pending_shape", ()))
+        self._pending_dtype: Any = np.float32 if config.precision == ColorPrecision.LINEAR else np.uint8
+        # Позиции склеек в накопленных кадрах: сцены сглаживаются zero_phase по отдельности
+        self._pending_cuts: List[int] = list(state.get("pending_cuts", []))
+        self._pending: List[np.ndarray] = []
+        self._pending_file: Optional[Any] = None
+        if self.offline and checkpoint is not None:
+            pending_path = self.writer.path + ".pending"
+            self._pending_file = reopen_for_append(pending_path, state["pending_size"]) if state else open(pending_path, 'wb')
+        self._video: Optional[cv2.VideoWriter] = None
+
+    def write(
+        self,
+        frame_numbers: List[int],
+        colors: Optional[np.ndarray],
+        layout: List[Tuple[str, int]],
+        display_frames: List[np.ndarray],
+        signatures: Optional[List[np.ndarray]] = None
+    ) -> None:
+        """
+        Принимает блок цветов после цветовой обработки (до сглаживания) и кадры для видео.
+        signatures - миниатюры кадров для определения сцен.
+        """
+        if frame_numbers:
+            self.layout = layout
+            cuts = np.zeros(len(frame_numbers), dtype=bool)
+            if self.scenes is not None and signatures is not None:
+                static, cuts = self.scenes.analyze(frame_numbers, signatures)
+                if static.any():
+                    # Каждый статичный кадр получает цвета ближайшего предшествующего нестатичного
+                    source = np.maximum.accumulate(np.where(static, -1, np.arange(len(static))))
+                    previous = self._last_colors if self._last_colors is not None else colors[0]
+                    colors = np.concatenate([previous[np.newaxis], colors])[source + 1]
+            self._last_colors = colors[-1]
+            if self.offline:
+                self._pending_cuts.extend(len(self._pending_frames) + np.flatnonzero(cuts))
+                self._pending_frames.extend(frame_numbers)
+                self._pending_shape = colors.shape[1:]
+                if self._pending_file is not None:
+                    self._pending_file.write(np.ascontiguousarray(colors, dtype=self._pending_dtype).tobytes())
+                else:
+                    self._pending.append(colors)
+            else:
+                with measure_stage("smoothing", len(frame_numbers)):
+                    smoothed = self.quantizer.quantize(frame_numbers, self._filter_scenes(colors, cuts))
+                self._emit(frame_numbers, smoothed, layout)
+            # Номера кадров в выводе начинаются с 1: номер последнего кадра - индекс следующего в видео
+            self.next_frame = frame_numbers[-1]
+            self._since_checkpoint += len(frame_numbers)
+            if self.checkpoint is not None and self._since_checkpoint >= self.config.checkpoint_interval:
+                self.save_checkpoint()
+        if self.config.save_video and display_frames:
+            if self._video is None:
+                self._video = self.processor._open_video_writer()
+            for frame in display_frames:
+                self._video.write(frame)
+
+    def _filter_scenes(self, colors: np.ndarray, cuts: np.ndarray) -> np.ndarray:
+        """Причинное сглаживание блока со сбросом состояния фильтра на склейках."""
+        if not cuts.any():
+            return self.temporal_filter.process(colors)
+        bounds = [0] + np.flatnonzero(cuts).tolist() + [len(colors)]
+        parts = []
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            if cuts[start]:
+                self.temporal_filter.reset()
+            parts.append(self.temporal_filter.process(colors[start:stop]))
+        return np.concatenate(parts)
+
+    def _emit(self, frame_numbers: List[int], smoothed: np.ndarray, layout: List[Tuple[str, int]]) -> None:
+        with measure_stage("write", len(frame_numbers)):
+            write_frame_block(self.writer, frame_numbers, smoothed, layout)
+            if self.exporter is not None:
+                self.exporter.write_frames(frame_numbers, smoothed, layout)
+            if self.processed_entry is not None:
+                self.processed_entry.write(frame_numbers, smoothed, layout)
+
+    def save_checkpoint(self) -> None:
+        """Сохраняет контрольную точку: данные уже сброшены на диск до записи её файла."""
+        pipeline_state: Dict[str, Any] = {
+            "signature": self.signature,
+            "next_frame": self.next_frame,
+            "layout": self.layout,
+            "last_colors": self._last_colors,
+            "pending_cuts": [int(index) for index in self._pending_cuts],
+        }
+        if self._pending_file is not None:
+            self._pending_file.flush()
+            pipeline_state.update(
+                pending_frames=np.asarray(self._pending_frames, dtype=np.int64),
+                pending_shape=list(self._pending_shape),
+                pending_size=self._pending_file.tell()
+            )
+        self.checkpoint.save({
+            "pipeline": pipeline_state,
+            "writer": self.writer.checkpoint(),
+            "exporter": self.exporter.checkpoint() if self.exporter is not None else None,
+            "filter": self.temporal_filter.state() if self.temporal_filter is not None else None,
+            "scenes": self.scenes.state() if self.scenes is not None else None,
+            "quantizer": self.quantizer.state(),
+        })
+        self._since_checkpoint = 0
+
+    def finish(self) -> int:
+        """Дописывает накопленные кадры, закрывает все выходы и возвращает количество кадров."""
+        if self._pending_file is not None:
+            self._pending_file.close()
+            if self._pending_frames:
+                self._pending = [np.fromfile(self._pending_file.name, dtype=self._pending_dtype).reshape(-1, *self._pending_shape)]
+            os.remove(self._pending_file.name)
+            self._pending_file = None
+        if self._pending_frames:
+            colors = np.concatenate(self._pending)
+            bounds = sorted(set([0] + [int(index) for index in self._pending_cuts] + [len(colors)]))
+            with measure_stage("smoothing", len(colors)):
+                smoothed = self.quantizer.quantize(self._pending_frames, np.concatenate([
+                    filter_frames(colors[start:stop], self.config.smoothing, alpha=self.config.temporal_alpha)
+                    for start, stop in zip(bounds[:-1], bounds[1:])
+                ]))
+            self._emit(self._pending_frames, smoothed, self.layout)
+            self._pending_frames = []
+            self._pending_cuts = []
+            self._pending = []
+        self.writer.close()
+        if self.writer.path:
+            self._write_sidecars()
+        if self.processed_entry is not None:
+            self.processed_entry.commit()
+        if self._video is not None:
+            self._video.release()
+            self._video = None
+            logger.info(f"Обработанное видео сохранено в {self.processor.output_video_path}")
+        return self.writer.count
+
+    def _write_sidecars(self) -> None:
+        """Файлы рядом с выводом: сцены, пакеты контроллеров, индекс светильников."""
+        if self.scenes is not None:
+            scenes_path = os.path.splitext(self.writer.path.removesuffix(".gz"))[0] + "_scenes.json"
+            with open(scenes_path, 'w', encoding='utf-8') as f:
+                json.dump(self.scenes.metadata(), f, indent=2)
+            logger.info(f"Сцены: {len(self.scenes.cuts)} склеек, {self.scenes.metadata()['static_frames']} статичных кадров ({scenes_path})")
+        if self.exporter is not None:
+            self.exporter.close()
+        self.processor._write_fixture_index(self.writer.path)
+        logger.info(f"Данные сохранены в {self.writer.path}")
+
+    def abort(self) -> None:
+        """
+        Закрывает выходы после ошибки; незавершённая запись кэша удаляется.
+        С контрольными точками файлы остаются незавершёнными для продолжения обработки.
+        """
+        if self.checkpoint is not None:
+            self.writer.suspend()
+            if self.exporter is not None:
+                self.exporter.suspend()
+            if self._pending_file is not None:
+                self._pending_file.close()
+        else:
+            self.writer.close()
+            if self.exporter is not None:
+                self.exporter.close()
+        if self.processed_entry is not None:
+            self.processed_entry.discard()
+        if self._video is not None:
+            self._video.release()
+            self._video = None
+
+class BatchJob:
+    """Задача пакетной обработки: одно видео со своей конфигурацией."""
+    STAMP_SUFFIX = ".job.json"
+
+    def __init__(self, name: str, video_path: str, output_path: str, config: VideoConfig) -> None:
+        self.name: str = name
+        self.video_path: str = video_path
+        self.output_path: str = output_path
+        self.config: VideoConfig = config
+        self.status: str = "pending"
+        self.exit_code: Optional[int] = None
+        self.error: str = ""
+        self.frames: int = 0
+        self.elapsed: float = 0.0
+        self.processor: Optional[VideoColorProcessor] = None
+        self.pipeline: Optional[OutputPipeline] = None
+        self.segments: List[Tuple[int, Optional[int]]] = []
+        self.cost: float = 0.0
+        self._ready: Dict[int, Tuple[List[Dict[str, Any]], List[np.ndarray]]] = {}
+        self._next_segment: int = 0
+        self._started: float = 0.0
+        # Сегменты, отправленные в пул и полученные из него (BatchRunner)
+        self.submitted: int = 0
+        self.received: int = 0
+
+    def signature(self) -> Dict[str, Any]:
+        return output_signature(self.video_path, self.config)
+
+    @property
+    def stamp_path(self) -> str:
+        return self.processor.output_file_path() + self.STAMP_SUFFIX
+
+    def is_up_to_date(self) -> bool:
+        """Вывод существует и записан с теми же видео и параметрами."""
+        output_path = self.processor.output_file_path()
+        if not os.path.exists(output_path) or not os.path.exists(self.stamp_path):
+            return False
+        try:
+            with open(self.stamp_path, 'r', encoding='utf-8') as f:
+                return json.load(f) == self.signature()
+        except (OSError, ValueError):
+            return False
+
+    def prepare(self) -> None:
+        """Открывает видео, чтобы узнать его параметры, и делит его на сегменты."""
+        self.processor = VideoColorProcessor(self.video_path, self.output_path, self.config)
+
+    def plan(self) -> None:
+        self.processor.initialize_video()
+        self.processor.cap.release()
+        info = self.processor.video_info
+        self.segments = self.processor._plan_segments()
+        self.cost = float(max(1, info["frame_count"]) * max(1, info["original_width"] * info["original_height"]))
+
+    def start(self) -> None:
+        self.status = "running"
+        self._started = time.perf_counter()
+        self.pipeline = OutputPipeline(self.processor)
+
+    @property
+    def outstanding(self) -> int:
+        """
+        Сегменты, отправленные в пул и ещё не записанные в вывод (в пуле или в ожидании
+        предыдущих сегментов); у завершённой или неуспешной задачи - ещё не вернувшиеся из пула.
+        """
+        return self.submitted - (self._next_segment if self.status == "running" else self.received)
+
+    def add_result(self, index: int, result: Tuple[List[Dict[str, Any]], List[np.ndarray]]) -> bool:
+        """Принимает результат сегмента и передаёт готовые по порядку сегменты в вывод. True - задача завершена."""
+        self._ready[index] = result
+        while self._next_segment in self._ready:
+            batch_result, processed_frames_batch = self._ready.pop(self._next_segment)
+            if batch_result:
+                signatures = pop_signatures(batch_result)
+                frame_numbers, colors, layout = frames_to_array(batch_result)
+                self.pipeline.write(frame_numbers, colors, layout, processed_frames_batch, signatures)
+            else:
+                self.pipeline.write([], None, [(zone.name, zone.leds) for zone in self.config.zones], processed_frames_batch)
+            self._next_segment += 1
+        return self._next_segment == len(self.segments)
+
+    def finish(self) -> None:
+        self.frames = self.pipeline.finish()
+        with open(self.stamp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.signature(), f)
+        self.status = "done"
+        self.exit_code = 0
+        self.elapsed = time.perf_counter() - self._started
+
+    def fail(self, error: BaseException, status: str = "failed") -> None:
+        """Отмечает задачу неуспешной; частично записанный вывод удаляется."""
+        self.status = status
+        self.exit_code = 1 if status == "failed" else 130
+        self.error = str(error) or type(error).__name__
+        self._ready.clear()
+        if self.pipeline is not None:
+            self.pipeline.abort()
+            for path in [self.pipeline.writer.path] + ([writer.path for writer in self.pipeline.exporter.writers] if self.pipeline.exporter else []):
+                if os.path.exists(path):
+                    os.remove(path)
+            self.pipeline = None
+        if self._started:
+            self.elapsed = time.perf_counter() - self._started
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "video": self.video_path,
+            "output": self.processor.output_file_path() if self.processor else self.output_path,
+            "status": self.status,
+            "exit_code": self.exit_code,
+            "frames": self.frames,
+            "elapsed": round(self.elapsed, 3),
+            "error": self.error,
+        }
+
+def load_manifest(path: str) -> List[BatchJob]:
+    """
+    Читает манифест пакетной обработки. Параметры задач - имена атрибутов VideoConfig.
+    JSON/YAML:
+        {"config": "config.ini", "defaults": {"pixel_selection": "left", "output_color_format": "rgb"},
+         "jobs": [{"name": "intro", "video": "intro.mp4", "output": "out/intro.json", "zones": "left,right:60"}]}
+    INI - конфигурация VideoConfig (секции [processing], [output], [zone:*] и т.д.),
+    дополненная секцией [defaults] и секциями задач [job:<имя>] с ключами video, output и параметрами.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".ini", ".cfg"):
+        base = VideoConfig(path)
+        defaults = dict(base.config["defaults"]) if base.config.has_section("defaults") else {}
+        job_specs = [
+            dict(base.config[section], name=section[len("job:"):].strip())
+            for section in base.config.sections() if section.startswith("job:")
+        ]
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            if extension in (".yaml", ".yml"):
+                yaml = optional_module("yaml")
+                if yaml is None:
+                    raise RuntimeError("Для манифеста YAML нужен модуль PyYAML")
+                data = yaml.safe_load(f)
+            else:
+                data = json.load(f)
+        config_path = data.get("config", "config.ini")
+        if not os.path.isabs(config_path):
+            config_path = os.path.join(os.path.dirname(path), config_path)
+        base = VideoConfig(config_path)
+        defaults = data.get("defaults", {})
+        job_specs = data["jobs"]
+
+    return make_batch_jobs(base, defaults, job_specs)
+
+def make_batch_jobs(base: VideoConfig, defaults: Dict[str, Any], job_specs: List[Dict[str, Any]]) -> List[BatchJob]:
+    """Задачи по базовой конфигурации, общим параметрам и описаниям задач (как в манифесте)."""
+    base = copy.copy(base)
+    base.apply_overrides(defaults)
+    jobs = []
+    for index, spec in enumerate(job_specs):
+        spec = dict(spec)
+        video_path = spec.pop("video")
+        name = spec.pop("name", None) or os.path.splitext(os.path.basename(video_path))[0]
+        output_path = spec.pop("output", None) or os.path.join("output", f"{name}.json")
+        config = copy.copy(base)
+        config.apply_overrides(spec)
+        jobs.append(BatchJob(name, video_path, output_path, config))
+    names = [job.name for job in jobs]
+    if len(names) != len(set(names)):
+        raise ValueError("Имена задач манифеста должны быть уникальными")
+    return jobs
+
+class BatchRunner:
+    """
+    Выполняет задачи манифеста одним постоянным пулом процессов.
+    Каждое видео делится на сегменты (как при параллельном декодировании); сегменты задач
+    ставятся в очередь пула по порядку начиная с самых длинных видео, поэтому короткие видео
+    заполняют освободившиеся процессы в конце. Результаты сегментов каждой задачи собираются
+    по порядку и сразу сглаживаются и записываются. Очередь ограничена окном: не больше
+    SEGMENTS_PER_PROCESS * num_processes незаписанных сегментов и MAX_OPEN_JOBS задач с открытым
+    выводом (вывод задачи открывается при отправке её первого сегмента), поэтому память
+    и число открытых файлов не зависят от количества и длины видео.
+    Актуальные задачи (по отметке рядом с выводом) пропускаются, поэтому прерванный запуск
+    продолжается повторным запуском того же манифеста.
+    """
+    SEGMENTS_PER_PROCESS = 2
+    MAX_OPEN_JOBS = 2
+
+    def __init__(self, jobs: List[BatchJob], num_processes: int, force: bool = False, progress: bool = False) -> None:
+        self.jobs: List[BatchJob] = jobs
+        self.num_processes: int = num_processes
+        self.force: bool = force
+        self.progress: bool = progress
+
+    def run(self, pool: Optional[Any] = None) -> int:
+        """
+        Возвращает код завершения: 0 - все задачи выполнены или актуальны, 1 - есть ошибки, 130 - прервано.
+        pool - уже запущенный пул с init_worker (режим сервера); без него пул создаётся на время запуска.
+        """
+        if pool is None:
+            with open_pool(self.num_processes, (FrameProcessor.build_lut(),)) as pool:
+                return self.run(pool)
+        active = []
+        for job in self.jobs:
+            try:
+                job.prepare()
+                if not self.force and job.is_up_to_date():
+                    job.status = "skipped"
+                    job.exit_code = 0
+                    logger.info(f"[{job.name}] вывод актуален, задача пропущена")
+                    continue
+                job.plan()
+                active.append(job)
+            except Exception as e:
+                job.fail(e)
+                logger.error(f"[{job.name}] ошибка подготовки: {e}")
+        # Сначала самые трудоёмкие видео: короткие заполнят процессы в конце
+        active.sort(key=lambda job: job.cost, reverse=True)
+
+        done: queue.Queue = queue.Queue()
+        max_in_flight = max(1, self.num_processes) * self.SEGMENTS_PER_PROCESS
+        workers: Dict[int, Callable] = {}
+        cursor = 0
+        interrupted = False
+
+        def submit() -> None:
+            """Отправляет сегменты по порядку, пока окно не заполнено."""
+            nonlocal cursor
+            while cursor < len(active):
+                job_index, job = cursor, active[cursor]
+                if job.status not in ("pending", "running") or job.submitted == len(job.segments):
+                    cursor += 1
+                    continue
+                if sum(other.outstanding for other in active) >= max_in_flight:
+                    return
+                if job.status == "pending":
+                    if sum(other.status == "running" for other in active) >= self.MAX_OPEN_JOBS:
+                        return
+                    try:
+                        lut = FrameProcessor.build_lut(job.config.midpoint, job.config.steepness, job.config.gamma)
+                        workers[job_index] = partial(
+                            run_worker_task,
+                            process_segment_worker,
+                            video_path=job.video_path,
+                            batch_size=job.config.batch_size,
+                            lut=lut,
+                            reader_options=video_reader_options(job.config),
+                            **job.processor._worker_kwargs()
+                        )
+                        job.start()
+                    except Exception as e:
+                        job.fail(e)
+                        logger.error(f"[{job.name}] ошибка: {e}")
+                        continue
+                pool.apply_async(
+                    workers[job_index], (job.segments[job.submitted],),
+                    callback=partial(self._put, done, job_index, job.submitted),
+                    error_callback=partial(self._put, done, job_index, job.submitted)
+                )
+                job.submitted += 1
+
+        try:
+            with tqdm(total=sum(len(job.segments) for job in active), desc="Сегменты задач", disable=not self.progress) as pbar:
+                submit()
+                while any(job.outstanding for job in active):
+                    job_index, index, result = done.get()
+                    pbar.update(1)
+                    job = active[job_index]
+                    job.received += 1
+                    if job.status == "running":
+                        try:
+                            if isinstance(result, BaseException):
+                                raise result
+                            if job.add_result(index, result):
+                                job.finish()
+                                logger.info(f"[{job.name}] готово: {job.frames} кадров за {job.elapsed:.1f} с")
+                        except Exception as e:
+                            job.fail(e)
+                            logger.error(f"[{job.name}] ошибка: {e}")
+                    submit()
+        except KeyboardInterrupt as e:
+            interrupted = True
+            pool.terminate()
+            for job in active:
+                if job.status in ("pending", "running"):
+                    job.fail(e, status="interrupted")
+            logger.warning("Пакетная обработка прервана; повторный запуск продолжит с невыполненных задач")
+
+        for job in self.jobs:
+            logger.info(f"[{job.name}] {job.status} (код {job.exit_code})" + (f": {job.error}" if job.error else ""))
+        if interrupted:
+            return 130
+        return 1 if any(job.exit_code for job in self.jobs) else 0
+
+    @staticmethod
+    def _put(done: queue.Queue, job_index: int, index: int, result: Any) -> None:
+        done.put((job_index, index, result))
+
+    def report(self) -> List[Dict[str, Any]]:
+        return [job.report() for job in self.jobs]
+
+def run_batch(
+    manifest_path: str,
+    report_path: Optional[str] = None,
+    force: bool = False,
+    num_processes: Optional[int] = None,
+    progress: bool = False
+) -> int:
+    """Выполняет манифест и пишет отчёт по задачам в JSON. Возвращает код завершения."""
+    jobs = load_manifest(manifest_path)
+    if num_processes is None:
+        num_processes = max((job.config.num_processes for job in jobs), default=1)
+    runner = BatchRunner(jobs, num_processes, force, progress)
+    exit_code = runner.run()
+    report_path = report_path or os.path.splitext(manifest_path)[0] + ".report.json"
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump({"exit_code": exit_code, "jobs": runner.report()}, f, ensure_ascii=False, indent=2)
+    logger.info(f"Отчёт пакетной обработки сохранён в {report_path}")
+    return exit_code
+
+class StreamingJsonWriter:
+    """
+    Пишет список кадров в JSON по одному элементу, в том же формате, что json.dump(..., indent=2).
+    """
+    def __init__(self, path: str, compress: bool = False, staged: bool = False, resume: Optional[Dict[str, Any]] = None) -> None:
+        self.path: str = path + ".gz" if compress else path
+        # Позицию в потоке gzip нельзя сохранить в контрольной точке, поэтому при staged
+        # сжатый вывод пишется в несжатый .part и сжимается в close
+        self._staged_path: Optional[str] = self.path + ".part" if compress and staged else None
+        self.count: int = 0
+        if resume is not None:
+            self.count = resume["count"]
+            self._file: TextIO = reopen_for_append(self._staged_path or self.path, resume["size"], text=True)
+        elif self._staged_path:
+            self._file = open(self._staged_path, 'w', encoding='utf-8')
+        else:
+            self._file = gzip.open(self.path, 'wt', encoding='utf-8') if compress else open(self.path, 'w', encoding='utf-8')
+
+    def write(self, item: Dict[str, Any]) -> None:
+        text = json.dumps(item, ensure_ascii=False, indent=2)
+        self._file.write("[\n  " if self.count == 0 else ",\n  ")
+        # Элемент списка находится на первом уровне вложенности - сдвигаем его строки на отступ
+        self._file.write(text.replace("\n", "\n  "))
+        self.count += 1
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """Сбрасывает данные на диск и возвращает состояние для продолжения записи."""
+        self._file.flush()
+        return {"size": self._file.tell(), "count": self.count}
+
+    def suspend(self) -> None:
+        """Закрывает файл, не завершая список - запись продолжится с контрольной точки."""
+        self._file.close()
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self._file.write("\n]" if self.count else "[]")
+        self._file.close()
+        if self._staged_path:
+            with open(self._staged_path, 'rb') as source, gzip.open(self.path, 'wb') as target:
+                shutil.copyfileobj(source, target)
+            os.remove(self._staged_path)
+
+class BinaryFrameWriter:
+    """
+    Пишет кадры в компактный бинарный формат: фиксированный заголовок, таблица зон
+    и плотный uint8 массив frames x leds x channels, который читается через np.memmap.
+
+    Заголовок (little-endian):
+        magic "AMBF", версия, размер заголовка, fps исходного видео, количество кадров,
+        светодиодов и каналов, цветовой формат, номер первого кадра, шаг между кадрами,
+        количество зон; далее для каждой зоны - имя (32 байта), смещение и число светодиодов.
+    Данные начинаются с header_size (выровнен на 64 байта).
+    """
+    MAGIC = b"AMBF"
+    VERSION = 1
+    EXTENSION = ".ambf"
+    HEADER = struct.Struct("<4sHHdIIB8sIIH")
+    ZONE = struct.Struct("<32sII")
+    ALIGNMENT = 64
+
+    def __init__(self, path: str, fps: float, color_format: ColorFormat, frame_step: int = 1, resume: Optional[Dict[str, Any]] = None) -> None:
+        self.path: str = path
+        self.fps: float = fps
+        self.color_format: ColorFormat = color_format
+        self.frame_step: int = frame_step
+        self.count: int = 0
+        self._zones: Optional[List[Tuple[str, int, int]]] = None
+        self._first_frame: int = 1
+        self._leds: int = 0
+        self._channels: int = 0
+        self._header_size: int = 0
+        # Последний записанный кадр - им заполняется пропуск перед следующим блоком (write_frames)
+        self._last: Optional[np.ndarray] = None
+        if resume is not None:
+            self.count = resume["count"]
+            self._last = resume.get("last")
+            self._zones = [tuple(zone) for zone in resume["zones"]] if resume["zones"] is not None else None
+            self._first_frame = resume["first_frame"]
+            self._leds = resume["leds"]
+            self._channels = resume["channels"]
+            self._header_size = resume["header_size"]
+            self._file = reopen_for_append(path, resume["size"])
+        else:
+            self._file = open(path, 'wb')
+
+    def _header_fields(self) -> Tuple:
+        return (
+            self.MAGIC, self.VERSION, self._header_size, self.fps, self.count, self._leds, self._channels,
+            self.color_format.value.encode("ascii"), self._first_frame, self.frame_step, len(self._zones or [])
+        )
+
+    def _write_header(self) -> None:
+        zones = self._zones or []
+        header = self.HEADER.pack(*self._header_fields())
+        header += b"".join(self.ZONE.pack(name.encode("utf-8")[:32], offset, leds) for name, offset, leds in zones)
+        self._file.seek(0)
+        self._file.write(header.ljust(self._header_size, b"\0"))
+
+    @property
+    def next_frame(self) -> Optional[int]:
+        """Номер, который должен быть у следующего кадра; None до первого кадра."""
+        return self._first_frame + self.count * self.frame_step if self.count else None
+
+    def write(self, item: Dict[str, Any]) -> None:
+        frame_numbers, pixels, layout = frames_to_array([item])
+        self.write_frames(frame_numbers, pixels, layout)
+
+    def write_frames(self, frame_numbers: List[int], block: np.ndarray, layout: List[Tuple[str, int]]) -> None:
+        """Как write_block, но по номерам кадров: пропущенные кадры заполняются повтором предыдущего."""
+        frame_numbers, block = fill_frame_gaps(frame_numbers, block, self.next_frame, self.frame_step, self._last)
+        self.write_block(frame_numbers[0], block, layout)
+
+    def write_block(self, first_frame: int, block: np.ndarray, layout: List[Tuple[str, int]]) -> None:
+        """
+        Дописывает блок подряд идущих кадров (frames, leds, channels); layout - зоны (имя, светодиоды) или [].
+        Номера кадров не хранятся, поэтому first_frame должен продолжать уже записанные кадры.
+        """
+        block = self._prepare_block(first_frame, block, layout)
+        self._file.write(block.tobytes())
+        self.count += len(block)
+
+    def _prepare_block(self, first_frame: int, block: np.ndarray, layout: List[Tuple[str, int]]) -> np.ndarray:
+        """На первом блоке фиксирует размеры и зоны и пишет заголовок, на остальных проверяет размер и номер."""
+        block = np.ascontiguousarray(block, dtype=np.uint8)
+        if self.count and first_frame != self.next_frame:
+            raise ValueError(f"Блок начинается с кадра {first_frame}, ожидался кадр {self.next_frame}")
+        if len(block):
+            self._last = block[-1].copy()
+        if self.count == 0:
+            self._first_frame = first_frame
+            self._leds, self._channels = block.shape[1:]
+            offsets = np.cumsum([0] + [leds for _, leds in layout])
+            self._zones = [(name, int(offsets[i]), leds) for i, (name, leds) in enumerate(layout)]
+            size = self.HEADER.size + self.ZONE.size * len(self._zones)
+            self._header_size = math.ceil(size / self.ALIGNMENT) * self.ALIGNMENT
+            self._write_header()
+        elif block.shape[1:] != (self._leds, self._channels):
+            raise ValueError(f"Кадр {first_frame}: размер {block.shape[1:]} не совпадает с {(self._leds, self._channels)}")
+        return block
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """Сбрасывает данные на диск и возвращает состояние для продолжения записи."""
+        self._file.flush()
+        return {
+            "size": self._file.tell(),
+            "count": self.count,
+            "zones": self._zones,
+            "first_frame": self._first_frame,
+            "leds": self._leds,
+            "channels": self._channels,
+            "header_size": self._header_size,
+            "last": self._last,
+        }
+
+    def suspend(self) -> None:
+        """Закрывает файл без обновления заголовка - запись продолжится с контрольной точки."""
+        self._file.close()
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        if self.count == 0:
+            self._header_size = math.ceil(self.HEADER.size / self.ALIGNMENT) * self.ALIGNMENT
+        # Количество кадров известно только в конце - обновляем заголовок
+        self._write_header()
+        self._file.close()
+
+class BinaryFrameReader:
+    """
+    Чтение файла BinaryFrameWriter без разбора: кадры доступны через np.memmap,
+    поиск кадра по индексу - O(1).
+    """
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        with open(path, 'rb') as f:
+            header = f.read(BinaryFrameWriter.HEADER.size)
+            (magic, version, header_size, fps, frame_count, leds, channels,
+             color_format, first_frame, frame_step, zone_count) = BinaryFrameWriter.HEADER.unpack(header)
+            if magic != BinaryFrameWriter.MAGIC:
+                raise ValueError(f"Файл {path} не является бинарным файлом кадров")
+            if version != BinaryFrameWriter.VERSION:
+                raise ValueError(f"Неподдерживаемая версия бинарного формата: {version}")
+            self.zones: Dict[str, Tuple[int, int]] = {}
+            for _ in range(zone_count):
+                name, offset, zone_leds = BinaryFrameWriter.ZONE.unpack(f.read(BinaryFrameWriter.ZONE.size))
+                self.zones[name.rstrip(b"\0").decode("utf-8")] = (offset, zone_leds)
+        self.fps: float = fps
+        self.frame_count: int = frame_count
+        self.leds: int = leds
+        self.channels: int = channels
+        self.color_format: ColorFormat = ColorFormat(color_format.rstrip(b"\0").decode("ascii"))
+        self.first_frame: int = first_frame
+        self.frame_step: int = frame_step
+        self.frames: np.ndarray = (
+            np.memmap(path, dtype=np.uint8, mode='r', offset=header_size, shape=(frame_count, leds, channels))
+            if frame_count > 0 else np.zeros((0, leds, channels), dtype=np.uint8)
+        )
+
+    @property
+    def playback_fps(self) -> float:
+        """Частота кадров данных с учётом frame_skip."""
+        return self.fps / self.frame_step if self.frame_step else self.fps
+
+    def __len__(self) -> int:
+        return self.frame_count
+
+    def frame_number(self, index: int) -> int:
+        return self.first_frame + index * self.frame_step
+
+    def frame(self, index: int, zone: Optional[str] = None) -> np.ndarray:
+        """Возвращает массив (leds, channels) кадра index (или только указанной зоны)."""
+        pixels = self.frames[index]
+        if zone is not None:
+            offset, zone_leds = self.zones[zone]
+            pixels = pixels[offset:offset + zone_leds]
+        return pixels
+
+    def to_frames_data(self) -> List[Dict[str, Any]]:
+        """Преобразует данные обратно в список кадров в формате JSON-вывода."""
+        frame_numbers = [self.frame_number(index) for index in range(self.frame_count)]
+        return array_to_frames(frame_numbers, self.frames, self.layout)
+
+    @property
+    def layout(self) -> List[Tuple[str, int]]:
+        """Зоны в порядке следования (имя, количество светодиодов)."""
+        return [(name, leds) for name, (_, leds) in sorted(self.zones.items(), key=lambda zone: zone[1][0])]
+
+class EncodedFrameWriter(BinaryFrameWriter):
+    """
+    Сжатый вариант BinaryFrameWriter для многочасовых шоу.
+    Кадры делятся на группы по keyframe_interval: первый кадр группы хранится целиком,
+    остальные - разностью с предыдущим кадром (по модулю 256). Разности раскладываются
+    по плоскостям каналов (channels, frames, leds), поэтому неизменные светодиоды дают длинные
+    серии нулей, и группа сжимается zstd, lz4 или zlib. В конце файла - индекс смещений групп
+    для перехода к любому кадру с распаковкой одной группы.
+
+    Заголовок - как у BinaryFrameWriter (magic "AMBZ") плюс кодер, интервал ключевых кадров
+    и смещение индекса (uint64 смещения начала каждой группы и конца данных).
+    """
+    MAGIC = b"AMBZ"
+    VERSION = 1
+    EXTENSION = ".ambz"
+    HEADER = struct.Struct("<4sHHdIIB8sIIHBIQ")
+    CODEC_IDS = {FrameCodec.ZLIB: 1, FrameCodec.ZSTD: 2, FrameCodec.LZ4: 3}
+
+    def __init__(
+        self,
+        path: str,
+        fps: float,
+        color_format: ColorFormat,
+        frame_step: int = 1,
+        keyframe_interval: int = 64,
+        codec: FrameCodec = FrameCodec.AUTO,
+        resume: Optional[Dict[str, Any]] = None
+    ) -> None:
+        if keyframe_interval <= 0:
+            raise ValueError("Интервал ключевых кадров должен быть положительным")
+        super().__init__(path, fps, color_format, frame_step, resume=resume)
+        self.keyframe_interval: int = keyframe_interval
+        self.codec: FrameCodec = self.resolve_codec(codec) if resume is None else FrameCodec(resume["codec"])
+        self._pending: List[np.ndarray] = []
+        self._pending_count: int = 0
+        self._offsets: List[int] = [0]
+        self._index_offset: int = 0
+        if resume is not None:
+            self._offsets = resume["offsets"].tolist()
+            if len(resume["pending"]):
+                self._pending = [resume["pending"]]
+                self._pending_count = len(resume["pending"])
+
+    @staticmethod
+    def resolve_codec(codec: FrameCodec) -> FrameCodec:
+        # zstd и lz4 необязательны: сжатый вывод использует zlib
+        zstandard, lz4_frame = optional_module("zstandard"), optional_module("lz4.frame")
+        if codec == FrameCodec.AUTO:
+            return FrameCodec.ZSTD if zstandard is not None else FrameCodec.LZ4 if lz4_frame is not None else FrameCodec.ZLIB
+        if codec == FrameCodec.ZSTD and zstandard is None:
+            logger.warning("Модуль zstandard не установлен, используется zlib")
+            return FrameCodec.ZLIB
+        if codec == FrameCodec.LZ4 and lz4_frame is None:
+            logger.warning("Модуль lz4 не установлен, используется zlib")
+            return FrameCodec.ZLIB
+        return codec
+
+    @staticmethod
+    def compress(data: bytes, codec: FrameCodec) -> bytes:
+        if codec == FrameCodec.ZSTD:
+            return optional_module("zstandard").ZstdCompressor(level=10).compress(data)
+        elif codec == FrameCodec.LZ4:
+            return optional_module("lz4.frame").compress(data)
+        return zlib.compress(data, 9)
+
+    @staticmethod
+    def decompress(data: bytes, codec: FrameCodec) -> bytes:
+        zstandard, lz4_frame = optional_module("zstandard"), optional_module("lz4.frame")
+        if codec == FrameCodec.ZSTD:
+            if zstandard is None:
+                raise RuntimeError("Для чтения файла нужен модуль zstandard")
+            return zstandard.ZstdDecompressor().decompress(data)
+        elif codec == FrameCodec.LZ4:
+            if lz4_frame is None:
+                raise RuntimeError("Для чтения файла нужен модуль lz4")
+            return lz4_frame.decompress(data)
+        return zlib.decompress(data)
+
+    @staticmethod
+    def encode_group(frames: np.ndarray) -> np.ndarray:
+        """Ключевой кадр и разности (frames, leds, channels) -> плоскости (channels, frames, leds)."""
+        residuals = frames.copy()
+        residuals[1:] -= frames[:-1]
+        return np.ascontiguousarray(residuals.transpose(2, 0, 1))
+
+    @staticmethod
+    def decode_group(planes: np.ndarray) -> np.ndarray:
+        """Обратное к encode_group: накопленная сумма разностей по модулю 256."""
+        return np.cumsum(planes.transpose(1, 2, 0), axis=0, dtype=np.uint8)
+
+    def _header_fields(self) -> Tuple:
+        return super()._header_fields() + (self.CODEC_IDS[self.codec], self.keyframe_interval, self._index_offset)
+
+    def write_block(self, first_frame: int, block: np.ndarray, layout: List[Tuple[str, int]]) -> None:
+        block = self._prepare_block(first_frame, block, layout)
+        self.count += len(block)
+        while len(block):
+            take = min(len(block), self.keyframe_interval - self._pending_count)
+            self._pending.append(block[:take])
+            self._pending_count += take
+            block = block[take:]
+            if self._pending_count == self.keyframe_interval:
+                self._flush_group()
+
+    def _flush_group(self) -> None:
+        if not self._pending:
+            return
+        planes = self.encode_group(np.concatenate(self._pending))
+        data = self.compress(planes.tobytes(), self.codec)
+        self._file.write(data)
+        self._offsets.append(self._offsets[-1] + len(data))
+        self._pending = []
+        self._pending_count = 0
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """Состояние BinaryFrameWriter плюс индекс групп и кадры незаписанной группы."""
+        state = super().checkpoint()
+        pending = np.concatenate(self._pending) if self._pending else np.zeros((0, self._leds, self._channels), dtype=np.uint8)
+        state.update(codec=self.codec.value, offsets=np.asarray(self._offsets, dtype=np.uint64), pending=pending)
+        return state
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self._flush_group()
+        if self.count == 0:
+            self._header_size = math.ceil(self.HEADER.size / self.ALIGNMENT) * self.ALIGNMENT
+        self._index_offset = self._header_size + self._offsets[-1]
+        self._file.seek(self._index_offset)
+        self._file.write(np.asarray(self._offsets, dtype="<u8").tobytes())
+        super().close()
+
+class EncodedFrameReader(BinaryFrameReader):
+    """
+    Чтение файла EncodedFrameWriter с произвольным доступом: кадр находится по индексу групп,
+    распаковывается только его группа (последняя распакованная группа запоминается).
+    """
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        with open(path, 'rb') as f:
+            (magic, version, header_size, fps, frame_count, leds, channels, color_format, first_frame,
+             frame_step, zone_count, codec_id, keyframe_interval, index_offset) = EncodedFrameWriter.HEADER.unpack(f.read(EncodedFrameWriter.HEADER.size))
+            if magic != EncodedFrameWriter.MAGIC:
+                raise ValueError(f"Файл {path} не является сжатым файлом кадров")
+            if version != EncodedFrameWriter.VERSION:
+                raise ValueError(f"Неподдерживаемая версия сжатого формата: {version}")
+            self.zones: Dict[str, Tuple[int, int]] = {}
+            for _ in range(zone_count):
+                name, offset, zone_leds = BinaryFrameWriter.ZONE.unpack(f.read(BinaryFrameWriter.ZONE.size))
+                self.zones[name.rstrip(b"\0").decode("utf-8")] = (offset, zone_leds)
+        self.fps: float = fps
+        self.frame_count: int = frame_count
+        self.leds: int = leds
+        self.channels: int = channels
+        self.color_format: ColorFormat = ColorFormat(color_format.rstrip(b"\0").decode("ascii"))
+        self.first_frame: int = first_frame
+        self.frame_step: int = frame_step
+        self.codec: FrameCodec = {value: key for key, value in EncodedFrameWriter.CODEC_IDS.items()}[codec_id]
+        self.keyframe_interval: int = keyframe_interval
+        group_count = math.ceil(frame_count / keyframe_interval)
+        self.offsets: np.ndarray = np.memmap(path, dtype="<u8", mode='r', offset=index_offset, shape=(group_count + 1,))
+        self._data_offset: int = header_size
+        self._group: Tuple[int, Optional[np.ndarray]] = (-1, None)
+
+    def group(self, group_index: int) -> np.ndarray:
+        """Распакованная группа кадров (frames, leds, channels)."""
+        if self._group[0] != group_index:
+            start, stop = int(self.offsets[group_index]), int(self.offsets[group_index + 1])
+            with open(self.path, 'rb') as f:
+                f.seek(self._data_offset + start)
+                data = EncodedFrameWriter.decompress(f.read(stop - start), self.codec)
+            count = min(self.keyframe_interval, self.frame_count - group_index * self.keyframe_interval)
+            planes = np.frombuffer(data, dtype=np.uint8).reshape(self.channels, count, self.leds)
+            self._group = (group_index, EncodedFrameWriter.decode_group(planes))
+        return self._group[1]
+
+    def read(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """Кадры [start, stop) одним массивом (frames, leds, channels)."""
+        stop = self.frame_count if stop is None else min(stop, self.frame_count)
+        if start >= stop:
+            return np.zeros((0, self.leds, self.channels), dtype=np.uint8)
+        first_group = start // self.keyframe_interval
+        last_group = (stop - 1) // self.keyframe_interval
+        frames = np.concatenate([self.group(index) for index in range(first_group, last_group + 1)])
+        offset = first_group * self.keyframe_interval
+        return frames[start - offset:stop - offset]
+
+    @property
+    def frames(self) -> np.ndarray:
+        return self.read()
+
+    def frame(self, index: int, zone: Optional[str] = None) -> np.ndarray:
+        if not 0 <= index < self.frame_count:
+            raise IndexError(f"Кадр {index} вне диапазона 0-{self.frame_count - 1}")
+        pixels = self.group(index // self.keyframe_interval)[index % self.keyframe_interval]
+        if zone is not None:
+            offset, zone_leds = self.zones[zone]
+            pixels = pixels[offset:offset + zone_leds]
+        return pixels
+
+FRAME_FILE_EXTENSIONS = (BinaryFrameWriter.EXTENSION, EncodedFrameWriter.EXTENSION)
+
+def open_frame_reader(path: str) -> BinaryFrameReader:
+    """Открывает .ambf или .ambz по расширению."""
+    if path.endswith(EncodedFrameWriter.EXTENSION):
+        return EncodedFrameReader(path)
+    return BinaryFrameReader(path)
+
+def create_frame_writer(path: str, fps: float, color_format: ColorFormat, frame_step: int = 1, **options) -> BinaryFrameWriter:
+    """Создаёт писатель .ambf или .ambz по расширению; options - параметры EncodedFrameWriter."""
+    if path.endswith(EncodedFrameWriter.EXTENSION):
+        return EncodedFrameWriter(path, fps, color_format, frame_step, **options)
+    return BinaryFrameWriter(path, fps, color_format, frame_step)
+
+def guess_color_format(channels: int) -> ColorFormat:
+    """Цветовой формат вывода по числу каналов (HSV от RGB не отличить)."""
+    return {4: ColorFormat.RGBW, 5: ColorFormat.RGBWMix}.get(channels, ColorFormat.RGB)
+
+def load_frames_file(path: str) -> Tuple[List[int], np.ndarray, List[Tuple[str, int]], Optional[ColorFormat]]:
+    """
+    Читает готовый вывод (JSON, JSON.gz, .ambf или .ambz) в массив (frames, leds, channels).
+    Возвращает номера кадров, массив, зоны и цветовой формат (None, если в JSON он не указан).
+    """
+    if path.endswith(FRAME_FILE_EXTENSIONS):
+        reader = open_frame_reader(path)
+        frame_numbers = [reader.frame_number(index) for index in range(len(reader))]
+        return frame_numbers, reader.frames, reader.layout, reader.color_format
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        data = json.load(f)
+    color_format = None
+    if isinstance(data, dict):
+        if data.get("color_format"):
+            color_format = ColorFormat(data["color_format"].lower())
+        data = data["frames"]
+    frame_numbers, array, layout = frames_to_array(sorted(data, key=lambda d: d["frame"]))
+    return frame_numbers, array, layout, color_format
+
+def convert_json_to_binary(json_path: str, output_path: str, fps: float, color_format: Optional[ColorFormat] = None, **options) -> int:
+    """
+    Конвертирует существующий JSON (в том числе .gz) в бинарный (.ambf) или сжатый (.ambz) формат
+    по расширению output_path; options - параметры EncodedFrameWriter.
+    Формат JSON - список кадров или объект {"color_format": ..., "frames": [...]}.
+    Цветовой формат берётся из JSON, аргумента или определяется по числу каналов.
+    Возвращает количество кадров.
+    """
+    opener = gzip.open if json_path.endswith(".gz") else open
+    with opener(json_path, 'rt', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        if color_format is None and data.get("color_format"):
+            color_format = ColorFormat(data["color_format"].lower())
+        data = data["frames"]
+    data = sorted(data, key=lambda d: d["frame"])
+    if color_format is None:
+        first = data[0]["pixels"] if data and "pixels" in data[0] else next(iter(data[0]["zones"].values())) if data else []
+        color_format = guess_color_format(len(first[0]) if first else 3)
+    frame_step = data[1]["frame"] - data[0]["frame"] if len(data) > 1 else 1
+    writer = create_frame_writer(output_path, fps, color_format, frame_step, **options)
+    try:
+        for item in data:
+            writer.write(item)
+    finally:
+        writer.close()
+    logger.info(f"Конвертировано {writer.count} кадров из {json_path} в {output_path}")
+    return writer.count
+
+class FrameCache:
+    """
+    Двухуровневый контентно-адресуемый кэш цветов на диске.
+    Уровень raw - усреднённые цвета краёв/зон до цветовой обработки, уровень processed -
+    итоговый вывод после S-кривой, яркости, насыщенности и сглаживания. Записи хранятся
+    в формате .ambf; при превышении max_size удаляются давно не использованные (LRU по mtime).
+    """
+    VERSION = 1
+    HASH_CHUNK = 1 << 20
+    INDEX_NAME = "hashes.json"
+
+    def __init__(self, directory: str, max_size: int) -> None:
+        self.directory: str = directory
+        self.max_size: int = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def make_key(cls, level: str, params: Dict[str, Any]) -> str:
+        params = dict(params, cache_version=cls.VERSION)
+        text = json.dumps(params, sort_keys=True, default=lambda value: value.value if isinstance(value, Enum) else str(value))
+        return f"{level}-{hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]}"
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key + BinaryFrameWriter.EXTENSION)
+
+    def file_digest(self, path: str) -> str:
+        """
+        SHA-256 содержимого файла. Результат запоминается в индексе кэша по размеру и mtime,
+        поэтому большое видео читается целиком только при первом обращении.
+        """
+        stat = os.stat(path)
+        index_path = os.path.join(self.directory, self.INDEX_NAME)
+        index: Dict[str, List[Any]] = {}
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            pass
+        name = os.path.abspath(path)
+        entry = index.get(name)
+        if entry and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return entry[2]
+
+        digest = self.hash_file(path)
+        index[name] = [stat.st_size, stat.st_mtime_ns, digest]
+        temp_path = f"{index_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(temp_path, index_path)
+        return digest
+
+    @classmethod
+    def hash_file(cls, path: str) -> str:
+        """SHA-256 содержимого файла, читаемого блоками по HASH_CHUNK байт."""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(partial(f.read, cls.HASH_CHUNK), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[BinaryFrameReader]:
+        """Возвращает запись кэша или None; повреждённая запись удаляется."""
+        path = self.entry_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            reader = BinaryFrameReader(path)
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"Повреждённая запись кэша {path} удалена: {e}")
+            self._remove(path)
+            return None
+        # Время использования записи для вытеснения LRU
+        os.utime(path)
+        return reader
+
+    def evict(self) -> None:
+        """Удаляет давно не использованные записи, пока размер кэша превышает max_size."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(BinaryFrameWriter.EXTENSION):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            if self._remove(path):
+                total -= size
+                logger.info(f"Запись кэша вытеснена: {path}")
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            # Например, файл ещё отображён в память на Windows
+            return False
+
+class CacheEntryWriter:
+    """
+    Пишет запись FrameCache во временный файл; в кэше она появляется только после commit.
+    Формат .ambf задаёт кадры первым номером и шагом, поэтому запись с пропущенными
+    кадрами (ошибки обработки) не сохраняется.
+    """
+    def __init__(self, cache: FrameCache, key: str, fps: float, color_format: ColorFormat, frame_step: int = 1) -> None:
+        self.cache: FrameCache = cache
+        self.key: str = key
+        self.frame_step: int = frame_step
+        self.complete: bool = True
+        self._next_frame: int = 1
+        self._writer: BinaryFrameWriter = BinaryFrameWriter(f"{cache.entry_path(key)}.{os.getpid()}.tmp", fps, color_format, frame_step)
+
+    def write(self, frame_numbers: List[int], block: np.ndarray, layout: List[Tuple[str, int]]) -> None:
+        expected = range(self._next_frame, self._next_frame + len(frame_numbers) * self.frame_step, self.frame_step)
+        if list(expected) != list(frame_numbers):
+            self.complete = False
+        if self.complete:
+            self._writer.write_block(frame_numbers[0], block, layout)
+            self._next_frame = expected.stop
+
+    def commit(self) -> None:
+        self._writer.close()
+        if not self.complete or self._writer.count == 0:
+            self.discard()
+            return
+        os.replace(self._writer.path, self.cache.entry_path(self.key))
+        self.cache.evict()
+
+    def discard(self) -> None:
+        self._writer.close()
+        FrameCache._remove(self._writer.path)
+
+def frames_to_array(frames_data: List[Dict[str, Any]]) -> Tuple[List[int], np.ndarray, List[Tuple[str, int]]]:
+    """
+    Склеивает кадры в формате вывода в массив (frames, leds, channels).
+    Зоны многозонных кадров идут подряд по оси светодиодов; layout - список (имя, светодиоды).
+    Целые цвета дают uint8, дробные (ColorPrecision.LINEAR) - float32.
+    """
+    frame_numbers = [item["frame"] for item in frames_data]
+    if frames_data and "zones" in frames_data[0]:
+        layout = [(name, len(pixels)) for name, pixels in frames_data[0]["zones"].items()]
+        rows = [[pixel for pixels in item["zones"].values() for pixel in pixels] for item in frames_data]
+    else:
+        layout = []
+        rows = [item["pixels"] for item in frames_data]
+    array = np.asarray(rows)
+    return frame_numbers, array.astype(np.float32 if array.dtype.kind == "f" and array.size else np.uint8), layout
+
+def fill_frame_gaps(
+    frame_numbers: List[int],
+    block: np.ndarray,
+    next_frame: Optional[int],
+    frame_step: int,
+    previous: Optional[np.ndarray] = None
+) -> Tuple[List[int], np.ndarray]:
+    """
+    Заполняет пропуски в номерах кадров повтором предыдущего кадра. Форматы с номером первого
+    кадра и шагом (.ambf, .ambz, .ambp) не хранят номера, и кадр, пропущенный воркером из-за
+    ошибки, сдвигал бы номера всех следующих. next_frame - ожидаемый номер первого кадра блока
+    (None - номер первого кадра блока), previous - последний записанный кадр для пропуска
+    перед блоком (без него повторяется первый кадр блока).
+    """
+    start = frame_numbers[0] if next_frame is None else next_frame
+    offsets = np.asarray(frame_numbers, dtype=np.int64) - start
+    if (
+        offsets[0] < 0 or (offsets % frame_step).any()
+        or (len(offsets) > 1 and (np.diff(offsets) <= 0).any())
+    ):
+        raise ValueError(f"Номера кадров {frame_numbers[0]}..{frame_numbers[-1]} не продолжают кадр {start} с шагом {frame_step}")
+    positions = offsets // frame_step
+    if positions[-1] == len(positions) - 1:
+        return frame_numbers, block
+    # Индекс строки блока для каждого кадра подряд: последний имеющийся кадр не позже данного
+    rows = np.full(int(positions[-1]) + 1, -1, dtype=np.int64)
+    rows[positions] = np.arange(len(positions))
+    rows = np.maximum.accumulate(rows)
+    logger.warning(f"Кадров без цветов: {len(rows) - len(positions)} (до кадра {frame_numbers[-1]}), повторён предыдущий кадр")
+    before = np.asarray(previous if previous is not None else block[0])[np.newaxis]
+    filled = np.concatenate([before.astype(block.dtype), np.asarray(block)])[rows + 1]
+    return list(range(start, start + len(rows) * frame_step, frame_step)), filled
+
+def assign_frame_pixels(item: Dict[str, Any], pixels: np.ndarray, layout: List[Tuple[str, int]]) -> Dict[str, Any]:
+    """Записывает цвета (leds, channels) в кадр формата вывода с учётом зон."""
+    if layout:
+        zones = {}
+        offset = 0
+        for name, leds in layout:
+            zones[name] = pixels[offset:offset + leds].tolist()
+            offset += leds
+        item["zones"] = zones
+    else:
+        item["pixels"] = pixels.tolist()
+    return item
+
+def array_to_frames(frame_numbers: List[int], array: np.ndarray, layout: List[Tuple[str, int]]) -> List[Dict[str, Any]]:
+    """Обратное к frames_to_array преобразование."""
+    return [assign_frame_pixels({"frame": frame_number}, pixels, layout) for frame_number, pixels in zip(frame_numbers, array)]
+
+class FrameSink:
+    """Приёмник итоговых цветов в памяти (iter_frames): блоки копятся до выдачи через drain."""
+    path: Optional[str] = None
+
+    def __init__(self) -> None:
+        self.count: int = 0
+        self._blocks: deque = deque()
+
+    def write_frames(self, frame_numbers: List[int], block: np.ndarray) -> None:
+        self._blocks.append((frame_numbers, block))
+        self.count += len(frame_numbers)
+
+    def drain(self) -> Iterator[Tuple[int, np.ndarray]]:
+        while self._blocks:
+            frame_numbers, block = self._blocks.popleft()
+            yield from zip(frame_numbers, block)
+
+    def close(self) -> None:
+        pass
+
+def write_frame_block(writer: Any, frame_numbers: List[int], block: np.ndarray, layout: List[Tuple[str, int]]) -> None:
+    """Дописывает блок кадров в StreamingJsonWriter, BinaryFrameWriter или FrameSink."""
+    if isinstance(writer, FrameSink):
+        writer.write_frames(frame_numbers, block)
+    elif isinstance(writer, BinaryFrameWriter):
+        writer.write_frames(frame_numbers, block, layout)
+    else:
+        for item in array_to_frames(frame_numbers, block, layout):
+            writer.write(item)
+
+def quantize_colors(values: np.ndarray) -> np.ndarray:
+    """Округляет float-значения к ближайшему целому и приводит к uint8."""
+    return np.clip(np.rint(values), 0, 255).astype(np.uint8)
+
+class OutputQuantizer:
+    """
+    Последняя стадия вывода: сглаженные float-цвета блока (frames, leds, channels) -> uint8.
+    В точном режиме (ColorPrecision.LINEAR) сначала применяется FrameProcessor.encode_output.
+    Дизеринг сохраняет дробную часть в среднем по кадрам, поэтому тусклые переходы идут
+    без ступенек при той же частоте кадров:
+    temporal - порог округления каждого канала сдвигается от кадра к кадру по последовательности
+    золотого сечения (сдвиг фазы у каждого светодиода свой, без состояния);
+    error_diffusion - ошибка округления каждого канала добавляется к следующему кадру
+    (состояние сохраняется в контрольной точке).
+    """
+    GOLDEN_RATIO = 0.6180339887498949
+    # Шаг фазы между каналами светодиодов (последовательность R2) - соседние каналы не мерцают синхронно
+    PHASE_STEP = 0.7548776662466927
+
+    def __init__(self, config: VideoConfig) -> None:
+        self.config: VideoConfig = config
+        self.linear: bool = config.precision == ColorPrecision.LINEAR
+        self.dithering: DitherMode = config.dithering
+        self._error: Optional[np.ndarray] = None
+
+    def quantize(self, frame_numbers: List[int], values: np.ndarray) -> np.ndarray:
+        if self.linear:
+            config = self.config
+            values = FrameProcessor.encode_output(
+                values, config.output_color_format, config.gamma, config.max_brightness, config.saturation_factor
+            )
+        if len(values) == 0 or self.dithering == DitherMode.NONE:
+            return quantize_colors(values)
+        if self.dithering == DitherMode.TEMPORAL:
+            shape = values.shape[1:]
+            phase = (np.arange(int(np.prod(shape))) * self.PHASE_STEP % 1.0).reshape(shape)
+            thresholds = (np.asarray(frame_numbers, dtype=np.float64).reshape(-1, *[1] * len(shape)) * self.GOLDEN_RATIO + phase) % 1.0
+            return np.clip(np.floor(values + thresholds), 0, 255).astype(np.uint8)
+        elif self.dithering == DitherMode.ERROR_DIFFUSION:
+            error = self._error if self._error is not None and self._error.shape == values.shape[1:] else np.zeros(values.shape[1:])
+            result = np.empty(values.shape, dtype=np.uint8)
+            for i in range(len(values)):
+                target = values[i] + error
+                result[i] = np.clip(np.rint(target), 0, 255)
+                # Ошибка ограничена полушагом: на границах диапазона она не накапливается
+                error = np.clip(target - result[i], -0.5, 0.5)
+            self._error = error
+            return result
+        raise ValueError(f"Неподдерживаемый режим дизеринга: {self.dithering}")
+
+    def state(self) -> Dict[str, Optional[np.ndarray]]:
+        """Состояние для контрольной точки."""
+        return {"error": self._error}
+
+    def load_state(self, state: Dict[str, Optional[np.ndarray]]) -> None:
+        self._error = state["error"]
+
+class TemporalFilter:
+    """
+    Причинные временные фильтры над массивами (frames, leds, channels).
+    Состояние хранится во float и переносится между блоками, поэтому фильтр
+    применяется потоково, батч за батчем, без накопления ошибки округления.
+    """
+    def __init__(
+        self,
+        smoothing: SmoothingFilter = SmoothingFilter.EMA,
+        alpha: float = 0.3,
+        attack_alpha: float = 0.6,
+        release_alpha: float = 0.15,
+        min_cutoff: float = 1.0,
+        beta: float = 0.05,
+        d_cutoff: float = 1.0,
+        fps: float = 30.0
+    ) -> None:
+        if smoothing == SmoothingFilter.ZERO_PHASE:
+            raise ValueError("Фильтр zero_phase не причинный, используйте smooth_frames")
+        self.smoothing: SmoothingFilter = smoothing
+        self.alpha: float = alpha
+        self.attack_alpha: float = attack_alpha
+        self.release_alpha: float = release_alpha
+        self.min_cutoff: float = min_cutoff
+        self.beta: float = beta
+        self.d_cutoff: float = d_cutoff
+        self.fps: float = fps if fps > 0 else 30.0
+        self._prev: Optional[np.ndarray] = None
+        self._derivative: Optional[np.ndarray] = None
+        # scipy необязателен (без него EMA считается циклом по кадрам на numpy) и импортируется
+        # около секунды: модуль загружается здесь, а не на первом блоке кадров
+        scipy_signal = optional_module("scipy.signal") if smoothing == SmoothingFilter.EMA else None
+        self._lfilter: Optional[Callable] = scipy_signal.lfilter if scipy_signal is not None else None
+
+    @classmethod
+    def from_config(cls, config: VideoConfig, fps: float, smoothing: Optional[SmoothingFilter] = None) -> "TemporalFilter":
+        return cls(
+            smoothing or config.smoothing,
+            alpha=config.temporal_alpha,
+            attack_alpha=config.attack_alpha,
+            release_alpha=config.release_alpha,
+            min_cutoff=config.min_cutoff,
+            beta=config.beta,
+            d_cutoff=config.d_cutoff,
+            fps=fps
+        )
+
+    def reset(self) -> None:
+        """Сбрасывает состояние: следующий кадр будет выведен без сглаживания."""
+        self._prev = None
+        self._derivative = None
+
+    def state(self) -> Dict[str, Optional[np.ndarray]]:
+        """Состояние фильтра для контрольной точки."""
+        return {"prev": self._prev, "derivative": self._derivative}
+
+    def load_state(self, state: Dict[str, Optional[np.ndarray]]) -> None:
+        self._prev = state["prev"]
+        self._derivative = state["derivative"]
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """Фильтрует блок кадров и возвращает float64 массив той же формы."""
+        block = np.asarray(block, dtype=np.float64)
+        if len(block) == 0 or self.smoothing == SmoothingFilter.NONE:
+            return block
+        if self.smoothing == SmoothingFilter.EMA:
+            return self._ema(block)
+        elif self.smoothing == SmoothingFilter.ATTACK_RELEASE:
+            return self._attack_release(block)
+        elif self.smoothing == SmoothingFilter.ONE_EURO:
+            return self._one_euro(block)
+        raise ValueError(f"Неподдерживаемый фильтр сглаживания: {self.smoothing}")
+
+    def _ema(self, block: np.ndarray) -> np.ndarray:
+        # y[n] = alpha * x[n] + (1 - alpha) * y[n-1], для первого кадра y = x
+        alpha = self.alpha
+        prev = block[0] if self._prev is None else self._prev
+        if self._lfilter is not None:
+            zi = ((1 - alpha) * prev)[np.newaxis]
+            out, _ = self._lfilter([alpha], [1.0, -(1 - alpha)], block, axis=0, zi=zi)
+        else:
+            out = np.empty_like(block)
+            for i in range(len(block)):
+                prev = alpha * block[i] + (1 - alpha) * prev
+                out[i] = prev
+        self._prev = out[-1]
+        return out
+
+    def _attack_release(self, block: np.ndarray) -> np.ndarray:
+        # Рост яркости отслеживается с attack_alpha, спад - с release_alpha
+        prev = block[0] if self._prev is None else self._prev
+        out = np.empty_like(block)
+        for i in range(len(block)):
+            alpha = np.where(block[i] > prev, self.attack_alpha, self.release_alpha)
+            prev = alpha * block[i] + (1 - alpha) * prev
+            out[i] = prev
+        self._prev = prev
+        return out
+
+    def _smoothing_factor(self, cutoff: np.ndarray) -> np.ndarray:
+        tau = 1.0 / (2 * np.pi * cutoff)
+        return 1.0 / (1.0 + tau * self.fps)
+
+    def _one_euro(self, block: np.ndarray) -> np.ndarray:
+        # One Euro filter: частота среза растёт со скоростью изменения сигнала
+        out = np.empty_like(block)
+        start = 0
+        if self._prev is None:
+            self._prev = block[0]
+            self._derivative = np.zeros_like(block[0])
+            out[0] = block[0]
+            start = 1
+        derivative_alpha = self._smoothing_factor(np.asarray(self.d_cutoff))
+        prev = self._prev
+        derivative = self._derivative
+        for i in range(start, len(block)):
+            derivative = derivative_alpha * (block[i] - prev) * self.fps + (1 - derivative_alpha) * derivative
+            alpha = self._smoothing_factor(self.min_cutoff + self.beta * np.abs(derivative))
+            prev = alpha * block[i] + (1 - alpha) * prev
+            out[i] = prev
+        self._prev = prev
+        self._derivative = derivative
+        return out
+
+def filter_frames(frames: np.ndarray, smoothing: SmoothingFilter = SmoothingFilter.EMA, **params) -> np.ndarray:
+    """
+    Сглаживает весь массив (frames, leds, channels) целиком и возвращает float64 без округления.
+    zero_phase - прямой и обратный проход EMA (без запаздывания, только для офлайн-рендера).
+    """
+    if smoothing == SmoothingFilter.ZERO_PHASE:
+        forward = TemporalFilter(SmoothingFilter.EMA, **params).process(frames)
+        return TemporalFilter(SmoothingFilter.EMA, **params).process(forward[::-1])[::-1]
+    return TemporalFilter(smoothing, **params).process(frames)
+
+def smooth_frames(frames: np.ndarray, smoothing: SmoothingFilter = SmoothingFilter.EMA, **params) -> np.ndarray:
+    """Сглаживает весь массив (frames, leds, channels) целиком (см. filter_frames) и возвращает uint8."""
+    return quantize_colors(filter_frames(frames, smoothing, **params))
+
+class TemporalSmoother:
+    """
+    Потоковое сглаживание кадров в формате вывода (в том числе многозонных):
+    батч склеивается в массив и проходит через TemporalFilter.
+    """
+    def __init__(self, alpha: float = 0.3, smoothing: SmoothingFilter = SmoothingFilter.EMA, **params) -> None:
+        self.filter: TemporalFilter = TemporalFilter(smoothing, alpha, **params)
+
+    def smooth_batch(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Заменяет цвета кадров батча сглаженными (на месте) и возвращает их."""
+        if not items:
+            return items
+        _, array, layout = frames_to_array(items)
+        smoothed = quantize_colors(self.filter.process(array))
+        for item, pixels in zip(items, smoothed):
+            assign_frame_pixels(item, pixels, layout)
+        return items
+
+    def smooth(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        return self.smooth_batch([item])[0]
+
+def apply_temporal_smoothing(
+    frames_data: List[Dict[str, Any]],
+    alpha: float,
+    smoothing: SmoothingFilter = SmoothingFilter.EMA,
+    **params
+) -> List[Dict[str, Any]]:
+    """
+    Применяет временное сглаживание к последовательности кадров.
+    Для EMA новый цвет рассчитывается как:
+       new_val = alpha * current + (1 - alpha) * previous_smoothed,
+    где для первого кадра previous_smoothed = current. Состояние хранится во float,
+    округление выполняется только при выводе.
+    Многозонные кадры сглаживаются по каждой зоне независимо.
+    """
+    # Сортируем по номеру кадра на случай, если порядок изменён
+    sorted_data = sorted(frames_data, key=lambda d: d["frame"])
+    if not sorted_data:
+        return sorted_data
+    _, array, layout = frames_to_array(sorted_data)
+    smoothed = smooth_frames(array, smoothing, alpha=alpha, **params)
+    for item, pixels in zip(sorted_data, smoothed):
+        assign_frame_pixels(item, pixels, layout)
+    return sorted_data
+
+def resmooth_file(input_path: str, output_path: str, config: VideoConfig, fps: float = 30.0) -> int:
+    """
+    Повторно сглаживает готовый файл вывода (JSON, JSON.gz, .ambf или .ambz) без декодирования видео.
+    Формат результата определяется расширением output_path, поэтому входной файл при
+    необходимости конвертируется. Имеет смысл для вывода, записанного с --smoothing none.
+    Возвращает количество кадров.
+    """
+    params = dict(
+        attack_alpha=config.attack_alpha,
+        release_alpha=config.release_alpha,
+        min_cutoff=config.min_cutoff,
+        beta=config.beta,
+        d_cutoff=config.d_cutoff
+    )
+    if input_path.endswith(FRAME_FILE_EXTENSIONS):
+        reader = open_frame_reader(input_path)
+        frame_numbers = [reader.frame_number(index) for index in range(len(reader))]
+        array, layout, color_format = reader.frames, reader.layout, reader.color_format
+        fps, frame_step, playback_fps = reader.fps, reader.frame_step, reader.playback_fps
+        # Вывод JSON из бинарного файла - список кадров, как у StreamingJsonWriter
+        json_object = False
+    else:
+        # Список кадров или объект {"color_format": ..., "frames": [...]} - как в load_frames_file
+        frame_numbers, array, layout, color_format = load_frames_file(input_path)
+        frame_step = int(np.diff(frame_numbers).min()) if len(frame_numbers) > 1 else 1
+        playback_fps = fps
+        json_object = color_format is not None
+    smoothed = smooth_frames(array, config.smoothing, alpha=config.temporal_alpha, fps=playback_fps, **params) if len(array) else array
+
+    # Формат вывода определяется расширением output_path, как в create_frame_writer
+    if output_path.endswith(FRAME_FILE_EXTENSIONS):
+        if color_format is None:
+            color_format = guess_color_format(array.shape[-1] if array.ndim == 3 else 3)
+        options = dict(keyframe_interval=config.encoded_keyframe_interval, codec=config.codec) if output_path.endswith(EncodedFrameWriter.EXTENSION) else {}
+        writer = create_frame_writer(output_path, fps, color_format, frame_step, **options)
+        try:
+            if len(smoothed):
+                writer.write_frames(frame_numbers, smoothed, layout)
+        finally:
+            writer.close()
+        frame_count = writer.count
+    else:
+        frames_data: Any = array_to_frames(frame_numbers, smoothed, layout)
+        frame_count = len(frames_data)
+        if json_object:
+            frames_data = {"color_format": color_format.value, "frames": frames_data}
+        opener = gzip.open if output_path.endswith(".gz") else open
+        with opener(output_path, 'wt', encoding='utf-8') as f:
+            json.dump(frames_data, f, ensure_ascii=False, indent=2)
+    logger.info(f"Сглажено {frame_count} кадров: {input_path} -> {output_path}")
+    return frame_count
+
+def _api_config(zones: Any, params: Optional[Dict[str, Any]], config: Optional[VideoConfig]) -> VideoConfig:
+    """
+    Конфигурация для iter_frames/extract: копия config (или значения по умолчанию без чтения
+    config.ini), параметры params (имена атрибутов VideoConfig, как в манифесте) и зоны.
+    zones - строка как в --zones или список Zone; заменяет зоны конфигурации.
+    """
+    config = copy.copy(config) if config is not None else VideoConfig(None)
+    if params:
+        config.apply_overrides(params)
+    if isinstance(zones, str):
+        config.zones = parse_zone_list(zones, config.target_height, config.target_width)
+    elif zones is not None:
+        config.zones = list(zones)
+    # Результат отдаётся вызывающему коду: файл уменьшенного видео не пишется
+    config.save_video = False
+    return config
+
+def iter_frames(
+    video_path: str,
+    zones: Any = None,
+    params: Optional[Dict[str, Any]] = None,
+    config: Optional[VideoConfig] = None
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Отдаёт (номер кадра, цвета (leds, channels) uint8) по мере обработки видео, без файлов вывода
+    и индикаторов прогресса.
+    Цвета те же, что в файле вывода при тех же параметрах (включая сглаживание).
+    num_processes = 0 обрабатывает кадры в вызывающем процессе.
+        for frame_number, colors in iter_frames("intro.mp4", zones="left,right:60", params={"smoothing": "none"}):
+            ...
+    """
+    processor = VideoColorProcessor(video_path, "", _api_config(zones, params, config))
+    yield from processor.iter_output()
+
+def extract(
+    video_path: str,
+    zones: Any = None,
+    params: Optional[Dict[str, Any]] = None,
+    config: Optional[VideoConfig] = None
+) -> np.ndarray:
+    """Цвета всех обработанных кадров массивом (frames, leds, channels); параметры как у iter_frames."""
+    frames = [colors for _, colors in iter_frames(video_path, zones, params, config)]
+    if not frames:
+        return np.zeros((0, 0, 0), dtype=np.uint8)
+    return np.stack(frames)
+
+def __getattr__(name: str) -> Any:
+    """Сервер и точка входа командной строки - в отдельных модулях, загружаются при обращении."""
+    if name in ("ExtractionServer", "run_server"):
+        import ambilight_server
+        return getattr(ambilight_server, name)
+    if name in ("main", "parse_arguments"):
+        import ambilight_cli
+        return getattr(ambilight_cli, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+if __name__ == "__main__":
+    from ambilight_cli import main
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Сервер извлечения с прогретым пулом воркеров (--serve): задания в формате JSON-строк
+из stdin или по TCP выполняются BatchRunner модуля ambilight_extractor на общем пуле.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import socket
+import sys
+from typing import Any, Dict, Optional, TextIO
+
+from ambilight_extractor import BatchRunner, FrameProcessor, VideoConfig, make_batch_jobs, open_pool
+
+logger = logging.getLogger(__name__)
+
+class ExtractionServer:
+    """
+    Долгоживущий процесс с прогретым пулом воркеров: запросы не платят за импорт cv2,
+    чтение конфигурации и запуск процессов. Протокол - JSON по строке на запрос и ответ:
+        {"id": 1, "config": "config.ini", "defaults": {...}, "jobs": [{"video": ..., "output": ...}], "force": false}
+        -> {"id": 1, "exit_code": 0, "jobs": [отчёт задачи как в --batch]}
+        {"id": 2, "command": "ping"} -> {"id": 2, "status": "ok"}
+        {"command": "shutdown"} - ответ и остановка сервера.
+    Задачи выполняются BatchRunner на общем пуле; запросы обрабатываются по очереди.
+    """
+    def __init__(self, num_processes: Optional[int] = None, config_path: Optional[str] = "config.ini") -> None:
+        self.base: VideoConfig = VideoConfig(config_path)
+        self.num_processes: int = num_processes if num_processes is not None else self.base.num_processes
+        self.pool: Optional[Any] = None
+        self.running: bool = False
+
+    def start(self) -> None:
+        self.pool = open_pool(self.num_processes, (FrameProcessor.build_lut(),))
+        self.running = True
+        logger.info(f"Сервер извлечения запущен: {self.num_processes} процессов")
+
+    def stop(self) -> None:
+        self.running = False
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Выполняет один запрос и возвращает ответ."""
+        response: Dict[str, Any] = {"id": request.get("id")}
+        command = request.get("command")
+        if command == "ping":
+            response["status"] = "ok"
+        elif command == "shutdown":
+            self.running = False
+            response["status"] = "ok"
+        elif command is not None:
+            response["error"] = f"Неизвестная команда: {command}"
+        else:
+            base = VideoConfig(request["config"]) if "config" in request else self.base
+            jobs = make_batch_jobs(base, request.get("defaults", {}), request["jobs"])
+            runner = BatchRunner(jobs, self.num_processes, bool(request.get("force", False)))
+            response["exit_code"] = runner.run(self.pool)
+            response["jobs"] = runner.report()
+            if response["exit_code"] == 130:
+                # BatchRunner останавливает пул при прерывании
+                self.pool = None
+                self.running = False
+        return response
+
+    def serve_stream(self, reader: TextIO, writer: TextIO) -> None:
+        """Читает запросы из reader до конца потока или команды shutdown."""
+        for line in reader:
+            if not line.strip():
+                continue
+            try:
+                response = self.handle(json.loads(line))
+            except Exception as e:
+                logger.error(f"Ошибка запроса: {e}")
+                response = {"error": str(e)}
+            writer.write(json.dumps(response, ensure_ascii=False) + "\n")
+            writer.flush()
+            if not self.running:
+                break
+
+    def serve_socket(self, host: str, port: int) -> None:
+        """Принимает соединения по TCP по одному; каждое - поток запросов как в serve_stream."""
+        with socket.create_server((host, port)) as server:
+            logger.info(f"Ожидание запросов на {host}:{port}")
+            while self.running:
+                connection, address = server.accept()
+                with connection, connection.makefile('r', encoding='utf-8') as reader, connection.makefile('w', encoding='utf-8') as writer:
+                    logger.info(f"Соединение с {address[0]}:{address[1]}")
+                    self.serve_stream(reader, writer)
+
+def run_server(address: str, config_path: str = "config.ini") -> int:
+    """--serve: stdin (запросы из stdin, ответы в stdout) или [HOST:]PORT."""
+    server = ExtractionServer(config_path=config_path)
+    server.start()
+    try:
+        if address == "stdin":
+            server.serve_stream(sys.stdin, sys.stdout)
+        else:
+            host, _, port = address.rpartition(":")
+            server.serve_socket(host or "127.0.0.1", int(port))
+    except KeyboardInterrupt:
+        logger.warning("Сервер остановлен")
+    finally:
+        server.stop()
+    return 0